@@ -12,11 +12,116 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections.abc import MutableMapping
 import os
 import pickle
+import sqlite3
+import tempfile
+import threading
 
 from superflore.utils import info
 
+_SQLITE_MAGIC = b'SQLite format 3\x00'
+
+
+class SqliteCache(MutableMapping):
+    """
+    Dict-like cache persisted in a SQLite database.
+
+    Every assignment is committed on its own, so entries computed before
+    a crash or an interrupt are not lost, and entries are only read from
+    disk when looked up instead of loading the whole cache up front.
+    Values can be any picklable object.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        # autocommit mode: every statement is an atomic transaction
+        self.conn = sqlite3.connect(
+            filename, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value BLOB NOT NULL)'
+        )
+
+    def __getitem__(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)',
+                (key, pickle.dumps(value)))
+
+    def __delitem__(self, key):
+        with self.lock:
+            cursor = self.conn.execute(
+                'DELETE FROM cache WHERE key = ?', (key,))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        with self.lock:
+            return self.conn.execute(
+                'SELECT 1 FROM cache WHERE key = ?', (key,)
+            ).fetchone() is not None
+
+    def __iter__(self):
+        with self.lock:
+            keys = [
+                row[0] for row in self.conn.execute('SELECT key FROM cache')
+            ]
+        return iter(keys)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def update_many(self, items):
+        """Store many entries in a single transaction."""
+        with self.lock:
+            with self.conn:
+                self.conn.execute('BEGIN')
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)',
+                    ((k, pickle.dumps(v)) for k, v in items))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def _is_legacy_cache(filename):
+    with open(filename, 'rb') as f:
+        header = f.read(len(_SQLITE_MAGIC))
+    return header != _SQLITE_MAGIC and len(header) > 0
+
+
+def _migrate_legacy_cache(filename):
+    """Convert a pickled dict cache to a SQLite cache, in place."""
+    info("Converting pickled cache file '%s'" % filename)
+    with open(filename, 'rb') as f:
+        legacy = pickle.load(f)
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filename)))
+    os.close(fd)
+    try:
+        cache = SqliteCache(tmp_filename)
+        cache.update_many(legacy.items())
+        cache.conn.execute('PRAGMA journal_mode=DELETE')
+        cache.close()
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
+
 
 class CacheManager:
     def __init__(self, filename):
@@ -24,18 +129,17 @@ class CacheManager:
         self.cache = dict()
 
     def __enter__(self):
-        # load the initial cache, if it exists
-        if self.filename and os.path.isfile(self.filename):
-            info("Loading cached file '%s'" % self.filename)
-            self.cache_file = open(self.filename, 'rb')
-            self.cache = pickle.load(self.cache_file)
-            self.cache_file.close()
+        # open the cache, creating it if needed
+        if self.filename:
+            if os.path.isfile(self.filename):
+                info("Loading cached file '%s'" % self.filename)
+                if _is_legacy_cache(self.filename):
+                    _migrate_legacy_cache(self.filename)
+            self.cache = SqliteCache(self.filename)
         return self.cache
 
     def __exit__(self, *args):
-        # save the cache, if it exists
+        # entries are saved as they are set; just release the database
         if self.filename:
-            info("Saving cached file '%s'" % self.filename)
-            self.cache_file = open(self.filename, 'wb')
-            pickle.dump(self.cache, self.cache_file)
-            self.cache_file.close()
+            info("Closing cached file '%s'" % self.filename)
+            self.cache.close()
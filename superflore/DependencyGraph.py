@@ -0,0 +1,219 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from catkin_pkg.package import InvalidPackage
+from catkin_pkg.package import parse_package_string
+from superflore.PackageIndex import get_package_index
+from superflore.PackageXmlCache import get_package_xml
+from superflore.timing import timed_phase
+from superflore.utils import info
+from superflore.utils import is_offline
+from superflore.utils import resolve_deps
+from superflore.utils import warn
+
+depend_types = (
+    'build', 'buildtool', 'build_export', 'buildtool_export',
+    'exec', 'run', 'test', 'doc',
+)
+
+# the dependencies needed to build and install a package
+build_depend_types = (
+    'build', 'buildtool', 'build_export', 'buildtool_export', 'exec', 'run',
+)
+
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
+
+
+class DependencyGraph:
+    """
+    Dependencies of the released packages of a ROS distro.
+
+    Each package.xml is parsed once per run, and the dependencies of every
+    type are evaluated once per condition context, instead of building a
+    rosdistro DependencyWalker (and re-parsing the package.xml for each
+    dependency type) for every generated package.
+    """
+    def __init__(self, distro):
+        self.distro = distro
+        self._packages = dict()
+        self._depends = dict()
+
+    def get_package(self, pkg_name):
+        """Return the parsed package.xml of the package."""
+        if pkg_name not in self._packages:
+            with timed_phase('package_xml'):
+                if is_offline():
+                    # the distribution cache of the mirror may miss the
+                    # package, which rosdistro would then fetch
+                    pkg_xml = get_package_xml(self.distro, pkg_name)
+                else:
+                    pkg_xml = self.distro.get_release_package_xml(pkg_name)
+                try:
+                    pkg = parse_package_string(pkg_xml)
+                except InvalidPackage as e:
+                    raise InvalidPackage(pkg_name + ': %s' % str(e))
+            self._packages[pkg_name] = pkg
+        return self._packages[pkg_name]
+
+    def get_all_depends(self, pkg_name, condition_context=None):
+        """
+        Return a dict mapping each dependency type to the frozenset of
+        dependencies of the package, like DependencyWalker.get_depends
+        would for the given condition context.
+        """
+        if pkg_name not in self.distro.release_packages:
+            raise KeyError("Package '%s' not found" % pkg_name)
+        key = (pkg_name, _context_key(condition_context))
+        if key not in self._depends:
+            with timed_phase('dependencies'):
+                self._depends[key] = self._evaluate_depends(
+                    pkg_name, condition_context)
+        return self._depends[key]
+
+    def _evaluate_depends(self, pkg_name, condition_context):
+        pkg = self.get_package(pkg_name)
+        all_depends = {
+            'build': pkg.build_depends,
+            'buildtool': pkg.buildtool_depends,
+            'build_export': pkg.build_export_depends,
+            'buildtool_export': pkg.buildtool_export_depends,
+            'exec': pkg.exec_depends,
+            'run': pkg.run_depends,
+            'test': pkg.test_depends,
+            'doc': pkg.doc_depends,
+        }
+        return {
+            depend_type: frozenset(
+                d.name for d in deps
+                if condition_context is None or
+                d.evaluate_condition(condition_context) is not False
+            ) for depend_type, deps in all_depends.items()
+        }
+
+    def get_depends(self, pkg_name, depend_type, condition_context=None):
+        """Return the set of dependencies of the given type."""
+        return set(
+            self.get_all_depends(pkg_name, condition_context)[depend_type]
+        )
+
+    def get_recursive_depends(
+        self, pkg_name, condition_context=None, types=build_depend_types
+    ):
+        """
+        Return the set of packages of the distro the package depends on,
+        directly or through other packages of the distro, through
+        dependencies of the given types.
+        """
+        depends = set()
+        stack = [pkg_name]
+        while stack:
+            try:
+                all_depends = self.get_all_depends(
+                    stack.pop(), condition_context)
+            except Exception:
+                # reported when the package itself is generated
+                continue
+            for depend_type in types:
+                for dep in all_depends[depend_type]:
+                    if dep in self.distro.release_packages and \
+                            dep not in depends:
+                        depends.add(dep)
+                        stack.append(dep)
+        depends.discard(pkg_name)
+        return depends
+
+    def get_external_depends(
+        self, condition_context=None, types=depend_types
+    ):
+        """
+        Return a dict mapping each dependency of the given types that is
+        not a package of the distro (i.e. a rosdep key) to the set of
+        packages depending on it.
+        """
+        pkg_index = get_package_index(self.distro)
+        external_depends = dict()
+        for pkg_name in sorted(pkg_index.names):
+            try:
+                all_depends = self.get_all_depends(
+                    pkg_name, condition_context)
+            except Exception:
+                # reported when the package itself is generated
+                continue
+            for depend_type in types:
+                for dep in all_depends[depend_type]:
+                    if dep not in pkg_index:
+                        external_depends.setdefault(dep, set()).add(pkg_name)
+        return external_depends
+
+    def resolve_external_depends(
+        self, os, condition_context=None, types=depend_types
+    ):
+        """
+        Resolve every rosdep key the distro depends on for the target
+        platform (as utils.resolve_dep does) in one batch before generation,
+        and report the keys that cannot be resolved with their dependents.
+
+        :returns: a dict mapping each resolved key to its resolved packages,
+            and the set of unresolved keys
+        """
+        external_depends = self.get_external_depends(
+            condition_context, types)
+        table, unresolved = resolve_deps(
+            external_depends, os, self.distro.name)
+        info("Resolved {0} of {1} rosdep keys of distro '{2}' for {3}".format(
+            len(table), len(external_depends), self.distro.name, os))
+        for key in sorted(unresolved):
+            warn("Unresolved rosdep key '{0}', needed by: {1}".format(
+                key, ', '.join(sorted(external_depends[key]))))
+        return table, unresolved
+
+    def precompute(self, jobs=1):
+        """Fetch and parse the package.xml of every package in one pass."""
+        pkg_names = sorted(get_package_index(self.distro).names)
+        info("Parsing package.xml of {0} packages for distro '{1}'".format(
+            len(pkg_names), self.distro.name))
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            for pkg_name, result in zip(
+                pkg_names, executor.map(self._try_get_package, pkg_names)
+            ):
+                if isinstance(result, Exception):
+                    # reported again when the package itself is generated
+                    info("Could not parse package.xml of '{0}': {1}".format(
+                        pkg_name, result))
+
+    def _try_get_package(self, pkg_name):
+        try:
+            return self.get_package(pkg_name)
+        except Exception as e:
+            return e
+
+
+def _context_key(condition_context):
+    if condition_context is None:
+        return None
+    return tuple(sorted(condition_context.items()))
+
+
+def get_dependency_graph(distro):
+    """Return the DependencyGraph of the distro, creating it on first use."""
+    with _graph_cache_lock:
+        graph = _graph_cache.get(distro.name)
+        if graph is None or graph.distro is not distro:
+            graph = DependencyGraph(distro)
+            _graph_cache[distro.name] = graph
+    return graph
@@ -0,0 +1,244 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+from superflore.exceptions import OfflineCacheMiss
+from superflore.timing import timed_phase
+from superflore.utils import check_online
+from superflore.utils import get_superflore_version
+from superflore.utils import info
+from superflore.utils import retry_on_exception
+from superflore.utils import scan_archive
+from superflore.utils import warn
+
+
+_CONTENT_RANGE_REGEX = re.compile(r'bytes (?:(\d+)-\d+|\*)/(\d+|\*)$')
+
+
+def _parse_content_range(response):
+    """
+    Return the first byte and total size of the Content-Range of the
+    response, each being None if it is unknown.
+    """
+    match = _CONTENT_RANGE_REGEX.match(
+        response.headers.get('Content-Range', ''))
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return (int(start) if start is not None else None,
+            int(total) if total != '*' else None)
+
+
+def _get_validator(response):
+    """
+    Return the validator of the response to send as If-Range when resuming
+    its download: its strong ETag, or else its Last-Modified date.
+    """
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+class _ResumingReader:
+    """
+    Reads the partial download first, then the rest of the response,
+    appending what comes from the response to the partial download.
+    """
+    def __init__(self, part_file, response, chunk_size=1 << 16):
+        self.part_file = part_file
+        self.chunks = response.iter_content(chunk_size)
+        self.resumed = True
+        self.buffer = b''
+
+    def read(self, size=-1):
+        if self.resumed:
+            data = self.part_file.read(size)
+            if data or size == 0:
+                return data
+            self.resumed = False
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, b'')
+            if not chunk:
+                break
+            self.part_file.write(chunk)
+            self.buffer += chunk
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class DownloadManager:
+    """
+    Downloads files over a pool of keep-alive connections.
+
+    A download is first written to '<filename>.part', and an interrupted
+    download is resumed from there with a Range request, unless the file
+    changed on the server since. The SHA256 of
+    every completed download is recorded in sha256_cache, keyed by its
+    filename.
+    """
+    def __init__(self, sha256_cache=None, jobs=8):
+        self.sha256_cache = sha256_cache if sha256_cache is not None \
+            else dict()
+        self.jobs = max(jobs, 1)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.jobs, pool_maxsize=self.jobs)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # GitLab returns 403 when using a default User-Agent
+        self.session.headers['User-Agent'] = \
+            'superflore/{}'.format(get_superflore_version())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.session.close()
+
+    def download(self, url, filename, member_regex=None):
+        """
+        Download url to filename, resuming a previous partial download.
+
+        Returns the SHA256 of the file and, if member_regex is given, the
+        content of the matching archive member (see utils.scan_archive).
+        """
+        check_online("'{0}'".format(url))
+        with timed_phase('download'):
+            return self._download(url, filename, member_regex)
+
+    def _download(self, url, filename, member_regex):
+        result = self._resume(url, filename, member_regex)
+        if result is None:
+            warn("partial download of '{0}' doesn't match, "
+                 "starting over".format(url))
+            result = self._resume(url, filename, member_regex)
+            if result is None:
+                raise RuntimeError(
+                    "incomplete download of '{0}'".format(url))
+        sha256, member = result
+        self.sha256_cache[filename] = sha256
+        return sha256, member
+
+    def _resume(self, url, filename, member_regex):
+        """
+        Download url to filename, resuming from '<filename>.part' if the
+        server still has the same file (see _get_validator). Returns None,
+        with the partial download removed, if the Content-Range of the
+        response doesn't match the partial download.
+        """
+        part_filename = filename + '.part'
+        validator_filename = part_filename + '.validator'
+        offset = os.path.getsize(part_filename) \
+            if os.path.exists(part_filename) else 0
+        headers = dict()
+        if offset:
+            headers['Range'] = 'bytes=%d-' % offset
+            if os.path.exists(validator_filename):
+                with open(validator_filename) as f:
+                    headers['If-Range'] = f.read()
+        with self.session.get(
+            url, headers=headers, stream=True, timeout=60
+        ) as response:
+            start, total = _parse_content_range(response)
+            if offset and response.status_code == 416:
+                # nothing left to download, if the partial file is complete
+                if total != offset:
+                    self._discard(part_filename)
+                    return None
+                offset = -1
+            else:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    # the server ignored the Range or the file changed,
+                    # start over
+                    offset = 0
+                    total = None
+                    self._discard(part_filename)
+                    validator = _get_validator(response)
+                    if validator:
+                        with open(validator_filename, 'w') as f:
+                            f.write(validator)
+                    else:
+                        self._discard(validator_filename)
+                elif start != offset:
+                    self._discard(part_filename)
+                    return None
+            with open(part_filename, 'a+b' if offset else 'w+b') as part:
+                part.seek(0)
+                if offset < 0:
+                    sha256, member = scan_archive(part, member_regex)
+                else:
+                    sha256, member = scan_archive(
+                        _ResumingReader(part, response), member_regex)
+        if total is not None and os.path.getsize(part_filename) != total:
+            self._discard(part_filename)
+            return None
+        os.replace(part_filename, filename)
+        self._discard(validator_filename)
+        return sha256, member
+
+    @staticmethod
+    def _discard(filename):
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+    def fetch_all(self, downloads, member_regex=None):
+        """
+        Download every (url, filename) pair not downloaded yet, with at
+        most self.jobs concurrent connections.
+
+        Returns a dict mapping the downloaded filenames to the matching
+        archive member (or None). Failed downloads are reported and left
+        out, so that they can be retried later on.
+        """
+        downloads = [
+            (url, filename) for url, filename in downloads
+            if not os.path.exists(filename)
+        ]
+        if not downloads:
+            return dict()
+        info('Downloading {0} archives ({1} at a time)...'.format(
+            len(downloads), self.jobs))
+
+        def fetch(download):
+            url, filename = download
+            try:
+                return retry_on_exception(
+                    self.download, url, filename, member_regex,
+                    retry_msg="network error downloading '{}'".format(url))
+            except OfflineCacheMiss:
+                raise
+            except Exception as e:
+                warn("failed to download '{0}': {1}".format(url, e))
+                return None
+
+        members = dict()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for (url, filename), result in zip(
+                downloads, executor.map(fetch, downloads)
+            ):
+                if result is not None:
+                    members[filename] = result[1]
+        return members
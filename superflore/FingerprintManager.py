@@ -0,0 +1,128 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import hashlib
+import json
+import os
+import threading
+
+from superflore.DependencyGraph import get_dependency_graph
+from superflore.PackageIndex import get_package_index
+from superflore.utils import get_dep_definition
+from superflore.utils import get_superflore_version
+from superflore.utils import info
+
+FINGERPRINTS_FILENAME = '.superflore-fingerprints.json'
+
+
+class FingerprintManager:
+    """
+    Fingerprints of the inputs each package was last generated from.
+
+    A fingerprint covers the superflore version, the package version and
+    release tag, which of its dependencies are released in the distro, and
+    the rosdep rules of the others, and, given get_patches_dir, the patches
+    of the package in the directory get_patches_dir(pkg_name). A package
+    whose fingerprint did not change since it was generated does not need
+    to be generated again. The fingerprints are stored as JSON in the
+    output repository, next to the generated files, so that they are
+    committed along with them.
+    """
+    def __init__(self, filename, platform, get_patches_dir=None):
+        self.filename = filename
+        self.platform = platform
+        self.get_patches_dir = get_patches_dir
+        self.fingerprints = dict()
+        self.preserved = set()
+        self._computed = dict()
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        if os.path.isfile(self.filename):
+            info("Loading fingerprints file '%s'" % self.filename)
+            with open(self.filename, 'r') as f:
+                self.fingerprints = json.load(f)
+        return self
+
+    def __exit__(self, *args):
+        info("Saving fingerprints file '%s'" % self.filename)
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        with open(self.filename, 'w') as f:
+            json.dump(self.fingerprints, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def compute(self, distro, pkg_name):
+        """Return the fingerprint of the generation inputs of the package."""
+        key = (distro.name, pkg_name)
+        if key not in self._computed:
+            self._computed[key] = self._compute(distro, pkg_name)
+        return self._computed[key]
+
+    def _compute(self, distro, pkg_name):
+        pkg_index = get_package_index(distro)
+        depends = set().union(
+            *get_dependency_graph(distro).get_all_depends(pkg_name).values())
+        inputs = {
+            'superflore': get_superflore_version(),
+            'platform': self.platform,
+            'package': pkg_name,
+            'version': pkg_index.get_version(pkg_name),
+            'release_tag': pkg_index.get_release_tag(pkg_name),
+            'repository': pkg_index.get_repository(pkg_name).url,
+            'internal_depends': sorted(d for d in depends if d in pkg_index),
+            'rosdep': {
+                d: get_dep_definition(d, self.platform)
+                for d in sorted(depends) if d not in pkg_index
+            },
+        }
+        if self.get_patches_dir is not None:
+            inputs['patches'] = self._get_patch_hashes(pkg_name)
+        return hashlib.sha256(json.dumps(
+            inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _get_patch_hashes(self, pkg_name):
+        """Return a dict mapping the package's patches to their SHA256."""
+        hashes = dict()
+        patches_dir = self.get_patches_dir(pkg_name)
+        for patch in sorted(glob.glob(os.path.join(patches_dir, '*.patch'))):
+            with open(patch, 'rb') as f:
+                hashes[os.path.basename(patch)] = hashlib.sha256(
+                    f.read()).hexdigest()
+        return hashes
+
+    def is_unchanged(self, pkg_name, fingerprint):
+        with self.lock:
+            return self.fingerprints.get(pkg_name) == fingerprint
+
+    def record(self, pkg_name, fingerprint):
+        with self.lock:
+            self.fingerprints[pkg_name] = fingerprint
+
+    def mark_preserved(self, pkg_name):
+        with self.lock:
+            self.preserved.add(pkg_name)
+
+    def discard(self, pkg_name):
+        with self.lock:
+            self.fingerprints.pop(pkg_name, None)
+
+    def retain(self, pkg_names):
+        """Forget the packages that are not in pkg_names anymore."""
+        with self.lock:
+            self.fingerprints = {
+                pkg: fingerprint
+                for pkg, fingerprint in self.fingerprints.items()
+                if pkg in pkg_names
+            }
@@ -0,0 +1,88 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from rosdistro.manifest_provider import get_release_tag
+from rosinstall_generator.distro import _generate_rosinstall
+from rosinstall_generator.distro import get_package_names
+from superflore.utils import get_pkg_version
+
+_index_cache = {}
+_index_cache_lock = threading.Lock()
+
+
+class PackageIndex:
+    """
+    Run-scoped index of the released packages of a ROS distro.
+
+    The set of package names, the release repository of each package and
+    the formatted package versions are computed once and shared by every
+    generator, instead of being recomputed for each package.
+    """
+    def __init__(self, distro):
+        self.distro = distro
+        released, unreleased = get_package_names(distro)
+        self.names = frozenset(released)
+        self.unreleased_names = frozenset(unreleased)
+        self._repositories = dict()
+        self._versions = dict()
+        self._src_uris = dict()
+
+    def __contains__(self, pkg_name):
+        return pkg_name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_repository(self, pkg_name):
+        """Return the release repository of the package."""
+        if pkg_name not in self._repositories:
+            pkg = self.distro.release_packages[pkg_name]
+            self._repositories[pkg_name] = \
+                self.distro.repositories[pkg.repository_name]\
+                .release_repository
+        return self._repositories[pkg_name]
+
+    def get_release_tag(self, pkg_name):
+        """Return the release tag of the package."""
+        return get_release_tag(self.get_repository(pkg_name), pkg_name)
+
+    def get_src_uri(self, pkg_name):
+        """Return the URI of the release archive of the package."""
+        if pkg_name not in self._src_uris:
+            self._src_uris[pkg_name] = _generate_rosinstall(
+                pkg_name, self.get_repository(pkg_name).url,
+                self.get_release_tag(pkg_name), True
+            )[0]['tar']['uri']
+        return self._src_uris[pkg_name]
+
+    def get_version(self, pkg_name, is_oe=False):
+        """Return the package version, as formatted by get_pkg_version."""
+        key = (pkg_name, is_oe)
+        if key not in self._versions:
+            self._versions[key] = get_pkg_version(
+                self.distro, pkg_name, is_oe=is_oe
+            )
+        return self._versions[key]
+
+
+def get_package_index(distro):
+    """Return the PackageIndex of the distro, building it on first use."""
+    with _index_cache_lock:
+        index = _index_cache.get(distro.name)
+        if index is None or index.distro is not distro:
+            index = PackageIndex(distro)
+            _index_cache[distro.name] = index
+    return index
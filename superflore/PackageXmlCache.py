@@ -0,0 +1,92 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import tempfile
+
+from rosdistro.manifest_provider import get_release_tag
+from rosdistro.rosdistro import RosPackage
+from superflore.PackageIndex import get_package_index
+from superflore.timing import timed_phase
+from superflore.utils import check_online
+from superflore.utils import get_cache_dir
+from superflore.utils import make_dir
+
+
+class PackageXmlCache:
+    """
+    On-disk store of release package.xml files.
+
+    The content of a package.xml is immutable for a given release tag, so
+    the entries are keyed by the release repository URL and the tag, and
+    never need to be invalidated.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def get_filename(self, repo_url, release_tag):
+        key = hashlib.sha256(
+            '{0}\n{1}'.format(repo_url, release_tag).encode()
+        ).hexdigest()
+        return os.path.join(self.path, key[:2], key + '.xml')
+
+    def get(self, repo_url, release_tag):
+        """Return the cached package.xml as bytes, or None."""
+        try:
+            with open(self.get_filename(repo_url, release_tag), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, repo_url, release_tag, package_xml):
+        if isinstance(package_xml, str):
+            package_xml = package_xml.encode('utf-8')
+        filename = self.get_filename(repo_url, release_tag)
+        make_dir(os.path.dirname(filename))
+        # write to a temporary file first, so that an interrupted run never
+        # leaves a truncated package.xml behind
+        fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(package_xml)
+            os.replace(tmp_filename, filename)
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+
+    def __contains__(self, key):
+        return os.path.exists(self.get_filename(*key))
+
+
+def get_package_xml_cache():
+    return PackageXmlCache(get_cache_dir('package_xml'))
+
+
+def get_package_xml(distro, pkg_name):
+    """
+    Return the release package.xml of the package, fetching it from the
+    release repository only if it is not in the package.xml cache yet.
+    """
+    repo = get_package_index(distro).get_repository(pkg_name)
+    release_tag = get_release_tag(repo, pkg_name)
+    cache = get_package_xml_cache()
+    with timed_phase('package_xml'):
+        package_xml = cache.get(repo.url, release_tag)
+        if package_xml is None:
+            check_online("package.xml of '{0}'".format(pkg_name))
+            package_xml = RosPackage(pkg_name, repo).get_package_xml(
+                distro.name)
+            cache.put(repo.url, release_tag, package_xml)
+    return package_xml
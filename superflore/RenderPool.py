@@ -0,0 +1,65 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ProcessPoolExecutor
+
+from superflore.rosdep_support import add_resolutions
+from superflore.rosdep_support import get_resolutions
+from superflore.utils import info
+
+
+def _init_worker(resolutions):
+    add_resolutions(resolutions)
+
+
+class RenderPool:
+    """
+    Renders installer text in a pool of worker processes.
+
+    Rendering is pure-Python string assembly and license translation, which
+    threads cannot run in parallel. The render functions passed to render()
+    and their arguments must be picklable, and everything the caller needs
+    from rendering must be returned, as changes made by a worker to its
+    copy of the arguments are lost.
+
+    The workers start with the rosdep resolutions memoized by this process
+    when the pool is created, so the external dependencies of a distro
+    should be resolved before creating its pool. With a single job,
+    render() calls the render function in this process.
+    """
+    def __init__(self, jobs=1):
+        self.jobs = max(jobs, 1)
+        self.executor = None
+        if self.jobs > 1:
+            info('Rendering in {0} processes'.format(self.jobs))
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.jobs, initializer=_init_worker,
+                initargs=(get_resolutions(),))
+            # start the workers now: when forking, they must be forked
+            # before the generation threads are started
+            self.executor.submit(int).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def render(self, func, *args):
+        """Return func(*args), computed by one of the workers."""
+        if self.executor is None:
+            return func(*args)
+        return self.executor.submit(func, *args).result()
@@ -2,8 +2,17 @@ from superflore.version import VERSION
 
 __version__ = VERSION
 
-from .repo_instance import RepoInstance
-
 __all__ = [
     'RepoInstance'
 ]
+
+
+def __getattr__(name):
+    # RepoInstance pulls in GitPython and PyGithub, which are slow to import;
+    # only import it when it is asked for, so that importing a submodule of
+    # superflore does not pay for it
+    if name == 'RepoInstance':
+        from .repo_instance import RepoInstance
+        return RepoInstance
+    raise AttributeError(
+        "module '{0}' has no attribute '{1}'".format(__name__, name))
@@ -16,7 +16,6 @@ from getpass import getpass
 import os
 import sys
 
-import docker
 from superflore.TempfileManager import TempfileManager
 from superflore.utils import err
 from superflore.utils import info
@@ -25,6 +24,8 @@ from superflore.utils import ok
 
 class Docker(object):
     def __init__(self):
+        # the docker client is slow to import and only needed for builds
+        import docker
         self.client = docker.from_env()
         self.image = None
         self.directory_map = dict()
@@ -88,6 +89,7 @@ class Docker(object):
         return cmd
 
     def run(self, rm=True, show_cmd=False, privileged=False, log_file=None):
+        from docker.errors import ContainerError
         if log_file:
             # get the location to store the log
             log_path = os.path.dirname(log_file)
@@ -117,7 +119,7 @@ class Docker(object):
                 ok("Docker container exited.")
                 if log_file:
                     info("Log file: '%s/%s'" % (tmp, log_name))
-            except docker.errors.ContainerError:
+            except ContainerError:
                 err("Docker container exited with errors.")
                 if log_file:
                     info("Log file: '%s/%s'" % (tmp, log_name))
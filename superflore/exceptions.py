@@ -39,3 +39,9 @@ class UnknownBuildType(Exception):
     """Raised when we don't know what to inherit to build the package"""
     def __init__(self, msg):
         self.message = msg
+
+
+class OfflineCacheMiss(Exception):
+    """Raised when running offline and something is not in the caches"""
+    def __init__(self, message):
+        self.message = message
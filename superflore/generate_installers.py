@@ -12,10 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from rosinstall_generator.distro import get_package_names
+from concurrent.futures import ThreadPoolExecutor
+
 from superflore.exceptions import UnknownBuildType
+from superflore.PackageIndex import get_package_index
+from superflore.timing import timed_package
 from superflore.utils import err
-from superflore.utils import get_pkg_version
 from superflore.utils import info
 from superflore.utils import ok
 from superflore.utils import warn
@@ -30,8 +32,9 @@ def generate_installers(
     **kwargs                 # any additional keyword arguments
 ):
     distro_name = distro.name
-    pkg_names = get_package_names(distro)
-    total = float(len(pkg_names[0]))
+    pkg_index = get_package_index(distro)
+    pkg_names = sorted(pkg_index.names)
+    total = float(len(pkg_names))
     borkd_pkgs = dict()
     changes = []
     installers = []
@@ -39,26 +42,71 @@ def generate_installers(
     succeeded = 0
     failed = 0
     what_generating = 'recipe' if kwargs.get('is_oe', False) else 'ebuild'
+    jobs = kwargs.get('jobs') or 1
+    # in incremental mode, the installers of packages whose fingerprint is
+    # unchanged are preserved, whatever preserve_existing says
+    fingerprints = kwargs.get('fingerprints')
+    fingerprint = dict()
+    unchanged = set()
+
+    def gen_pkg(pkg):
+        with timed_package(distro_name, pkg):
+            return gen_pkg_func(
+                overlay, pkg, distro,
+                preserve_existing or pkg in unchanged, *args
+            )
 
     info("Generating %ss for distro '%s'" % (what_generating, distro_name))
-    for i, pkg in enumerate(sorted(pkg_names[0])):
+    if fingerprints is not None:
+        for pkg in pkg_names:
+            try:
+                fingerprint[pkg] = fingerprints.compute(distro, pkg)
+            except Exception as e:
+                # generate it, and report the error if it happens again
+                warn("Failed to fingerprint package '%s': %s" % (pkg, e))
+                continue
+            if fingerprints.is_unchanged(pkg, fingerprint[pkg]):
+                unchanged.add(pkg)
+        fingerprints.retain(pkg_names)
+        info("%d of %d packages unchanged since last generation" % (
+            len(unchanged), len(pkg_names)))
+    executor = None
+    futures = dict()
+    if jobs > 1:
+        # Packages are generated concurrently, but the results are consumed
+        # below in the same sorted order as the serial path, so the log,
+        # the accounting and the list of changes stay deterministic.
+        info('Using {0} parallel jobs'.format(jobs))
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        for pkg in pkg_names:
+            if 'skip_keys' in kwargs and pkg in kwargs['skip_keys']:
+                continue
+            futures[pkg] = executor.submit(gen_pkg, pkg)
+    for i, pkg in enumerate(pkg_names):
         if 'skip_keys' in kwargs and pkg in kwargs['skip_keys']:
             warn("Package '%s' is in skip-keys list, skipping..." % pkg)
             continue
-        version = get_pkg_version(distro, pkg, **kwargs)
+        version = pkg_index.get_version(
+            pkg, is_oe=kwargs.get('is_oe', False)
+        )
         percent = '%.1f' % (100 * (float(i) / total))
         try:
-            current, current_info, installer_name = gen_pkg_func(
-                overlay, pkg, distro, preserve_existing, *args
-            )
+            if executor:
+                current, current_info, installer_name = futures[pkg].result()
+            else:
+                current, current_info, installer_name = gen_pkg(pkg)
             if not current:
                 if current_info:
                     # we are missing dependencies
                     borkd_pkgs[pkg] = current_info
-                elif preserve_existing:
+                elif preserve_existing or pkg in unchanged:
                     # don't replace the installer
+                    if fingerprints is not None:
+                        fingerprints.mark_preserved(pkg)
                     succeeded += 1
                     continue
+                if fingerprints is not None:
+                    fingerprints.discard(pkg)
                 failed_msg = "{0}%: Failed to generate".format(percent)
                 failed_msg += " %s for package '%s'!" % (what_generating, pkg)
                 err(failed_msg)
@@ -68,6 +116,8 @@ def generate_installers(
                 what_generating
             ok('{0}%: {1} \'{2}\'.'.format(percent, success_msg, pkg))
             succeeded += 1
+            if fingerprints is not None and pkg in fingerprint:
+                fingerprints.record(pkg, fingerprint[pkg])
             if not current_info:
                 changes.append('{0} {1}'.format(installer_name, version))
             elif current_info != version:
@@ -89,6 +139,14 @@ def generate_installers(
             err("{0}%: {1} for package {2}!".format(percent, failed_msg, pkg))
             bad_installers.append(pkg)
             failed = failed + 1
+        except Exception:
+            if executor:
+                # don't keep generating the rest of the distro in the
+                # background once an unexpected error is propagating
+                executor.shutdown(cancel_futures=True)
+            raise
+    if executor:
+        executor.shutdown()
     results = 'Generated {0} / {1}'.format(succeeded, failed + succeeded)
     results += ' for distro {0}'.format(distro_name)
     info("------ {0} ------\n".format(results))
@@ -13,15 +13,17 @@
 # limitations under the License.
 
 from catkin_pkg.package import InvalidPackage
-from rosdistro.dependency_walker import DependencyWalker
 from rosdistro.manifest_provider import get_release_tag
-from rosdistro.rosdistro import RosPackage
 from rosinstall_generator.distro import _generate_rosinstall
-from rosinstall_generator.distro import get_package_names
+from superflore.DependencyGraph import get_dependency_graph
 from superflore.exceptions import NoPkgXml
+from superflore.exceptions import OfflineCacheMiss
 from superflore.generators.bitbake.yocto_recipe import yoctoRecipe
+from superflore.PackageIndex import get_package_index
+from superflore.PackageXmlCache import get_package_xml
+from superflore.RenderPool import RenderPool
+from superflore.timing import timed_phase
 from superflore.utils import err
-from superflore.utils import get_pkg_version
 from superflore.utils import make_dir
 from superflore.utils import ok
 from superflore.utils import retry_on_exception
@@ -32,16 +34,16 @@ org = "Open Source Robotics Foundation"
 
 def regenerate_pkg(
     overlay, pkg, rosdistro, preserve_existing, yocto_release,
-    srcrev_cache, skip_keys
+    srcrev_cache, skip_keys, render_pool=None
 ):
-    pkg_names = get_package_names(rosdistro)[0]
-    if pkg not in pkg_names:
+    pkg_index = get_package_index(rosdistro)
+    if pkg not in pkg_index:
         yoctoRecipe.not_generated_recipes.add(pkg)
         raise RuntimeError("Unknown package '%s' available packages"
                            " in selected distro: %s" %
-                           (pkg, get_package_names(rosdistro)))
+                           (pkg, sorted(pkg_index.names)))
     try:
-        version = get_pkg_version(rosdistro, pkg, is_oe=True)
+        version = pkg_index.get_version(pkg, is_oe=True)
     except KeyError as ke:
         yoctoRecipe.not_generated_recipes.add(pkg)
         raise ke
@@ -55,45 +57,43 @@ def regenerate_pkg(
         rosdistro.name,
         recipe
     )
-    existing = overlay.repo.git.status('--porcelain', '--', prefix)
-    if existing:
+    # one git status snapshot of the overlay answers every package
+    matches = overlay.repo.glob(prefix)
+    changed = [match for match in matches if match[0] != '  ']
+    existing = None
+    if changed:
         # The git status --porcelain output will look like this:
         # D  meta-ros2-eloquent/generated-recipes/variants/ros-base_0.8.3-1.bb
-        # we want just the path with filename
-        if len(existing.split('\n')) > 1:
+        if len(changed) > 1:
             warn('More than 1 recipe was output by "git status --porcelain '
                  'meta-ros{0}-{1}/generated-recipes/*/{2}_*.bb": "{3}"'
                  .format(
                      yoctoRecipe._get_ros_version(rosdistro.name),
                      rosdistro.name,
                      recipe,
-                     existing))
-        if existing.split()[0] != 'D':
+                     changed))
+        if changed[0][0].strip() != 'D':
             err('Unexpected output from "git status --porcelain '
                 'meta-ros{0}-{1}/generated-recipes/*/{2}_*.bb": "{3}"'
                 .format(
                     yoctoRecipe._get_ros_version(rosdistro.name),
                     rosdistro.name,
                     recipe,
-                    existing))
-
-        existing = existing.split()[1]
-    else:
+                    changed))
+        existing = changed[0][1]
+    elif matches:
         # If it isn't shown in git status, it could still exist as normal
         # unchanged file when --only option is being used
-        import glob
-        existing = glob.glob('{0}/{1}'.format(repo_dir, prefix))
-        if existing:
-            if len(existing) > 1:
-                err('More than 1 recipe was output by "git status '
-                    '--porcelain '
-                    'meta-ros{0}-{1}/generated-recipes/*/{2}_*.bb": "{3}"'
-                    .format(
-                        yoctoRecipe._get_ros_version(rosdistro.name),
-                        rosdistro.name,
-                        recipe,
-                        existing))
-            existing = existing[0]
+        if len(matches) > 1:
+            err('More than 1 recipe was output by "git status '
+                '--porcelain '
+                'meta-ros{0}-{1}/generated-recipes/*/{2}_*.bb": "{3}"'
+                .format(
+                    yoctoRecipe._get_ros_version(rosdistro.name),
+                    rosdistro.name,
+                    recipe,
+                    [match[1] for match in matches]))
+        existing = matches[0][1]
 
     previous_version = None
     if preserve_existing and existing:
@@ -112,12 +112,17 @@ def regenerate_pkg(
         err('Invalid package: ' + str(e))
         yoctoRecipe.not_generated_recipes.add(pkg)
         return None, [], None
+    except OfflineCacheMiss:
+        raise
     except Exception as e:
         err('Failed generating recipe for {}! {}'.format(pkg, str(e)))
         yoctoRecipe.not_generated_recipes.add(pkg)
         return None, [], None
     try:
-        recipe_text = current.recipe_text()
+        with timed_phase('render'):
+            recipe_text, aggregates = (render_pool or RenderPool()).render(
+                current.recipe.render, org)
+        yoctoRecipe.merge_aggregates(aggregates)
     except NoPkgXml as nopkg:
         err("Could not fetch pkg! {}".format(str(nopkg)))
         yoctoRecipe.not_generated_recipes.add(pkg)
@@ -146,7 +151,8 @@ def regenerate_pkg(
             version
         )
     try:
-        with open('{0}'.format(recipe_file_name), "w") as recipe_file:
+        with timed_phase('write'), \
+                open('{0}'.format(recipe_file_name), "w") as recipe_file:
             ok('Writing recipe {0}'.format(recipe_file_name))
             recipe_file.write(recipe_text)
             yoctoRecipe.generated_components.add(component_name)
@@ -159,33 +165,29 @@ def regenerate_pkg(
 
 
 def _gen_recipe_for_package(
-    rosdistro, yocto_release, pkg_name, pkg, repo, ros_pkg,
+    rosdistro, yocto_release, pkg_name, pkg, repo,
     pkg_rosinstall, srcrev_cache, skip_keys
 ):
-    pkg_names = get_package_names(rosdistro)
-    pkg_dep_walker = DependencyWalker(
-        rosdistro,
-        evaluate_condition_context=yoctoRecipe._get_condition_context(
-            rosdistro.name))
-    pkg_buildtool_deps = pkg_dep_walker.get_depends(pkg_name, "buildtool")
-    pkg_build_deps = pkg_dep_walker.get_depends(pkg_name, "build")
-    pkg_build_export_deps = pkg_dep_walker.get_depends(
-        pkg_name, "build_export")
-    pkg_buildtool_export_deps = pkg_dep_walker.get_depends(
-        pkg_name, "buildtool_export")
-    pkg_exec_deps = pkg_dep_walker.get_depends(pkg_name, "exec")
-    pkg_test_deps = pkg_dep_walker.get_depends(pkg_name, "test")
+    pkg_index = get_package_index(rosdistro)
+    pkg_deps = get_dependency_graph(rosdistro).get_all_depends(
+        pkg_name, yoctoRecipe._get_condition_context(rosdistro.name))
+    pkg_buildtool_deps = pkg_deps["buildtool"]
+    pkg_build_deps = pkg_deps["build"]
+    pkg_build_export_deps = pkg_deps["build_export"]
+    pkg_buildtool_export_deps = pkg_deps["buildtool_export"]
+    pkg_exec_deps = pkg_deps["exec"]
+    pkg_test_deps = pkg_deps["test"]
     src_uri = pkg_rosinstall[0]['tar']['uri']
 
     # parse through package xml
     err_msg = 'Failed to fetch metadata for package {}'.format(pkg_name)
-    pkg_xml = retry_on_exception(ros_pkg.get_package_xml, rosdistro.name,
+    pkg_xml = retry_on_exception(get_package_xml, rosdistro, pkg_name,
                                  retry_msg='Could not get package xml!',
                                  error_msg=err_msg)
 
     pkg_recipe = yoctoRecipe(
         pkg.repository_name,
-        len(ros_pkg.repository.package_names),
+        len(repo.package_names),
         pkg_name,
         pkg_xml,
         rosdistro,
@@ -196,27 +198,27 @@ def _gen_recipe_for_package(
     )
     # add build dependencies
     for bdep in pkg_build_deps:
-        pkg_recipe.add_build_depend(bdep, bdep in pkg_names[0])
+        pkg_recipe.add_build_depend(bdep, bdep in pkg_index)
 
     # add build tool dependencies
     for btdep in pkg_buildtool_deps:
-        pkg_recipe.add_buildtool_depend(btdep, btdep in pkg_names[0])
+        pkg_recipe.add_buildtool_depend(btdep, btdep in pkg_index)
 
     # add export dependencies
     for edep in pkg_build_export_deps:
-        pkg_recipe.add_export_depend(edep, edep in pkg_names[0])
+        pkg_recipe.add_export_depend(edep, edep in pkg_index)
 
     # add buildtool export dependencies
     for btedep in pkg_buildtool_export_deps:
-        pkg_recipe.add_buildtool_export_depend(btedep, btedep in pkg_names[0])
+        pkg_recipe.add_buildtool_export_depend(btedep, btedep in pkg_index)
 
     # add exec dependencies
     for xdep in pkg_exec_deps:
-        pkg_recipe.add_run_depend(xdep, xdep in pkg_names[0])
+        pkg_recipe.add_run_depend(xdep, xdep in pkg_index)
 
     # add test dependencies
     for tdep in pkg_test_deps:
-        pkg_recipe.add_test_depend(tdep, tdep in pkg_names[0])
+        pkg_recipe.add_test_depend(tdep, tdep in pkg_index)
 
     return pkg_recipe
 
@@ -226,15 +228,14 @@ class oe_recipe(object):
         self, rosdistro, yocto_release, pkg_name, srcrev_cache, skip_keys
     ):
         pkg = rosdistro.release_packages[pkg_name]
-        repo = rosdistro.repositories[pkg.repository_name].release_repository
-        ros_pkg = RosPackage(pkg_name, repo)
+        repo = get_package_index(rosdistro).get_repository(pkg_name)
 
         pkg_rosinstall = _generate_rosinstall(
             pkg_name, repo.url, get_release_tag(repo, pkg_name), True
         )
 
         self.recipe = _gen_recipe_for_package(
-            rosdistro, yocto_release, pkg_name, pkg, repo, ros_pkg,
+            rosdistro, yocto_release, pkg_name, pkg, repo,
             pkg_rosinstall, srcrev_cache, skip_keys
         )
 
@@ -46,9 +46,11 @@ class RosMeta(object):
             'Cleaning up:\n{0}'
             .format(files))
         self.repo.git.rm('-rf', '--ignore-unmatch', files.split())
+        self.repo.invalidate_status()
 
     def commit_changes(self, distro, commit_msg):
         info('Commit changes...')
+        self.repo.flush()
         if self.repo.git.status('--porcelain') == '':
             info('Nothing changed; no commit done')
         else:
@@ -66,17 +68,14 @@ class RosMeta(object):
 
     def add_generated_files(self, distro):
         info('Adding changes...')
-        self.repo.git.add('meta-ros{0}-{1}/generated-recipes'.format(
-            yoctoRecipe._get_ros_version(distro), distro))
-        self.repo.git.add('meta-ros{0}-{1}/conf/ros-distro/include/{1}/'
-                          'generated/*.inc'.format(
-                              yoctoRecipe._get_ros_version(distro), distro))
-        self.repo.git.add('meta-ros{0}-{1}/files/{1}/generated/'
-                          'rosdep-resolve.yaml'.format(
-                              yoctoRecipe._get_ros_version(distro), distro))
-        self.repo.git.add('meta-ros{0}-{1}/files/{1}/generated/'
-                          'newer-platform-components.list'.format(
-                              yoctoRecipe._get_ros_version(distro), distro))
+        self.repo.add_files(*(path.format(
+            yoctoRecipe._get_ros_version(distro), distro) for path in (
+            'meta-ros{0}-{1}/generated-recipes',
+            'meta-ros{0}-{1}/conf/ros-distro/include/{1}/generated/*.inc',
+            'meta-ros{0}-{1}/files/{1}/generated/rosdep-resolve.yaml',
+            'meta-ros{0}-{1}/files/{1}/generated/'
+            'newer-platform-components.list',
+        )))
 
     def get_change_summary(self, distro):
         sep = '-' * 5
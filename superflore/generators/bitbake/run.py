@@ -12,30 +12,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import os
 import sys
 
 from rosinstall_generator.distro import get_distro
-from rosinstall_generator.distro import get_package_names
 from superflore.CacheManager import CacheManager
+from superflore.DependencyGraph import get_dependency_graph
+from superflore.exceptions import OfflineCacheMiss
 from superflore.generate_installers import generate_installers
 from superflore.generators.bitbake.gen_packages import regenerate_pkg
 from superflore.generators.bitbake.ros_meta import RosMeta
 from superflore.generators.bitbake.yocto_recipe import yocto_releases
 from superflore.generators.bitbake.yocto_recipe import yoctoRecipe
+from superflore.PackageIndex import get_package_index
 from superflore.parser import get_parser
+from superflore.RenderPool import RenderPool
 from superflore.repo_instance import RepoInstance
+from superflore.repo_instance import set_clone_options
+from superflore.rosdep_support import set_refresh_view_snapshots
 from superflore.TempfileManager import TempfileManager
+from superflore.timing import write_report
 from superflore.utils import clean_up
 from superflore.utils import err
 from superflore.utils import file_pr
 from superflore.utils import gen_delta_msg
+from superflore.utils import get_cache_dir
 from superflore.utils import get_pr_text
 from superflore.utils import get_utcnow_timestamp_str
 from superflore.utils import info
 from superflore.utils import load_pr
 from superflore.utils import ok
 from superflore.utils import save_pr
+from superflore.utils import set_cache_dir
+from superflore.utils import set_offline
 from superflore.utils import url_to_repo_org
 from superflore.utils import warn
 
@@ -62,6 +72,25 @@ def main():
     args = parser.parse_args(sys.argv[1:])
     pr_comment = args.pr_comment
     skip_keys = set(args.skip_keys) if args.skip_keys else set()
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
+    set_clone_options(args.clone_depth, args.clone_filter)
+    if args.offline:
+        if not args.dry_run:
+            parser.error('Invalid args! --offline requires --dry-run')
+        if not args.output_repository_path:
+            parser.error('Invalid args! --offline requires specifying '
+                         '--output-repository-path')
+        try:
+            set_offline()
+        except OfflineCacheMiss as e:
+            parser.error(e.message)
+        if not args.tar_archive_dir:
+            args.tar_archive_dir = get_cache_dir('archives')
+    if args.timing_report:
+        atexit.register(write_report, args.timing_report)
+    if args.refresh_rosdep_views:
+        set_refresh_view_snapshots()
     if args.pr_only:
         if args.dry_run:
             parser.error('Invalid args! cannot dry-run and file PR')
@@ -126,6 +155,11 @@ def main():
         with CacheManager(srcrev_filename) as srcrev_cache:
             if args.only:
                 distro = get_distro(args.ros_distro)
+                yoctoRecipe.prefetch_srcrevs(
+                    distro, srcrev_cache,
+                    (get_package_index(distro).names & set(args.only))
+                    - skip_keys,
+                    jobs=args.jobs)
                 for pkg in args.only:
                     if pkg in skip_keys:
                         warn("Package '%s' is in skip-keys list, skipping..."
@@ -145,7 +179,7 @@ def main():
                     except KeyError:
                         err("No package to satisfy key '%s' available "
                             "packages in selected distro: %s" %
-                            (pkg, get_package_names(distro)))
+                            (pkg, sorted(get_package_index(distro).names)))
                         sys.exit(1)
                 # Commit changes and file pull request
                 title =\
@@ -175,19 +209,32 @@ def main():
             for adistro in selected_targets:
                 yoctoRecipe.reset()
                 distro = get_distro(adistro)
+                get_dependency_graph(distro).precompute(jobs=args.jobs)
+                get_dependency_graph(distro).resolve_external_depends(
+                    'openembedded',
+                    yoctoRecipe._get_condition_context(distro.name),
+                    ('buildtool', 'build', 'build_export',
+                     'buildtool_export', 'exec', 'test'))
+                yoctoRecipe.prefetch_srcrevs(
+                    distro, srcrev_cache,
+                    get_package_index(distro).names - skip_keys,
+                    jobs=args.jobs)
 
-                distro_installers, _, distro_changes =\
-                    generate_installers(
-                        distro,
-                        overlay,
-                        regenerate_pkg,
-                        preserve_existing,
-                        args.yocto_release,
-                        srcrev_cache,
-                        skip_keys,
-                        skip_keys=skip_keys,
-                        is_oe=True,
-                    )
+                with RenderPool(args.render_jobs) as render_pool:
+                    distro_installers, _, distro_changes =\
+                        generate_installers(
+                            distro,
+                            overlay,
+                            regenerate_pkg,
+                            preserve_existing,
+                            args.yocto_release,
+                            srcrev_cache,
+                            skip_keys,
+                            render_pool,
+                            skip_keys=skip_keys,
+                            is_oe=True,
+                            jobs=args.jobs,
+                        )
                 total_changes[adistro] = distro_changes
                 total_installers[adistro] = distro_installers
                 yoctoRecipe.generate_ros_distro_inc(
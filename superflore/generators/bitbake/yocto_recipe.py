@@ -24,22 +24,29 @@
 #
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import os
 from subprocess import DEVNULL, PIPE, Popen
 
 from packaging.version import Version
 from superflore.exceptions import NoPkgXml
+from superflore.exceptions import OfflineCacheMiss
 from superflore.exceptions import UnresolvedDependency
+from superflore.PackageIndex import get_package_index
 from superflore.PackageMetadata import PackageMetadata
+from superflore.timing import timed_phase
+from superflore.utils import check_online
 from superflore.utils import err
 from superflore.utils import get_distros
 from superflore.utils import get_license
-from superflore.utils import get_pkg_version
 from superflore.utils import get_superflore_version
 from superflore.utils import info
+from superflore.utils import is_offline
 from superflore.utils import make_dir
 from superflore.utils import ok
 from superflore.utils import resolve_dep
+from superflore.utils import warn
 import yaml
 
 UNRESOLVED_DEP_PREFIX = 'ROS_UNRESOLVED_DEP-'
@@ -86,7 +93,8 @@ class yoctoRecipe(object):
         self.name = pkg_name
         self.distro = rosdistro.name
         self.release = yocto_release
-        self.version = get_pkg_version(rosdistro, pkg_name, is_oe=True)
+        self.version = get_package_index(rosdistro).get_version(
+            pkg_name, is_oe=True)
         self.src_uri = src_uri
         self.pkg_xml = pkg_xml
         self.author = None
@@ -205,22 +213,82 @@ class yoctoRecipe(object):
         #     refs/tags/release/bouncy/ament_cmake_copyright/0.5.2-0
         # from https://github.com/ros2-gbp/ament_lint-release/archive/ \
         #     release/bouncy/ament_cmake_copyright/0.5.2-0.tar.gz
-        from git.cmd import Git
-
-        g = Git()
-        for ref in g.execute(["git",
-                              "ls-remote",
-                              "https://%s" % self.get_repo_src_uri(),
-                              "refs/tags/%s" % self.get_repo_tag_name()
-                              ]).split('\n'):
-            srcrev, tag = ref.split('\t')
-            if tag == "refs/tags/%s" % self.get_repo_tag_name():
-                return srcrev
+        refs = yoctoRecipe.ls_remote_tags(
+            "https://%s" % self.get_repo_src_uri(),
+            [self.get_repo_tag_name()])
+        srcrev = refs.get("refs/tags/%s" % self.get_repo_tag_name())
+        if srcrev:
+            return srcrev
         err("Cannot map refs/tags/%s to srcrev in https://%s repository with "
             "git ls-remote" % (self.get_repo_tag_name(),
                                self.get_repo_src_uri()))
         return "INVALID"
 
+    @staticmethod
+    def parse_ls_remote(output):
+        """Return a dict mapping each ref listed by ls-remote to its SHA."""
+        refs = dict()
+        for line in output.split('\n'):
+            if '\t' in line:
+                srcrev, ref = line.split('\t', 1)
+                refs[ref.strip()] = srcrev.strip()
+        return refs
+
+    @staticmethod
+    def ls_remote_tags(repo_url, tags):
+        """List the given tags of the remote repository in one request."""
+        from git.cmd import Git
+
+        check_online("SRCREVs of '{0}'".format(repo_url))
+        with timed_phase('download'):
+            return yoctoRecipe.parse_ls_remote(Git().execute(
+                ["git", "ls-remote", repo_url] +
+                ["refs/tags/%s" % tag for tag in sorted(tags)]
+            ))
+
+    @classmethod
+    def prefetch_srcrevs(cls, distro, srcrev_cache, pkg_names=None, jobs=1):
+        """
+        Fill srcrev_cache for the given packages (by default all packages of
+        the distro), with one git ls-remote per release repository, instead
+        of one per package. Packages whose tag cannot be resolved here are
+        left for get_srcrev to report.
+        """
+        pkg_index = get_package_index(distro)
+        if pkg_names is None:
+            pkg_names = pkg_index.names
+        # release repository URL -> {tag: src_uri}
+        needed = defaultdict(dict)
+        for pkg_name in sorted(pkg_names):
+            src_uri = pkg_index.get_src_uri(pkg_name)
+            if src_uri in srcrev_cache:
+                continue
+            repo_url = pkg_index.get_repository(pkg_name).url
+            needed[repo_url][pkg_index.get_release_tag(pkg_name)] = src_uri
+        if not needed:
+            return
+        info("Resolving SRCREVs of {0} release repositories for '{1}'".format(
+            len(needed), distro.name))
+
+        def resolve(repo_url):
+            try:
+                return cls.ls_remote_tags(repo_url, needed[repo_url].keys())
+            except OfflineCacheMiss:
+                raise
+            except Exception as e:
+                warn("git ls-remote failed for '{0}': {1}".format(repo_url, e))
+                return dict()
+
+        repo_urls = sorted(needed)
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            for repo_url, refs in zip(
+                repo_urls, executor.map(resolve, repo_urls)
+            ):
+                for tag, src_uri in needed[repo_url].items():
+                    srcrev = refs.get("refs/tags/%s" % tag)
+                    if srcrev:
+                        srcrev_cache[src_uri] = srcrev
+
     def add_build_depend(self, bdepend, internal=True):
         if bdepend not in self.skip_keys:
             if internal:
@@ -354,7 +422,10 @@ class yoctoRecipe(object):
         return assignment + expression
 
     def get_dependencies(
-            self, internal_depends, external_depends, is_native=False):
+            self, internal_depends, external_depends, is_native=False,
+            rosdep_cache=None):
+        if rosdep_cache is None:
+            rosdep_cache = yoctoRecipe.rosdep_cache
         dependencies = set()
         system_dependencies = set()
         union_deps = internal_depends | external_depends
@@ -369,13 +440,13 @@ class yoctoRecipe(object):
             try:
                 results = resolve_dep(dep, 'openembedded', self.distro)[0]
                 if not results:
-                    yoctoRecipe.rosdep_cache[dep] = []
+                    rosdep_cache[dep] = []
                     continue
                 for res in results:
                     recipe = self.convert_to_oe_name(res, is_native)
                     dependencies.add(recipe)
                     system_dependencies.add(recipe)
-                    yoctoRecipe.rosdep_cache[dep].add(res)
+                    rosdep_cache[dep].add(res)
                     info('External dependency add: ' + recipe)
             except UnresolvedDependency:
                 oe_dep = self.convert_to_oe_name(dep, is_native)
@@ -387,16 +458,59 @@ class yoctoRecipe(object):
                 rosdep_dep = self.convert_to_oe_name(dep, False)
                 rosdep_name = UNRESOLVED_DEP_REF_PREFIX\
                     + rosdep_dep + '}'
-                yoctoRecipe.rosdep_cache[dep].add(rosdep_name)
+                rosdep_cache[dep].add(rosdep_name)
                 info('Unresolved external dependency add: ' + recipe)
 
         return dependencies, system_dependencies
 
+    @staticmethod
+    def new_aggregates():
+        """
+        Return empty additions to the aggregates collected from the
+        recipes, for render() to fill in.
+        """
+        return {
+            'rosdep_cache': defaultdict(set),
+            'platform_deps': set(),
+            'generated_native_recipes': set(),
+            'generated_non_test_deps': set(),
+            'generated_test_deps': set(),
+        }
+
+    @staticmethod
+    def merge_aggregates(aggregates):
+        """Add what render() returned to the aggregates of the class."""
+        for dep, resolved in aggregates['rosdep_cache'].items():
+            if resolved:
+                yoctoRecipe.rosdep_cache[dep] |= resolved
+            else:
+                yoctoRecipe.rosdep_cache[dep] = []
+        yoctoRecipe.platform_deps |= aggregates['platform_deps']
+        yoctoRecipe.generated_native_recipes |= \
+            aggregates['generated_native_recipes']
+        yoctoRecipe.generated_non_test_deps |= \
+            aggregates['generated_non_test_deps']
+        yoctoRecipe.generated_test_deps |= aggregates['generated_test_deps']
+
     def get_recipe_text(self, distributor):
         """
         Generate the Yocto Recipe, given the distributor line
         and the license text.
         """
+        recipe_text, aggregates = self.render(distributor)
+        yoctoRecipe.merge_aggregates(aggregates)
+        return recipe_text
+
+    def render(self, distributor):
+        """
+        Generate the Yocto Recipe like get_recipe_text, but return what it
+        adds to the aggregates of the class along with the recipe text
+        instead of adding it, so that recipes can be rendered in another
+        process.
+        """
+        aggregates = yoctoRecipe.new_aggregates()
+        rosdep_cache = aggregates['rosdep_cache']
+        platform_deps = aggregates['platform_deps']
         ret = "# Generated by superflore -- DO NOT EDIT\n#\n"
         ret += "# Copyright " + distributor + "\n\n"
         ret += self.get_top_inherit_line()
@@ -439,35 +553,41 @@ class yoctoRecipe(object):
         ret += 'ROS_BPN = "' + self.name + '"\n\n'
         # depends
         deps, sys_deps = self.get_dependencies(
-            self.depends, self.depends_external)
-        yoctoRecipe.platform_deps |= sys_deps
+            self.depends, self.depends_external,
+            rosdep_cache=rosdep_cache)
+        platform_deps |= sys_deps
         buildtool_native_deps, sys_deps = self.get_dependencies(
             self.buildtool_depends,
             self.buildtool_depends_external,
-            is_native=True
+            is_native=True,
+            rosdep_cache=rosdep_cache
         )
         native_deps = set(buildtool_native_deps)
-        yoctoRecipe.platform_deps |= sys_deps
+        platform_deps |= sys_deps
         export_deps, sys_deps = self.get_dependencies(
-            self.export_depends, self.export_depends_external)
-        yoctoRecipe.platform_deps |= sys_deps
+            self.export_depends, self.export_depends_external,
+            rosdep_cache=rosdep_cache)
+        platform_deps |= sys_deps
         buildtool_export_native_deps, sys_deps = self.get_dependencies(
             self.buildtool_export_depends,
             self.buildtool_export_depends_external,
-            is_native=True
+            is_native=True,
+            rosdep_cache=rosdep_cache
         )
         native_deps |= buildtool_export_native_deps
-        yoctoRecipe.platform_deps |= sys_deps
-        yoctoRecipe.generated_native_recipes |= native_deps
+        platform_deps |= sys_deps
+        aggregates['generated_native_recipes'] |= native_deps
         exec_deps, sys_deps = self.get_dependencies(
-            self.rdepends, self.rdepends_external)
-        yoctoRecipe.platform_deps |= sys_deps
-        test_deps, sys_deps = self.get_dependencies(self.tdepends,
-                                                    self.tdepends_external)
-        yoctoRecipe.platform_deps |= sys_deps
-        yoctoRecipe.generated_non_test_deps |= deps | export_deps | \
+            self.rdepends, self.rdepends_external,
+            rosdep_cache=rosdep_cache)
+        platform_deps |= sys_deps
+        test_deps, sys_deps = self.get_dependencies(
+            self.tdepends, self.tdepends_external,
+            rosdep_cache=rosdep_cache)
+        platform_deps |= sys_deps
+        aggregates['generated_non_test_deps'] |= deps | export_deps | \
             native_deps | exec_deps
-        yoctoRecipe.generated_test_deps |= test_deps
+        aggregates['generated_test_deps'] |= test_deps
         ret += yoctoRecipe.generate_multiline_variable(
             'ROS_BUILD_DEPENDS', deps) + '\n'
         ret += yoctoRecipe.generate_multiline_variable(
@@ -478,12 +598,13 @@ class yoctoRecipe(object):
             ament_cmake_native_deps, sys_deps = self.get_dependencies(
                 self.export_depends,
                 self.export_depends_external,
-                is_native=True
+                is_native=True,
+                rosdep_cache=rosdep_cache
             )
             buildtool_export_native_deps |= ament_cmake_native_deps
-            yoctoRecipe.generated_non_test_deps |= ament_cmake_native_deps
-            yoctoRecipe.generated_native_recipes |= ament_cmake_native_deps
-            yoctoRecipe.platform_deps |= sys_deps
+            aggregates['generated_non_test_deps'] |= ament_cmake_native_deps
+            aggregates['generated_native_recipes'] |= ament_cmake_native_deps
+            platform_deps |= sys_deps
         else:
             ret += yoctoRecipe.generate_multiline_variable(
                 'ROS_EXPORT_DEPENDS', export_deps) + '\n'
@@ -518,7 +639,7 @@ class yoctoRecipe(object):
         ret += 'ROS_BUILD_TYPE = "' + self.build_type + '"\n'
         # Inherits
         ret += '\n' + self.get_bottom_inherit_line()
-        return ret
+        return ret, aggregates
 
     @staticmethod
     def _get_yocto_version(release):
@@ -753,6 +874,16 @@ class yoctoRecipe(object):
                                   yoctoRecipe._get_ros_version(distro), distro)
         newer_sys_comps_path = '{0}newer-platform-components.list'.format(
             newer_sys_comps_dir)
+        if is_offline():
+            # keep the list of the previous run, it needs the network
+            warn('Offline, not regenerating {0}'.format(newer_sys_comps_path))
+            if not os.path.exists(newer_sys_comps_path):
+                make_dir(newer_sys_comps_dir)
+                with open(newer_sys_comps_path, 'w') as newer_sys_comps_file:
+                    newer_sys_comps_file.write(
+                        '# {}/newer-platform-components.list\n'.format(
+                            distro))
+            return
         ros_version = yoctoRecipe._get_ros_version(distro)
         str_distro = 'ros' if ros_version == 1 else 'ros{}'.format(ros_version)
         args1_wget = ['wget', '-O', '-', 'http://packages.ros.org/'
@@ -12,21 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from contextlib import nullcontext
 import glob
 import os
 
-from rosdistro.dependency_walker import DependencyWalker
 from rosdistro.manifest_provider import get_release_tag
-from rosdistro.rosdistro import RosPackage
 from rosinstall_generator.distro import _generate_rosinstall
-from rosinstall_generator.distro import get_package_names
+from superflore.DependencyGraph import get_dependency_graph
+from superflore.exceptions import OfflineCacheMiss
 from superflore.exceptions import UnresolvedDependency
+from superflore.FingerprintManager import FingerprintManager
+from superflore.FingerprintManager import FINGERPRINTS_FILENAME
 from superflore.generators.ebuild.ebuild import Ebuild
 from superflore.generators.ebuild.metadata_xml import metadata_xml
+from superflore.PackageIndex import get_package_index
 from superflore.PackageMetadata import PackageMetadata
+from superflore.PackageXmlCache import get_package_xml
+from superflore.RenderPool import RenderPool
+from superflore.timing import timed_phase
 from superflore.utils import err
 from superflore.utils import get_distros
-from superflore.utils import get_pkg_version
 from superflore.utils import make_dir
 from superflore.utils import ok
 from superflore.utils import retry_on_exception
@@ -43,8 +48,27 @@ org = "Open Source Robotics Foundation"
 org_license = "BSD"
 
 
-def regenerate_pkg(overlay, pkg, distro, preserve_existing=False):
-    version = get_pkg_version(distro, pkg)
+def get_fingerprint_manager(overlay, distro_name, incremental=True):
+    """
+    Return the FingerprintManager of the distro's ebuilds, or a context
+    yielding None when not regenerating incrementally.
+    """
+    if not incremental:
+        return nullcontext()
+    distro_dir = os.path.join(
+        overlay.repo.repo_dir, 'ros-{0}'.format(distro_name))
+    # the patches of the files directory are listed in the ebuild
+    return FingerprintManager(
+        os.path.join(distro_dir, FINGERPRINTS_FILENAME), 'gentoo',
+        lambda pkg: os.path.join(distro_dir, pkg, 'files')
+    )
+
+
+def regenerate_pkg(
+    overlay, pkg, distro, preserve_existing=False, render_pool=None
+):
+    pkg_index = get_package_index(distro)
+    version = pkg_index.get_version(pkg)
     ebuild_name =\
         '/ros-{0}/{1}/{1}-{2}.ebuild'.format(distro.name, pkg, version)
     ebuild_name = overlay.repo.repo_dir + ebuild_name
@@ -52,13 +76,12 @@ def regenerate_pkg(overlay, pkg, distro, preserve_existing=False):
     patch_path = overlay.repo.repo_dir + patch_path
     is_ros2 = get_distros()[distro.name]['distribution_type'] == 'ros2'
     has_patches = os.path.exists(patch_path)
-    pkg_names = get_package_names(distro)[0]
     patches = None
     if os.path.exists(patch_path):
         patches = [
             f for f in glob.glob('%s/*.patch' % patch_path)
         ]
-    if pkg not in pkg_names:
+    if pkg not in pkg_index:
         raise RuntimeError("Unknown package '%s'" % (pkg))
     # otherwise, remove a (potentially) existing ebuild.
     prefix = '{0}/ros-{1}/{2}/'.format(overlay.repo.repo_dir, distro.name, pkg)
@@ -83,18 +106,18 @@ def regenerate_pkg(overlay, pkg, distro, preserve_existing=False):
         err('Failed to generate ebuild for package {}!'.format(pkg))
         raise e
     try:
-        ebuild_text = current.ebuild_text()
-        metadata_text = current.metadata_text()
-    except UnresolvedDependency:
+        with timed_phase('render'):
+            ebuild_text, metadata_text, unresolved = \
+                (render_pool or RenderPool()).render(render_ebuild, current)
+    except KeyError as ke:
+        err("Failed to parse data for package {}!".format(pkg))
+        raise ke
+    if unresolved:
         dep_err = 'Failed to resolve required dependencies for'
         err("{0} package {1}!".format(dep_err, pkg))
-        unresolved = current.ebuild.get_unresolved()
         for dep in unresolved:
             err(" unresolved: \"{}\"".format(dep))
-        return None, current.ebuild.get_unresolved(), None
-    except KeyError as ke:
-        err("Failed to parse data for package {}!".format(pkg))
-        raise ke
+        return None, unresolved, None
     make_dir(
         "{}/ros-{}/{}".format(overlay.repo.repo_dir, distro.name, pkg)
     )
@@ -106,20 +129,32 @@ def regenerate_pkg(overlay, pkg, distro, preserve_existing=False):
             overlay.repo.repo_dir,
             distro.name, pkg, version
         )
-        ebuild_file = open(ebuild_file, "w")
         metadata_file = '{0}/ros-{1}/{2}/metadata.xml'.format(
             overlay.repo.repo_dir,
             distro.name, pkg
         )
-        metadata_file = open(metadata_file, "w")
-        ebuild_file.write(ebuild_text)
-        metadata_file.write(metadata_text)
+        with timed_phase('write'), open(ebuild_file, "w") as ebuild_file, \
+                open(metadata_file, "w") as metadata_file:
+            ebuild_file.write(ebuild_text)
+            metadata_file.write(metadata_text)
     except Exception as e:
         err("Failed to write ebuild/metadata to disk!")
         raise e
     return current, previous_version, pkg
 
 
+def render_ebuild(current):
+    """
+    Return the ebuild and metadata.xml text of a gentoo_ebuild, and the
+    dependencies that could not be resolved, if any, in which case there is
+    no ebuild text.
+    """
+    try:
+        return current.ebuild_text(), current.metadata_text(), []
+    except UnresolvedDependency:
+        return None, None, current.ebuild.get_unresolved()
+
+
 def _package_condition_context(rosdistro_name):
     distro_properties = get_distros()[rosdistro_name]
     ros_version = None
@@ -147,11 +182,13 @@ def _package_condition_context(rosdistro_name):
 
 
 def _gen_metadata_for_package(
-    distro, pkg_name, repo, ros_pkg, pkg_rosinstall
+    distro, pkg_name, repo, pkg_rosinstall
 ):
     pkg_metadata_xml = metadata_xml()
     try:
-        pkg_xml = retry_on_exception(ros_pkg.get_package_xml, distro.name)
+        pkg_xml = retry_on_exception(get_package_xml, distro, pkg_name)
+    except OfflineCacheMiss:
+        raise
     except Exception:
         warn("fetch metadata for package {}".format(pkg_name))
         return pkg_metadata_xml
@@ -167,40 +204,39 @@ def _gen_metadata_for_package(
 
 
 def _gen_ebuild_for_package(
-    distro, pkg_name, pkg, repo, ros_pkg, pkg_rosinstall
+    distro, pkg_name, pkg, repo, pkg_rosinstall
 ):
     pkg_ebuild = Ebuild()
 
     pkg_ebuild.distro = distro.name
     pkg_ebuild.src_uri = pkg_rosinstall[0]['tar']['uri']
-    pkg_names = get_package_names(distro)
+    pkg_index = get_package_index(distro)
     package_condition_context = _package_condition_context(distro.name)
-    pkg_dep_walker = DependencyWalker(
-        distro,
-        evaluate_condition_context=package_condition_context)
+    pkg_deps = get_dependency_graph(distro).get_all_depends(
+        pkg_name, package_condition_context)
 
-    pkg_buildtool_deps = pkg_dep_walker.get_depends(pkg_name, "buildtool")
-    pkg_build_deps = pkg_dep_walker.get_depends(pkg_name, "build")
-    pkg_run_deps = pkg_dep_walker.get_depends(pkg_name, "run")
-    pkg_test_deps = pkg_dep_walker.get_depends(pkg_name, "test")
+    pkg_buildtool_deps = pkg_deps["buildtool"]
+    pkg_build_deps = pkg_deps["build"]
+    pkg_run_deps = pkg_deps["run"]
+    pkg_test_deps = pkg_deps["test"]
 
     pkg_keywords = ['x86', 'amd64', 'arm', 'arm64']
 
     # add run dependencies
     for rdep in pkg_run_deps:
-        pkg_ebuild.add_run_depend(rdep, rdep in pkg_names[0])
+        pkg_ebuild.add_run_depend(rdep, rdep in pkg_index)
 
     # add build dependencies
     for bdep in pkg_build_deps:
-        pkg_ebuild.add_build_depend(bdep, bdep in pkg_names[0])
+        pkg_ebuild.add_build_depend(bdep, bdep in pkg_index)
 
     # add build tool dependencies
     for tdep in pkg_buildtool_deps:
-        pkg_ebuild.add_build_depend(tdep, tdep in pkg_names[0])
+        pkg_ebuild.add_build_depend(tdep, tdep in pkg_index)
 
     # add test dependencies
     for test_dep in pkg_test_deps:
-        pkg_ebuild.add_test_depend(test_dep, test_dep in pkg_names[0])
+        pkg_ebuild.add_test_depend(test_dep, test_dep in pkg_index)
 
     # add keywords
     for key in pkg_keywords:
@@ -208,7 +244,9 @@ def _gen_ebuild_for_package(
 
     # parse through package xml
     try:
-        pkg_xml = retry_on_exception(ros_pkg.get_package_xml, distro.name)
+        pkg_xml = retry_on_exception(get_package_xml, distro, pkg_name)
+    except OfflineCacheMiss:
+        raise
     except Exception:
         warn("fetch metadata for package {}".format(pkg_name))
         return pkg_ebuild
@@ -224,8 +262,7 @@ def _gen_ebuild_for_package(
 class gentoo_ebuild(object):
     def __init__(self, distro, pkg_name, has_patches=False):
         pkg = distro.release_packages[pkg_name]
-        repo = distro.repositories[pkg.repository_name].release_repository
-        ros_pkg = RosPackage(pkg_name, repo)
+        repo = get_package_index(distro).get_repository(pkg_name)
 
         pkg_rosinstall =\
             _generate_rosinstall(pkg_name, repo.url,
@@ -233,10 +270,10 @@ class gentoo_ebuild(object):
 
         self.metadata_xml =\
             _gen_metadata_for_package(distro, pkg_name,
-                                      repo, ros_pkg, pkg_rosinstall)
+                                      repo, pkg_rosinstall)
         self.ebuild =\
             _gen_ebuild_for_package(distro, pkg_name,
-                                    pkg, repo, ros_pkg, pkg_rosinstall)
+                                    pkg, repo, pkg_rosinstall)
         self.ebuild.has_patches = has_patches
 
         if pkg_name in no_python3:
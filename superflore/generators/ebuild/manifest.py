@@ -0,0 +1,129 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Write the Manifests of the generated ebuilds without repoman.
+
+The overlay uses thin Manifests, which only hold the DIST entries of the
+distfiles: their size and their BLAKE2B and SHA512 hashes. These are
+computed from the release archives of the archive cache, which the nix
+generator shares, and kept in a hash cache keyed by SRC_URI, so that an
+archive is only downloaded and hashed again when its SRC_URI changed.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import re
+
+from superflore.DownloadManager import DownloadManager
+from superflore.generators.nix.nix_package import NixPackage
+from superflore.PackageIndex import get_package_index
+from superflore.utils import err
+from superflore.utils import info
+from superflore.utils import ok
+
+MANIFEST_HASHES = ('BLAKE2B', 'SHA512')
+
+
+def get_distfile_name(pkg_name, distro_name, version):
+    """
+    Return the name the SRC_URI of the ebuild gives to the release
+    archive (see Ebuild.get_ebuild_text).
+    """
+    # ${PV} is the version without its revision
+    return '{0}-{1}-release-{2}.tar.gz'.format(
+        pkg_name, distro_name, re.sub(r'-r[0-9]+$', '', version))
+
+
+def hash_distfile(filename, chunk_size=1 << 20):
+    """Return the size of the file and its hashes, by MANIFEST_HASHES."""
+    blake2b = hashlib.blake2b()
+    sha512 = hashlib.sha512()
+    size = 0
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            blake2b.update(chunk)
+            sha512.update(chunk)
+            size += len(chunk)
+    return size, {
+        'BLAKE2B': blake2b.hexdigest(),
+        'SHA512': sha512.hexdigest(),
+    }
+
+
+def get_manifest_text(dists):
+    """
+    Return the text of a thin Manifest, given a dict mapping the distfile
+    names to their size and hashes.
+    """
+    return ''.join(
+        'DIST {0} {1} {2}\n'.format(name, size, ' '.join(
+            '{0} {1}'.format(h, hashes[h]) for h in MANIFEST_HASHES))
+        for name, (size, hashes) in sorted(dists.items())
+    )
+
+
+def write_manifests(
+    repo_dir, distro, pkg_names, tar_dir, hash_cache, jobs=8
+):
+    """
+    Write the Manifest of the ebuilds of the packages in
+    <repo_dir>/ros-<distro>.
+
+    The archives whose SRC_URI is not in hash_cache are downloaded to
+    tar_dir, unless they are already there, and hashed, with jobs
+    concurrent downloads and hashes. Returns the packages whose Manifest
+    could not be written.
+    """
+    pkg_index = get_package_index(distro)
+    src_uris = {pkg: pkg_index.get_src_uri(pkg) for pkg in sorted(pkg_names)}
+    archives = {
+        pkg: NixPackage.get_archive_path(pkg, distro, tar_dir)
+        for pkg, src_uri in src_uris.items() if src_uri not in hash_cache
+    }
+    info('{0} of {1} distfiles of {2} already hashed'.format(
+        len(src_uris) - len(archives), len(src_uris), distro.name))
+    if archives:
+        with DownloadManager(jobs=jobs) as download_manager:
+            download_manager.fetch_all(
+                (src_uris[pkg], archive_path)
+                for pkg, archive_path in archives.items())
+
+    def hash_archive(pkg):
+        try:
+            hash_cache[src_uris[pkg]] = hash_distfile(archives[pkg])
+        except OSError as e:
+            err("Failed to hash the distfile of '{0}': {1}".format(pkg, e))
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        list(executor.map(hash_archive, archives))
+    failed = []
+    for pkg, src_uri in src_uris.items():
+        if src_uri not in hash_cache:
+            failed.append(pkg)
+            continue
+        distfile = get_distfile_name(
+            pkg, distro.name, pkg_index.get_version(pkg))
+        manifest_file = os.path.join(
+            repo_dir, 'ros-{0}'.format(distro.name), pkg, 'Manifest')
+        try:
+            with open(manifest_file, 'w') as f:
+                f.write(get_manifest_text({distfile: hash_cache[src_uri]}))
+        except OSError as e:
+            err("Failed to write '{0}': {1}".format(manifest_file, e))
+            failed.append(pkg)
+    ok('Wrote {0} / {1} Manifests of {2}'.format(
+        len(src_uris) - len(failed), len(src_uris), distro.name))
+    return failed
@@ -12,15 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
 import os
 import time
 
-import docker
+from superflore.CacheManager import CacheManager
 from superflore.docker import Docker
+from superflore.generators.ebuild.manifest import write_manifests
 from superflore.repo_instance import RepoInstance
+from superflore.utils import err
 from superflore.utils import info
 from superflore.utils import rand_ascii_str
 
+_MANIFEST_FAILED = 'superflore: failed to regenerate the Manifest of '
+
 
 class RosOverlay(object):
     def __init__(
@@ -39,7 +44,7 @@ class RosOverlay(object):
 
     def commit_changes(self, distro):
         info('Adding changes...')
-        self.repo.git.add(self.repo.repo_dir)
+        self.repo.add_files(self.repo.repo_dir)
         if self.repo.git.status('--porcelain') == '':
             info('Nothing changed; no commit done')
         else:
@@ -59,13 +64,38 @@ class RosOverlay(object):
             commit_msg = commit_msg.format(timestamp, distro)
             self.repo.git.commit(m='{0}'.format(commit_msg))
 
+    def write_manifests(self, distro, pkg_names, tar_dir, jobs=8):
+        """
+        Write the Manifests of the packages of the distro without repoman,
+        from the archives of tar_dir (see manifest.write_manifests).
+        Returns the packages which failed, as 'ros-<distro>/<pkg>'.
+        """
+        with CacheManager(
+            os.path.join(tar_dir, 'manifest_cache.pickle')
+        ) as hash_cache:
+            failed = write_manifests(
+                self.repo.repo_dir, distro, pkg_names, tar_dir, hash_cache,
+                jobs)
+        return ['ros-{0}/{1}'.format(distro.name, pkg) for pkg in failed]
+
     def regenerate_manifests(
         self,
         regen_dict,
         image_owner='allenh1',
         image_name='ros_gentoo_base',
-        split_limit=1000
+        split_limit=1000,
+        jobs=1
     ):
+        """
+        Regenerate the Manifests of the packages of regen_dict, a dict
+        mapping distros to package names, with repoman.
+
+        The packages are split in chunks of at most split_limit packages,
+        each regenerated in its own container, up to jobs containers at a
+        time. A package whose Manifest can't be regenerated doesn't stop
+        the rest of its chunk. Returns the packages which failed, as
+        'ros-<distro>/<pkg>'.
+        """
         info(
             "Pulling docker image '%s/%s:latest'..." % (
                 image_owner, image_name
@@ -73,38 +103,59 @@ class RosOverlay(object):
         )
         dock = Docker()
         dock.pull(image_owner, image_name)
-        info('Running docker image...')
+        pkgs = [
+            'ros-{0}/{1}'.format(distro, pkg)
+            for distro in sorted(regen_dict)
+            for pkg in sorted(regen_dict[distro])
+        ]
+        if not pkgs:
+            return []
+        jobs = max(jobs, 1)
+        # give every container some work when there are fewer packages
+        # than jobs * split_limit
+        chunk_size = max(1, min(split_limit, -(-len(pkgs) // jobs)))
+        chunk_list = [
+            pkgs[i:i + chunk_size] for i in range(0, len(pkgs), chunk_size)
+        ]
+        info("Regeneration list consists of '%d' chunks" % len(chunk_list))
         info('Generating manifests...')
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            failed = [
+                pkg
+                for chunk_failed in executor.map(
+                    lambda chunk: self._regenerate_chunk(dock.image, chunk),
+                    chunk_list)
+                for pkg in chunk_failed
+            ]
+        for pkg in failed:
+            err("Failed to regenerate the Manifest of '%s'" % pkg)
+        return failed
+
+    def _regenerate_chunk(self, image, chunk):
+        from docker.errors import ContainerError
+        dock = Docker()
+        dock.image = image
         dock.map_directory(
             '/home/%s/.gnupg' % os.getenv('USER'),
             '/root/.gnupg'
         )
         dock.map_directory(self.repo.repo_dir, '/tmp/ros-overlay')
-        for distro in regen_dict.keys():
-            chunk_list = []
-            pkg_list = regen_dict[distro]
-            while len(pkg_list) > 0:
-                current_chunk = list()
-                for x in range(split_limit):
-                    if len(pkg_list) > 0:
-                        current_chunk.append(pkg_list.pop())
-                    else:
-                        break
-                chunk_list.append(current_chunk)
-            info("Regeneration list consists of '%d' chunks" % len(chunk_list))
-            info("key_lists: '%s'" % chunk_list)
-            for chunk in chunk_list:
-                for pkg in chunk:
-                    pkg_dir = '/tmp/ros-overlay/ros-{0}/{1}'.format(distro,
-                                                                    pkg)
-                    dock.add_bash_command('cd {0}'.format(pkg_dir))
-                    dock.add_bash_command('repoman manifest')
-                try:
-                    dock.run(show_cmd=True)
-                    dock.clear_commands()
-                except docker.errors.ContainerError:
-                    print(dock.log)
-                    raise
+        for pkg in chunk:
+            # the commands of the chunk are chained with &&, so report the
+            # failure of a package instead of failing the command
+            dock.add_bash_command(
+                '{{ cd /tmp/ros-overlay/{0} && repoman manifest || '
+                'echo "{1}{0}"; }}'.format(pkg, _MANIFEST_FAILED))
+        try:
+            dock.run(show_cmd=True)
+        except ContainerError:
+            print(dock.log)
+            return list(chunk)
+        return [
+            line[len(_MANIFEST_FAILED):].strip()
+            for line in dock.log.splitlines()
+            if line.startswith(_MANIFEST_FAILED)
+        ]
 
     def pull_request(self, message, overlay=None, title=''):
         if not title:
@@ -12,38 +12,135 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import os
 import sys
 
 from rosinstall_generator.distro import get_distro
+from superflore.DependencyGraph import get_dependency_graph
 from superflore.exceptions import NoGitHubAuthToken
+from superflore.exceptions import OfflineCacheMiss
 from superflore.generate_installers import generate_installers
+from superflore.generators.ebuild.gen_packages import \
+    _package_condition_context
+from superflore.generators.ebuild.gen_packages import \
+    get_fingerprint_manager
 from superflore.generators.ebuild.gen_packages import regenerate_pkg
 from superflore.generators.ebuild.overlay_instance import RosOverlay
 from superflore.parser import get_parser
+from superflore.RenderPool import RenderPool
 from superflore.repo_instance import RepoInstance
+from superflore.repo_instance import set_clone_options
+from superflore.rosdep_support import set_refresh_view_snapshots
 from superflore.TempfileManager import TempfileManager
+from superflore.timing import write_report
 from superflore.utils import clean_up
 from superflore.utils import err
 from superflore.utils import file_pr
 from superflore.utils import gen_delta_msg
 from superflore.utils import gen_missing_deps_msg
+from superflore.utils import get_cache_dir
 from superflore.utils import get_distros_by_status
 from superflore.utils import info
+from superflore.utils import is_offline
 from superflore.utils import load_pr
+from superflore.utils import make_dir
 from superflore.utils import ok
 from superflore.utils import save_pr
+from superflore.utils import set_cache_dir
+from superflore.utils import set_offline
 from superflore.utils import url_to_repo_org
 from superflore.utils import warn
 
 
+def update_manifests(overlay, args, distros, regen_dict):
+    """
+    Regenerate the Manifests of the packages of regen_dict, a dict mapping
+    distro names to package names, and return the packages which failed.
+    """
+    if args.repoman_manifests:
+        if is_offline():
+            warn('Offline, not regenerating the Manifests')
+            return []
+        return overlay.regenerate_manifests(
+            regen_dict, jobs=args.manifest_jobs)
+    failed = []
+    for distro_name in sorted(regen_dict):
+        failed += overlay.write_manifests(
+            distros[distro_name], regen_dict[distro_name],
+            args.tar_archive_dir, args.download_jobs)
+    return failed
+
+
+def gen_failed_manifests_msg(failed_list):
+    """Return string of the packages without a Manifest for the PR message."""
+    if not failed_list:
+        return ''
+    msg = "\nFailed Manifests:\n"
+    msg += "=================\n"
+    for pkg in sorted(failed_list):
+        msg += " * [ ] {0}\n".format(pkg)
+    return msg
+
+
 def main():
     overlay = None
     preserve_existing = True
     parser = get_parser('Deploy ROS packages into Gentoo Linux')
+    parser.add_argument(
+        '--incremental',
+        help='only regenerate packages whose inputs changed since the '
+             + 'last generation',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--tar-archive-dir',
+        help='location to store archived packages (default: the archives '
+             + 'directory of the cache directory)',
+        type=str
+    )
+    parser.add_argument(
+        '--download-jobs',
+        help='number of archives to download and hash concurrently',
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        '--repoman-manifests',
+        help='regenerate the Manifests with repoman in Docker containers',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--manifest-jobs',
+        help='number of containers regenerating the Manifests at a time '
+             + '(with --repoman-manifests)',
+        type=int,
+        default=1
+    )
     args = parser.parse_args(sys.argv[1:])
     pr_comment = args.pr_comment
     skip_keys = args.skip_keys or []
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
+    set_clone_options(args.clone_depth, args.clone_filter)
+    if args.offline:
+        if not args.dry_run:
+            parser.error('Invalid args! --offline requires --dry-run')
+        if not args.output_repository_path:
+            parser.error('Invalid args! --offline requires specifying '
+                         '--output-repository-path')
+        try:
+            set_offline()
+        except OfflineCacheMiss as e:
+            parser.error(e.message)
+    if args.tar_archive_dir:
+        make_dir(args.tar_archive_dir)
+    else:
+        args.tar_archive_dir = get_cache_dir('archives')
+    if args.timing_report:
+        atexit.register(write_report, args.timing_report)
+    if args.refresh_rosdep_views:
+        set_refresh_view_snapshots()
     selected_targets = None
     if not args.dry_run:
         if 'SUPERFLORE_GITHUB_TOKEN' not in os.environ:
@@ -108,6 +205,7 @@ def main():
         total_installers = dict()
         total_broken = set()
         total_changes = dict()
+        distros = dict()
         if args.only:
             pr_comment = pr_comment or (
                 'Superflore ebuild generator began regeneration of ' +
@@ -119,6 +217,7 @@ def main():
             missing_depends = set()
             to_commit = set()
             will_file_pr = False
+            distro = get_distro(args.ros_distro)
             for pkg in args.only:
                 if pkg in skip_keys:
                     warn("Package '%s' is in skip-keys list, skipping..."
@@ -129,7 +228,7 @@ def main():
                     ebuild, deps, version = regenerate_pkg(
                         overlay,
                         pkg,
-                        get_distro(args.ros_distro),
+                        distro,
                         preserve_existing
                     )
                     if not ebuild:
@@ -148,9 +247,11 @@ def main():
             # Commit changes and file pull request
             regen_dict = dict()
             regen_dict[args.ros_distro] = to_commit
-            overlay.regenerate_manifests(regen_dict)
+            failed_manifests = update_manifests(
+                overlay, args, {args.ros_distro: distro}, regen_dict)
             overlay.commit_changes(args.ros_distro)
             delta = "Regenerated: '%s'\n" % args.only
+            delta += gen_failed_manifests_msg(failed_manifests)
             if args.dry_run:
                 save_pr(
                     overlay,
@@ -168,21 +269,33 @@ def main():
             ok('Successfully synchronized repositories!')
             sys.exit(0)
 
-        for distro in selected_targets:
-            distro_installers, distro_broken, distro_changes =\
-                generate_installers(
-                    get_distro(distro),
-                    overlay=overlay,
-                    gen_pkg_func=regenerate_pkg,
-                    preserve_existing=preserve_existing,
-                    skip_keys=skip_keys,
-                )
+        for distro_name in selected_targets:
+            distro = get_distro(distro_name)
+            get_dependency_graph(distro).precompute(jobs=args.jobs)
+            get_dependency_graph(distro).resolve_external_depends(
+                'gentoo', _package_condition_context(distro_name),
+                ('buildtool', 'build', 'run', 'test'))
+            with get_fingerprint_manager(
+                overlay, distro_name, args.incremental
+            ) as fingerprints, RenderPool(args.render_jobs) as render_pool:
+                distro_installers, distro_broken, distro_changes =\
+                    generate_installers(
+                        distro,
+                        overlay,
+                        regenerate_pkg,
+                        preserve_existing,
+                        render_pool,
+                        skip_keys=skip_keys,
+                        jobs=args.jobs,
+                        fingerprints=fingerprints,
+                    )
             for key in distro_broken.keys():
                 for pkg in distro_broken[key]:
                     total_broken.add(pkg)
 
-            total_changes[distro] = distro_changes
-            total_installers[distro] = distro_installers
+            total_changes[distro_name] = distro_changes
+            total_installers[distro_name] = distro_installers
+            distros[distro_name] = distro
 
         num_changes = 0
         for distro_name in total_changes:
@@ -199,7 +312,8 @@ def main():
         missing_deps = gen_missing_deps_msg(total_broken)
 
         # Commit changes and file pull request
-        overlay.regenerate_manifests(total_installers)
+        delta += gen_failed_manifests_msg(update_manifests(
+            overlay, args, distros, total_installers))
         overlay.commit_changes('all' if args.all else args.ros_distro)
 
         if args.dry_run:
@@ -11,15 +11,22 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from contextlib import nullcontext
 import os
 import re
 from typing import Dict, Iterable
 
 from rosdistro import DistributionFile
-from rosinstall_generator.distro import get_package_names
+from superflore.DownloadManager import DownloadManager
 from superflore.exceptions import UnresolvedDependency
+from superflore.FingerprintManager import FingerprintManager
+from superflore.FingerprintManager import FINGERPRINTS_FILENAME
 from superflore.generators.nix.nix_package import NixPackage
 from superflore.generators.nix.nix_package_set import NixPackageSet
+from superflore.PackageIndex import get_package_index
+from superflore.PackageXmlCache import get_package_xml_cache
+from superflore.RenderPool import RenderPool
+from superflore.timing import timed_phase
 from superflore.utils import err
 from superflore.utils import make_dir
 from superflore.utils import ok
@@ -31,19 +38,37 @@ org_license = "BSD"
 _version_regex = re.compile(r"version\s*=\s*\"([^\"]*)\"")
 
 
+def get_fingerprint_manager(overlay, distro_name: str, incremental=True):
+    """
+    Return the FingerprintManager of the distro's derivations, or a context
+    yielding None when not regenerating incrementally.
+    """
+    if not incremental:
+        return nullcontext()
+    return FingerprintManager(
+        os.path.join(overlay.repo.repo_dir, 'distros', distro_name,
+                     FINGERPRINTS_FILENAME),
+        'nix'
+    )
+
+
+def get_package_file(overlay, distro_name: str, pkg: str) -> str:
+    return os.path.join(overlay.repo.repo_dir, 'distros', distro_name,
+                        NixPackage.normalize_name(pkg), 'default.nix')
+
+
 def regenerate_pkg(overlay, pkg: str, distro: DistributionFile,
                    preserve_existing: bool, tar_dir: str,
-                   sha256_cache: Dict[str, str]):
-    all_pkgs = set(get_package_names(distro)[0])
+                   sha256_cache: Dict[str, str], render_pool=None):
+    all_pkgs = get_package_index(distro).names
 
     if pkg not in all_pkgs:
         raise RuntimeError("Unknown package '{}'".format(pkg))
 
     normalized_pkg = NixPackage.normalize_name(pkg)
 
-    package_dir = os.path.join(overlay.repo.repo_dir, 'distros', distro.name,
-                               normalized_pkg)
-    package_file = os.path.join(package_dir, 'default.nix')
+    package_file = get_package_file(overlay, distro.name, pkg)
+    package_dir = os.path.dirname(package_file)
     make_dir(package_dir)
 
     # check for an existing package
@@ -73,7 +98,10 @@ def regenerate_pkg(overlay, pkg: str, distro: DistributionFile,
         raise e
 
     try:
-        derivation_text = current.derivation.get_text(org, org_license)
+        derivation = current.derivation
+        with timed_phase('render'):
+            derivation_text = (render_pool or RenderPool()).render(
+                derivation.get_text, org, org_license)
     except UnresolvedDependency:
         err("'Failed to resolve required dependencies for package {}!"
             .format(pkg))
@@ -87,7 +115,8 @@ def regenerate_pkg(overlay, pkg: str, distro: DistributionFile,
 
     ok("Successfully generated derivation for package '{}'.".format(pkg))
     try:
-        with open('{0}'.format(package_file), "w") as recipe_file:
+        with timed_phase('write'), \
+                open('{0}'.format(package_file), "w") as recipe_file:
             recipe_file.write(derivation_text)
     except Exception as e:
         err("Failed to write derivation to disk!")
@@ -95,6 +124,62 @@ def regenerate_pkg(overlay, pkg: str, distro: DistributionFile,
     return current, previous_version, normalized_pkg
 
 
+def prefetch_archives(overlay, distro: DistributionFile,
+                      pkg_names: Iterable[str], preserve_existing: bool,
+                      tar_dir: str, sha256_cache: Dict[str, str], jobs=8,
+                      fingerprints=None):
+    """
+    Download the source archives of the packages that regenerate_pkg will
+    need ahead of generation, recording their SHA256 and storing their
+    package.xml in the caches.
+    """
+    download_archives(
+        distro, [
+            pkg for pkg in pkg_names
+            if not (_is_preserved(distro, pkg, preserve_existing,
+                                  fingerprints)
+                    and os.path.exists(
+                        get_package_file(overlay, distro.name, pkg)))
+        ], tar_dir, sha256_cache, jobs)
+
+
+def download_archives(distro: DistributionFile, pkg_names: Iterable[str],
+                      tar_dir: str, sha256_cache: Dict[str, str], jobs=8):
+    """
+    Download the source archives of the packages to tar_dir, recording
+    their SHA256 and storing their package.xml in the caches.
+    """
+    pkg_index = get_package_index(distro)
+    archives = {
+        NixPackage.get_archive_path(pkg, distro, tar_dir): pkg
+        for pkg in sorted(pkg_names)
+    }
+    with DownloadManager(sha256_cache, jobs) as download_manager:
+        package_xmls = download_manager.fetch_all(
+            [(pkg_index.get_src_uri(pkg), archive_path)
+             for archive_path, pkg in archives.items()],
+            NixPackage.package_xml_regex)
+    package_xml_cache = get_package_xml_cache()
+    for archive_path, package_xml in package_xmls.items():
+        if package_xml is not None:
+            pkg = archives[archive_path]
+            package_xml_cache.put(pkg_index.get_repository(pkg).url,
+                                  pkg_index.get_release_tag(pkg),
+                                  package_xml)
+
+
+def _is_preserved(distro, pkg, preserve_existing, fingerprints):
+    if preserve_existing:
+        return True
+    if fingerprints is None:
+        return False
+    try:
+        return fingerprints.is_unchanged(
+            pkg, fingerprints.compute(distro, pkg))
+    except Exception:
+        return False
+
+
 def regenerate_pkg_set(overlay, distro_name: str, pkg_names: Iterable[str]):
     distro_dir = os.path.join(overlay.repo.repo_dir, 'distros', distro_name)
     overlay_file = os.path.join(distro_dir, 'generated.nix')
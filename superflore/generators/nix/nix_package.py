@@ -1,20 +1,20 @@
-import hashlib
 import itertools
 import os
 import re
-import tarfile
 from typing import Dict, Iterable, Set
 
 from rosdistro import DistributionFile
-from rosdistro.dependency_walker import DependencyWalker
-from rosdistro.rosdistro import RosPackage
-from rosinstall_generator.distro import _generate_rosinstall
+from superflore.DependencyGraph import get_dependency_graph
 from superflore.exceptions import UnresolvedDependency
 from superflore.generators.nix.nix_expression import NixExpression, NixLicense
+from superflore.PackageIndex import get_package_index
 from superflore.PackageMetadata import PackageMetadata
+from superflore.PackageXmlCache import get_package_xml
+from superflore.PackageXmlCache import get_package_xml_cache
+from superflore.timing import timed_phase
 from superflore.utils import (download_file, get_distro_condition_context,
-                              get_distros, get_pkg_version, info, resolve_dep,
-                              retry_on_exception, warn)
+                              get_distros, info, resolve_dep,
+                              retry_on_exception, scan_archive, warn)
 
 
 class NixPackage:
@@ -22,73 +22,70 @@ class NixPackage:
     Retrieves the required metadata to define a Nix package derivation.
     """
 
+    package_xml_regex = re.compile(r'^[^/]+/package\.xml$')
+
     def __init__(self, name: str, distro: DistributionFile, tar_dir: str,
                  sha256_cache: Dict[str, str], all_pkgs: Set[str]) -> None:
         self.distro = distro
         self._all_pkgs = all_pkgs
 
+        pkg_index = get_package_index(distro)
         pkg = distro.release_packages[name]
-        repo = distro.repositories[pkg.repository_name].release_repository
-        ros_pkg = RosPackage(name, repo)
+        repo = pkg_index.get_repository(name)
 
-        rosinstall = _generate_rosinstall(name, repo.url,
-                                          repo.get_release_tag(name), True)
+        release_tag = pkg_index.get_release_tag(name)
 
         normalized_name = NixPackage.normalize_name(name)
-        version = get_pkg_version(distro, name)
-        src_uri = rosinstall[0]['tar']['uri']
+        version = pkg_index.get_version(name)
+        src_uri = pkg_index.get_src_uri(name)
 
-        archive_path = os.path.join(tar_dir, '{}-{}-{}.tar.gz'
-                                    .format(self.normalize_name(name),
-                                            version, distro.name))
+        archive_path = NixPackage.get_archive_path(name, distro, tar_dir)
 
-        downloaded_archive = False
+        # The package.xml is extracted from the source archive while it is
+        # hashed, which is much faster than downloading it from GitHub.
+        package_xml_regex = NixPackage.package_xml_regex
+        package_xml_cache = get_package_xml_cache()
+        cached_package_xml = package_xml_cache.get(repo.url, release_tag)
+        package_xml = cached_package_xml
         if os.path.exists(archive_path):
             info("using cached archive for package '{}'...".format(name))
+            if archive_path not in sha256_cache or package_xml is None:
+                with timed_phase('download'), \
+                        open(archive_path, 'rb') as archive:
+                    sha256_cache[archive_path], archive_package_xml = \
+                        scan_archive(archive, package_xml_regex)
+                package_xml = package_xml or archive_package_xml
         else:
             info("downloading archive version for package '{}'..."
                  .format(name))
-            retry_on_exception(download_file, src_uri, archive_path,
-                               retry_msg="network error downloading '{}'"
-                               .format(src_uri),
-                               error_msg="failed to download archive for '{}'"
-                               .format(name))
-            downloaded_archive = True
-
-        if downloaded_archive or archive_path not in sha256_cache:
-            sha256_cache[archive_path] = hashlib.sha256(
-                open(archive_path, 'rb').read()).hexdigest()
+            with timed_phase('download'):
+                sha256_cache[archive_path], package_xml = retry_on_exception(
+                    download_file, src_uri, archive_path, package_xml_regex,
+                    retry_msg="network error downloading '{}'".format(
+                        src_uri),
+                    error_msg="failed to download archive for '{}'".format(
+                        name))
         src_sha256 = sha256_cache[archive_path]
 
-        # We already have the archive, so try to extract package.xml from it.
-        # This is much faster than downloading it from GitHub.
-        package_xml_regex = re.compile(r'^[^/]+/package\.xml$')
-        package_xml = None
-        archive = tarfile.open(archive_path, 'r|*')
-        for file in archive:
-            if package_xml_regex.match(file.name):
-                package_xml = archive.extractfile(file).read()
-                break
-        # Fallback to the standard method of fetching package.xml
         if package_xml is None:
+            # Fallback to the standard method of fetching package.xml
             warn("failed to extract package.xml from archive")
-            package_xml = retry_on_exception(ros_pkg.get_package_xml,
-                                             distro.name)
+            package_xml = retry_on_exception(get_package_xml, distro, name)
+        elif cached_package_xml is None:
+            package_xml_cache.put(repo.url, release_tag, package_xml)
 
         metadata = PackageMetadata(
             package_xml, NixPackage._get_condition_context(distro.name))
 
-        dep_walker = DependencyWalker(distro,
-                                      get_distro_condition_context(
-                                          distro.name))
+        deps = get_dependency_graph(distro).get_all_depends(
+            pkg.name, get_distro_condition_context(distro.name))
 
-        buildtool_deps = dep_walker.get_depends(pkg.name, "buildtool")
-        buildtool_export_deps = dep_walker.get_depends(
-            pkg.name, "buildtool_export")
-        build_deps = dep_walker.get_depends(pkg.name, "build")
-        build_export_deps = dep_walker.get_depends(pkg.name, "build_export")
-        exec_deps = dep_walker.get_depends(pkg.name, "exec")
-        test_deps = dep_walker.get_depends(pkg.name, "test")
+        buildtool_deps = deps["buildtool"]
+        buildtool_export_deps = deps["buildtool_export"]
+        build_deps = deps["build"]
+        build_export_deps = deps["build_export"]
+        exec_deps = deps["exec"]
+        test_deps = deps["test"]
 
         self.unresolved_dependencies = set()
 
@@ -116,7 +113,7 @@ class NixPackage:
             src_url=src_uri,
             src_sha256=src_sha256,
             description=metadata.description,
-            licenses=map(NixLicense, metadata.upstream_license),
+            licenses=list(map(NixLicense, metadata.upstream_license)),
             distro_name=distro.name,
             build_type=metadata.build_type,
             build_inputs=build_inputs,
@@ -157,6 +154,16 @@ class NixPackage:
             NixPackage._get_ros_python_version(distro))
         return context
 
+    @staticmethod
+    def get_archive_path(name: str, distro: DistributionFile,
+                         tar_dir: str) -> str:
+        """
+        Return where the source archive of the package is stored.
+        """
+        return os.path.join(tar_dir, '{}-{}-{}.tar.gz'.format(
+            NixPackage.normalize_name(name),
+            get_package_index(distro).get_version(name), distro.name))
+
     @staticmethod
     def normalize_name(name: str) -> str:
         """
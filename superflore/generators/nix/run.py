@@ -12,28 +12,43 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import os
 import sys
 
 from rosinstall_generator.distro import get_distro
 from superflore.CacheManager import CacheManager
+from superflore.DependencyGraph import get_dependency_graph
 from superflore.exceptions import NoGitHubAuthToken
+from superflore.exceptions import OfflineCacheMiss
 from superflore.generate_installers import generate_installers
+from superflore.generators.nix.gen_packages import \
+    get_fingerprint_manager
+from superflore.generators.nix.gen_packages import prefetch_archives
 from superflore.generators.nix.gen_packages import regenerate_pkg, \
     regenerate_pkg_set
 from superflore.generators.nix.nix_ros_overlay import NixRosOverlay
+from superflore.PackageIndex import get_package_index
 from superflore.parser import get_parser
+from superflore.RenderPool import RenderPool
 from superflore.repo_instance import RepoInstance
+from superflore.repo_instance import set_clone_options
+from superflore.rosdep_support import set_refresh_view_snapshots
 from superflore.TempfileManager import TempfileManager
+from superflore.timing import write_report
 from superflore.utils import clean_up, get_distros_by_status
 from superflore.utils import err
 from superflore.utils import file_pr
 from superflore.utils import gen_delta_msg
 from superflore.utils import gen_missing_deps_msg
+from superflore.utils import get_cache_dir
+from superflore.utils import get_distro_condition_context
 from superflore.utils import info
 from superflore.utils import load_pr
 from superflore.utils import ok
 from superflore.utils import save_pr
+from superflore.utils import set_cache_dir
+from superflore.utils import set_offline
 from superflore.utils import url_to_repo_org
 from superflore.utils import warn
 
@@ -46,9 +61,40 @@ def main():
         help='location to store archived packages',
         type=str
     )
+    parser.add_argument(
+        '--download-jobs',
+        help='number of archives to download concurrently',
+        type=int,
+        default=8
+    )
+    parser.add_argument(
+        '--incremental',
+        help='only regenerate packages whose inputs changed since the '
+             + 'last generation',
+        action='store_true'
+    )
     args = parser.parse_args(sys.argv[1:])
     pr_comment = args.pr_comment
     skip_keys = args.skip_keys or []
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
+    set_clone_options(args.clone_depth, args.clone_filter)
+    if args.offline:
+        if not args.dry_run:
+            parser.error('Invalid args! --offline requires --dry-run')
+        if not args.output_repository_path:
+            parser.error('Invalid args! --offline requires specifying '
+                         '--output-repository-path')
+        try:
+            set_offline()
+        except OfflineCacheMiss as e:
+            parser.error(e.message)
+        if not args.tar_archive_dir:
+            args.tar_archive_dir = get_cache_dir('archives')
+    if args.timing_report:
+        atexit.register(write_report, args.timing_report)
+    if args.refresh_rosdep_views:
+        set_refresh_view_snapshots()
     selected_targets = None
     if not args.dry_run:
         if 'SUPERFLORE_GITHUB_TOKEN' not in os.environ:
@@ -121,6 +167,12 @@ def main():
         with TempfileManager(args.tar_archive_dir) as tar_dir, \
                 CacheManager(sha256_filename) as sha256_cache:
             if args.only:
+                distro = get_distro(args.ros_distro)
+                prefetch_archives(
+                    overlay, distro,
+                    (get_package_index(distro).names & set(args.only))
+                    - set(skip_keys), preserve_existing,
+                    tar_dir, sha256_cache, jobs=args.download_jobs)
                 for pkg in args.only:
                     if pkg in skip_keys:
                         warn("Package '%s' is in skip-keys list, skipping..."
@@ -131,7 +183,7 @@ def main():
                         regenerate_pkg(
                             overlay,
                             pkg,
-                            get_distro(args.ros_distro),
+                            distro,
                             preserve_existing,
                             tar_dir,
                             sha256_cache
@@ -151,31 +203,54 @@ def main():
                 ok('Successfully synchronized repositories!')
                 sys.exit(0)
 
-            for distro in selected_targets:
-                distro_installers, distro_broken, distro_changes = \
-                    generate_installers(
-                        get_distro(distro),
-                        overlay,
-                        regenerate_pkg,
-                        preserve_existing,
-                        tar_dir,
-                        sha256_cache,
-                        skip_keys=skip_keys,
-                    )
+            for distro_name in selected_targets:
+                distro = get_distro(distro_name)
+                get_dependency_graph(distro).precompute(jobs=args.jobs)
+                get_dependency_graph(distro).resolve_external_depends(
+                    'nix', get_distro_condition_context(distro_name),
+                    ('buildtool', 'buildtool_export', 'build',
+                     'build_export', 'exec', 'test'))
+                with get_fingerprint_manager(
+                    overlay, distro_name, args.incremental
+                ) as fingerprints:
+                    prefetch_archives(
+                        overlay, distro,
+                        get_package_index(distro).names - set(skip_keys),
+                        preserve_existing, tar_dir, sha256_cache,
+                        jobs=args.download_jobs, fingerprints=fingerprints)
+                    with RenderPool(args.render_jobs) as render_pool:
+                        distro_installers, distro_broken, distro_changes = \
+                            generate_installers(
+                                distro,
+                                overlay,
+                                regenerate_pkg,
+                                preserve_existing,
+                                tar_dir,
+                                sha256_cache,
+                                render_pool,
+                                skip_keys=skip_keys,
+                                jobs=args.jobs,
+                                fingerprints=fingerprints,
+                            )
                 for key in distro_broken.keys():
                     for pkg in distro_broken[key]:
                         total_broken.add(pkg)
 
-                total_changes[distro] = distro_changes
-                total_installers[distro] = distro_installers
+                total_changes[distro_name] = distro_changes
+                total_installers[distro_name] = distro_installers
 
                 # If we are just updating a few packages using --only, then
                 # leave the package set alone. This means that new packages
                 # will not be added, but it is still useful for updates.
                 if not preserve_existing:
-                    regenerate_pkg_set(overlay, distro, distro_installers)
+                    pkg_set = distro_installers
+                    if fingerprints is not None:
+                        # unchanged packages were preserved, not generated
+                        pkg_set = sorted(
+                            set(distro_installers) | fingerprints.preserved)
+                    regenerate_pkg_set(overlay, distro_name, pkg_set)
                     ok('Generated package set for distro \'{}\''
-                       .format(distro))
+                       .format(distro_name))
 
         num_changes = 0
         for distro_name in total_changes:
@@ -82,4 +82,55 @@ def get_parser(
             nargs='+',
             help='packages to skip during regeneration'
         )
+        parser.add_argument(
+            '--cache-dir',
+            help='location of the caches kept across runs (default: '
+                 + '$SUPERFLORE_CACHE_DIR or ~/.cache/superflore)',
+            type=str
+        )
+        parser.add_argument(
+            '--clone-depth',
+            help='when cloning the output repository, only fetch its last '
+                 + 'CLONE_DEPTH commits',
+            type=int
+        )
+        parser.add_argument(
+            '--clone-filter',
+            help='when cloning the output repository, make a partial clone '
+                 + 'with this filter (e.g. blob:none)',
+            type=str
+        )
+        parser.add_argument(
+            '--offline',
+            help='only read the rosdistro index, rosdep sources, '
+                 + 'package.xmls and archives from the mirror in the cache '
+                 + 'directory, and fail on what is not in it (requires '
+                 + '--dry-run and --output-repository-path)',
+            action='store_true'
+        )
+        parser.add_argument(
+            '--refresh-rosdep-views',
+            help='rebuild the rosdep views instead of loading the '
+                 + 'snapshots cached by previous runs',
+            action='store_true'
+        )
+        parser.add_argument(
+            '--timing-report',
+            help='write the time spent per package and per phase to this '
+                 + 'file, as CSV if it ends in .csv, as JSON otherwise',
+            type=str
+        )
+        parser.add_argument(
+            '--jobs',
+            help='number of packages to generate in parallel',
+            type=int,
+            default=1
+        )
+        parser.add_argument(
+            '--render-jobs',
+            help='number of processes rendering installers in parallel '
+                 + '(fed by the --jobs generation threads)',
+            type=int,
+            default=1
+        )
     return parser
@@ -0,0 +1,326 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Populate the cache directory with everything the generators fetch from
+the network for a ROS distro, so that generation can run afterwards
+without network latency, or with --offline.
+
+Everything already in the cache is skipped, so an interrupted prefetch
+resumes where it stopped when run again.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import tempfile
+import threading
+
+from rosdistro import get_index
+from rosdistro import get_index_url
+from rosdistro.loader import load_url
+from rosinstall_generator.distro import get_distro
+from superflore.CacheManager import CacheManager
+from superflore.PackageIndex import get_package_index
+from superflore.PackageXmlCache import get_package_xml
+from superflore.PackageXmlCache import get_package_xml_cache
+from superflore.utils import err
+from superflore.utils import get_cache_dir
+from superflore.utils import info
+from superflore.utils import make_dir
+from superflore.utils import ok
+from superflore.utils import retry_on_exception
+from superflore.utils import set_cache_dir
+from superflore.utils import warn
+import yaml
+
+GENERATORS = ('ebuild', 'bitbake', 'nix')
+
+
+class _Progress:
+    """Reports the completion of the items of a prefetch step."""
+    def __init__(self, what, total):
+        self.what = what
+        self.total = total
+        self.count = 0
+        self.failed = []
+        self.lock = threading.Lock()
+
+    def done(self, item, error=None):
+        with self.lock:
+            self.count += 1
+            percent = '{0}%'.format(round(100 * self.count / self.total))
+            if error is None:
+                ok("{0}: Fetched {1} of '{2}'".format(
+                    percent, self.what, item))
+            else:
+                self.failed.append(item)
+                err("{0}: Failed to fetch {1} of '{2}': {3}".format(
+                    percent, self.what, item, error))
+
+
+def _write_file(filename, data):
+    # write to a temporary file first, so that an interrupted prefetch
+    # never leaves a truncated file behind
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
+
+
+def mirror_rosdistro(distro_names):
+    """
+    Copy the rosdistro index entries of the given distros, with their
+    distribution files and caches, to <cache>/rosdistro.
+
+    The distribution files and caches are referenced by paths relative to
+    the mirrored index, so that the mirror can be moved around. Returns
+    the filename of the mirrored index.
+    """
+    mirror_dir = get_cache_dir('rosdistro')
+    index_url = get_index_url()
+    info("Mirroring the rosdistro index '{0}'".format(index_url))
+    data = yaml.safe_load(load_url(index_url))
+    index = get_index(index_url)
+    index_filename = os.path.join(mirror_dir, 'index-v4.yaml')
+    # keep the distros mirrored by previous runs
+    distributions = dict()
+    if os.path.isfile(index_filename):
+        with open(index_filename) as f:
+            distributions = yaml.safe_load(f).get('distributions') or dict()
+    for distro_name in distro_names:
+        if distro_name not in index.distributions:
+            raise RuntimeError(
+                "Unknown distribution: '{0}'".format(distro_name))
+        entry = dict(data['distributions'][distro_name])
+        urls = index.distributions[distro_name]
+        make_dir(os.path.join(mirror_dir, distro_name))
+        entry['distribution'] = []
+        for i, url in enumerate(urls['distribution']):
+            path = '{0}/distribution-{1}.yaml'.format(distro_name, i)
+            _write_file(os.path.join(mirror_dir, path),
+                        load_url(url, skip_decode=True))
+            entry['distribution'].append(path)
+        if 'distribution_cache' in urls:
+            url = urls['distribution_cache']
+            path = distro_name + '-cache.yaml'
+            if url.endswith('.gz'):
+                path += '.gz'
+            _write_file(os.path.join(mirror_dir, path),
+                        load_url(url, skip_decode=True))
+            entry['distribution_cache'] = path
+        distributions[distro_name] = entry
+    data['distributions'] = distributions
+    _write_file(index_filename, yaml.safe_dump(
+        data, default_flow_style=False).encode('utf-8'))
+    ok("Wrote '{0}'".format(index_filename))
+    return index_filename
+
+
+def update_rosdep_sources(ros_distro=None):
+    """
+    Download the rosdep sources of $ROSDEP_SOURCE_PATH (or of the default
+    sources list) into <cache>/rosdep/sources.cache, like rosdep update,
+    restricted to ros_distro if given.
+
+    Returns the URLs of the sources that could not be downloaded.
+    """
+    from rosdep2.sources_list import update_sources_list
+
+    failed = []
+
+    def error_handler(source, e):
+        err("Failed to fetch rosdep source '{0}': {1}".format(source.url, e))
+        failed.append(source.url)
+
+    rosdep_dir = get_cache_dir('rosdep')
+    # rosdep also writes its metadata cache to $ROS_HOME/rosdep, which is
+    # where set_offline points it
+    os.environ['ROS_HOME'] = os.path.dirname(rosdep_dir)
+    sources_cache_dir = os.path.join(rosdep_dir, 'sources.cache')
+    info("Updating the rosdep sources in '{0}'".format(sources_cache_dir))
+    updated = update_sources_list(
+        sources_cache_dir=sources_cache_dir, error_handler=error_handler,
+        ros_distro=ros_distro, quiet=True)
+    if not updated and not failed:
+        warn('No rosdep sources, was rosdep init run?')
+    ok('Fetched {0} rosdep sources'.format(len(updated)))
+    return failed
+
+
+def prefetch_package_xmls(distro, pkg_names, jobs=8):
+    """
+    Fetch the package.xml of the packages that are not in the package.xml
+    cache yet. Returns the packages whose package.xml could not be fetched.
+    """
+    pkg_index = get_package_index(distro)
+    cache = get_package_xml_cache()
+    missing = [
+        pkg for pkg in sorted(pkg_names)
+        if (pkg_index.get_repository(pkg).url,
+            pkg_index.get_release_tag(pkg)) not in cache
+    ]
+    info('{0} of {1} package.xmls of {2} already cached'.format(
+        len(pkg_names) - len(missing), len(pkg_names), distro.name))
+    if not missing:
+        return []
+    progress = _Progress('package.xml', len(missing))
+
+    def fetch(pkg):
+        try:
+            retry_on_exception(get_package_xml, distro, pkg)
+        except Exception as e:
+            progress.done(pkg, e)
+        else:
+            progress.done(pkg)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        list(executor.map(fetch, missing))
+    return progress.failed
+
+
+def prefetch_archives(distro, pkg_names, jobs=8):
+    """
+    Download the release archives of the packages to <cache>/archives,
+    where the nix generator finds them when it is given that directory as
+    --tar-archive-dir and the ebuild generator hashes them into the
+    Manifests, and store their package.xml in the package.xml cache.
+    Returns the packages whose archive could not be downloaded.
+    """
+    from superflore.generators.nix import gen_packages
+    from superflore.generators.nix.nix_package import NixPackage
+
+    tar_dir = get_cache_dir('archives')
+    archives = {
+        pkg: NixPackage.get_archive_path(pkg, distro, tar_dir)
+        for pkg in sorted(pkg_names)
+    }
+    missing = [
+        pkg for pkg, path in archives.items() if not os.path.exists(path)]
+    info('{0} of {1} archives of {2} already downloaded'.format(
+        len(pkg_names) - len(missing), len(pkg_names), distro.name))
+    if not missing:
+        return []
+    with CacheManager(
+        os.path.join(tar_dir, 'sha256_cache.pickle')
+    ) as sha256_cache:
+        gen_packages.download_archives(
+            distro, missing, tar_dir, sha256_cache, jobs)
+    failed = [pkg for pkg in missing if not os.path.exists(archives[pkg])]
+    ok('Downloaded {0} / {1} archives of {2}'.format(
+        len(missing) - len(failed), len(missing), distro.name))
+    return failed
+
+
+def prefetch_srcrevs(distro, pkg_names, jobs=8):
+    """
+    Resolve the SRCREVs of the packages into the SRCREV cache of
+    <cache>/archives. Returns the packages whose SRCREV is still unknown.
+    """
+    from superflore.generators.bitbake.yocto_recipe import yoctoRecipe
+
+    pkg_index = get_package_index(distro)
+    with CacheManager(os.path.join(
+        get_cache_dir('archives'), 'srcrev_cache.pickle')
+    ) as srcrev_cache:
+        yoctoRecipe.prefetch_srcrevs(distro, srcrev_cache, pkg_names, jobs)
+        failed = [
+            pkg for pkg in sorted(pkg_names)
+            if pkg_index.get_src_uri(pkg) not in srcrev_cache
+        ]
+    ok('Resolved {0} / {1} SRCREVs of {2}'.format(
+        len(pkg_names) - len(failed), len(pkg_names), distro.name))
+    return failed
+
+
+def prefetch(distro_names, generators=GENERATORS, jobs=8):
+    """
+    Prefetch what the generators need for the distros, running the steps
+    concurrently. Returns a dict mapping each step to what failed.
+    """
+    def sources(distro, pkg_names):
+        # the archives contain the package.xmls, only fetch the others
+        failed = []
+        if 'nix' in generators or 'ebuild' in generators:
+            failed += prefetch_archives(distro, pkg_names, jobs)
+        return failed + prefetch_package_xmls(distro, pkg_names, jobs)
+
+    with ThreadPoolExecutor(max_workers=2 * len(distro_names) + 1) as executor:
+        steps = {
+            'rosdep sources': executor.submit(
+                update_rosdep_sources,
+                distro_names[0] if len(distro_names) == 1 else None),
+        }
+        for distro_name in distro_names:
+            distro = get_distro(distro_name)
+            pkg_names = get_package_index(distro).names
+            if 'bitbake' in generators:
+                steps[distro_name + ' SRCREVs'] = executor.submit(
+                    prefetch_srcrevs, distro, pkg_names, jobs)
+            steps[distro_name + ' sources'] = executor.submit(
+                sources, distro, pkg_names)
+        return {step: future.result() for step, future in steps.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prefetch what the generators need for ROS distros '
+                    + 'into the cache directory')
+    parser.add_argument(
+        '--ros-distro',
+        help='distro(s) to prefetch',
+        type=str,
+        nargs='+',
+        required=True
+    )
+    parser.add_argument(
+        '--generators',
+        help='generators to prefetch for (default: all)',
+        nargs='+',
+        choices=GENERATORS,
+        default=list(GENERATORS)
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='location of the caches kept across runs (default: '
+             + '$SUPERFLORE_CACHE_DIR or ~/.cache/superflore)',
+        type=str
+    )
+    parser.add_argument(
+        '--jobs',
+        help='number of concurrent downloads per step',
+        type=int,
+        default=8
+    )
+    args = parser.parse_args(sys.argv[1:])
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
+    mirror_rosdistro(args.ros_distro)
+    failures = 0
+    for step, failed in sorted(
+        prefetch(args.ros_distro, args.generators, args.jobs).items()
+    ):
+        if failed:
+            warn('Failed to prefetch the {0} of: {1}'.format(
+                step, ' '.join(failed)))
+            failures += len(failed)
+    if failures:
+        err('Prefetch incomplete, run it again to retry what failed')
+        sys.exit(1)
+    ok("Prefetched into '{0}'".format(get_cache_dir()))
@@ -12,22 +12,50 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
+import fnmatch
 import os
+import re
 import shutil
+import threading
 
-from git import Repo
-from git.exc import GitCommandError as GitGotGot
-from github import Github
 from superflore.utils import err
+from superflore.utils import get_cache_dir
 from superflore.utils import info
 from superflore.utils import ok
 from superflore.utils import retry_on_exception
+from superflore.utils import warn
+
+_clone_depth = None
+_clone_filter = None
+
+
+def set_clone_options(depth=None, filter_spec=None):
+    """
+    Only fetch the last depth commits of the repositories that are cloned,
+    and/or make partial clones with the given filter (e.g. blob:none).
+    """
+    global _clone_depth, _clone_filter
+    _clone_depth = depth
+    _clone_filter = filter_spec
+
+
+def _get_fetch_options():
+    options = []
+    if _clone_depth:
+        options.append('--depth={0}'.format(_clone_depth))
+    if _clone_filter:
+        options.append('--filter={0}'.format(_clone_filter))
+    return options
 
 
 class RepoInstance(object):
     def __init__(
             self, repo_owner, repo_name, repo_dir=None, do_clone=True,
             from_branch=''):
+        # GitPython and PyGithub are slow to import, so they are only
+        # imported once a repository is actually used
+        from git import Repo
         self.repo_owner = repo_owner
         self.repo_name = repo_name
         repo_url = 'https://github.com/{0}/{1}'
@@ -37,34 +65,220 @@ class RepoInstance(object):
         self.from_branch = from_branch or 'master'
         self.branch = self.from_branch
         if do_clone:
-            self.repo = Repo.clone_from(
-                self.repo_url, self.repo_dir, branch=self.from_branch)
+            self.repo = self._clone()
         else:
             self.repo = Repo(repo_dir)
         self.git = self.repo.git
+        # serializes index updates from concurrently generated packages
+        self.lock = threading.RLock()
+        # files removed by remove_file, not yet removed from the index
+        self._removals = dict()
+        self._status = None
+        self._status_index = None
+
+    def _update_mirror(self):
+        """
+        Fetch the branch to start from into the bare mirror of the
+        repository kept in the cache directory, creating it if needed, and
+        return the mirror. Only new objects are fetched after the first run.
+        """
+        from git import Repo
+        mirror_dir = get_cache_dir(
+            'repos', self.repo_owner, self.repo_name + '.git')
+        if os.path.exists(os.path.join(mirror_dir, 'HEAD')):
+            mirror = Repo(mirror_dir)
+            mirror.git.remote('set-url', 'origin', self.repo_url)
+            # forget the worktrees of the previous runs
+            mirror.git.worktree('prune')
+        else:
+            mirror = Repo.init(mirror_dir, bare=True)
+            mirror.git.remote('add', 'origin', self.repo_url)
+        if _clone_filter:
+            mirror.git.config('remote.origin.promisor', 'true')
+            mirror.git.config(
+                'remote.origin.partialclonefilter', _clone_filter)
+        info('Fetching {0}/{1} into {2}...'.format(
+            self.repo_owner, self.repo_name, mirror_dir))
+        retry_on_exception(
+            mirror.git.fetch, *_get_fetch_options(), 'origin',
+            '+refs/heads/{0}:refs/remotes/origin/{0}'.format(self.from_branch),
+            retry_msg='Could not fetch', sleep_secs=1.0)
+        return mirror
+
+    def _clone(self):
+        """
+        Check out the branch to start from in repo_dir, as a worktree of the
+        mirror of the repository in the cache directory, or else as a new
+        clone.
+        """
+        from git import Repo
+        from git.exc import GitCommandError
+        try:
+            mirror = self._update_mirror()
+            mirror.git.worktree(
+                'add', '-B', self.from_branch, os.path.abspath(self.repo_dir),
+                'origin/' + self.from_branch)
+            return Repo(self.repo_dir)
+        except GitCommandError as e:
+            # e.g. another run uses the mirror
+            warn('Could not use the repository cache: {0}'.format(e))
+        info('Cloning repo {0}/{1}...'.format(
+            self.repo_owner, self.repo_name))
+        return Repo.clone_from(
+            self.repo_url, self.repo_dir, branch=self.from_branch,
+            multi_options=_get_fetch_options())
 
     def clone(self, branch=None):
         shutil.rmtree(self.repo_dir)
+        os.makedirs(self.repo_dir)
         msg = 'Cloning repo {0}/{1}'.format(self.repo_owner, self.repo_name)
         if self.repo_dir != self.repo_name:
             msg += (' into directory {0}'.format(self.repo_dir))
         msg += '...'
         info(msg)
-        self.repo = Repo.clone_from(self.repo_url, self.repo_dir)
+        self.repo = self._clone()
+        self.git = self.repo.git
+        self.invalidate_status()
         if branch:
-            self.git.checkout(branch)
+            # only the branch to start from was fetched
+            retry_on_exception(
+                self.git.fetch, *_get_fetch_options(), 'origin',
+                '+refs/heads/{0}:refs/remotes/origin/{0}'.format(branch),
+                retry_msg='Could not fetch', sleep_secs=1.0)
+            self.git.checkout('-B', branch, 'origin/' + branch)
             self.branch = branch
 
     def remove_file(self, filename, ignore_fail=False):
-        try:
-            self.git.rm('-f', filename)
-        except GitGotGot as g:
-            if ignore_fail:
+        """
+        Remove the file from the working tree, and queue its removal from
+        the index for the next flush(), so that removing many files only
+        runs git a few times. filename may be relative to the repository.
+
+        Like git rm, only files of the index (see get_status()) are
+        removed, untracked files being left alone. The callers must
+        flush() before they commit.
+        """
+        path = os.path.join(self.repo.working_tree_dir, filename)
+        rel_path = os.path.relpath(
+            path, self.repo.working_tree_dir).replace(os.sep, '/')
+        with self.lock:
+            if self.get_status().get(rel_path, '??') == '??':
+                if not ignore_fail:
+                    err('Failed to remove file {0} from source control: '
+                        'it is not tracked.'.format(filename))
+                return
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # it may still have to be removed from the index
+                pass
+            self._removals[path] = self._removals.get(path, True) \
+                and ignore_fail
+
+    def flush(self, chunk_size=1000):
+        """
+        Remove the files queued by remove_file from the index, with one
+        git rm per chunk_size files. Files that were written again since
+        they were removed are left for the next git add.
+        """
+        from git.exc import GitCommandError as GitGotGot
+        with self.lock:
+            removals, self._removals = self._removals, dict()
+            removals = {
+                path: ignore_fail for path, ignore_fail in removals.items()
+                if not os.path.exists(path)
+            }
+            if not removals:
                 return
-            fail_msg = 'Failed to remove file {0}'.format(filename)
-            fail_msg += ' from source control.'
-            err(fail_msg)
-            err(' Exception: {0}'.format(g))
+            self._status = None
+            for ignore_fail in (True, False):
+                paths = sorted(
+                    path for path, ignore in removals.items()
+                    if ignore == ignore_fail)
+                for i in range(0, len(paths), chunk_size):
+                    chunk = paths[i:i + chunk_size]
+                    args = ['--cached', '-q']
+                    if ignore_fail:
+                        args.append('--ignore-unmatch')
+                    try:
+                        self.git.rm(*args, '--', *chunk)
+                    except GitGotGot:
+                        # find out which files failed, one at a time
+                        for path in chunk:
+                            try:
+                                self.git.rm('--cached', '-q', '--', path)
+                            except GitGotGot as g:
+                                fail_msg = 'Failed to remove file {0}'.format(
+                                    path)
+                                fail_msg += ' from source control.'
+                                err(fail_msg)
+                                err(' Exception: {0}'.format(g))
+
+    def add_files(self, *paths, chunk_size=1000):
+        """Stage the paths, with one git add per chunk_size paths."""
+        self.flush()
+        with self.lock:
+            self._status = None
+            for i in range(0, len(paths), chunk_size):
+                self.git.add('--', *paths[i:i + chunk_size])
+
+    def invalidate_status(self):
+        """Drop the snapshot of get_status() after running git directly."""
+        with self.lock:
+            self._status = None
+
+    def get_status(self):
+        """
+        Return a dict mapping the paths of the files of the repository to
+        their git status --porcelain code, '  ' for unchanged files.
+
+        The dict is built by a single git ls-files and git status, and is
+        kept until the index is changed by this instance, so that looking
+        up the files of every package does not run git every time.
+        """
+        with self.lock:
+            if self._status is None:
+                status = dict.fromkeys(
+                    self.git.ls_files('-z').split('\0'), '  ')
+                entries = iter(self.git.status(
+                    '--porcelain', '-z', '--untracked-files=all'
+                ).split('\0'))
+                for entry in entries:
+                    if not entry:
+                        continue
+                    status[entry[3:]] = entry[:2]
+                    if 'R' in entry[:2] or 'C' in entry[:2]:
+                        # skip the source of the rename or copy
+                        next(entries, None)
+                status.pop('', None)
+                self._status = status
+                self._status_index = sorted(
+                    (os.path.basename(path), path) for path in status)
+            return self._status
+
+    def glob(self, pattern):
+        """
+        Return the sorted (status, path) pairs of get_status() whose path
+        matches the pattern, in which wildcards don't match '/'.
+        """
+        with self.lock:
+            status = self.get_status()
+            index = self._status_index
+        parts = pattern.split('/')
+        # only look at the paths whose file name starts like the pattern's
+        prefix = re.split(r'[*?[]', parts[-1])[0]
+        matches = []
+        i = bisect.bisect_left(index, (prefix,))
+        while i < len(index) and index[i][0].startswith(prefix):
+            path = index[i][1]
+            path_parts = path.split('/')
+            if len(path_parts) == len(parts) and all(
+                fnmatch.fnmatchcase(path_part, part)
+                for path_part, part in zip(path_parts, parts)
+            ):
+                matches.append((status[path], path))
+            i += 1
+        return sorted(matches, key=lambda match: match[1])
 
     def create_branch(self, branch_name):
         """
@@ -93,6 +307,7 @@ class RepoInstance(object):
         self.git.rebase(i=target)
 
     def pull_request(self, message, title, branch='master', fork=True):
+        from github import Github
         self.github = Github(os.environ['SUPERFLORE_GITHUB_TOKEN'])
         self.gh_user = self.github.get_user()
         self.gh_upstream = self.github.get_repo(
@@ -106,9 +321,10 @@ class RepoInstance(object):
             pr_repo = self.gh_upstream
             pr_head = self.branch or branch
         info('Pushing changes to repo...')
-        self.git.remote('add', 'github', pr_repo.html_url)
+        # to the URL, as a remote would be stored in the config of the
+        # mirror, which the runs share
         retry_on_exception(
-            self.git.push, '-u', 'github', self.branch or branch,
+            self.git.push, pr_repo.html_url, self.branch or branch,
             retry_msg='Could not push', error_msg='Error during push',
             sleep_secs=0.0,
         )
@@ -30,29 +30,124 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from rosdep2 import create_default_installer_context
-from rosdep2.catkin_support import get_catkin_view
-from rosdep2.lookup import ResolutionError
-from rosdep2.rosdistrohelper import get_index
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+# rosdep2 is imported where it is used: importing it, and creating its
+# installer context, takes a noticeable part of the startup time of the
+# console scripts, which do not always need it (e.g. --help or --pr-only).
 from superflore.exceptions import UnresolvedDependency
+from superflore.timing import count
 
 DEFAULT_ROS_DISTRO = 'indigo'
 view_cache = {}
+_view_cache_lock = threading.Lock()
+_resolution_cache = {}
+_resolution_cache_lock = threading.Lock()
+_refresh_view_snapshots = False
+_installer_ctx = None
 
 
 def get_cached_index():
+    from rosdep2.rosdistrohelper import get_index
     return get_index()
 
 
+def get_installer_context():
+    global _installer_ctx
+    if _installer_ctx is None:
+        from rosdep2 import create_default_installer_context
+        _installer_ctx = create_default_installer_context()
+    return _installer_ctx
+
+
+def get_catkin_view(ros_distro, os_name, os_version, update):
+    from rosdep2.catkin_support import get_catkin_view
+    return get_catkin_view(ros_distro, os_name, os_version, update)
+
+
+def set_refresh_view_snapshots(refresh=True):
+    """Rebuild the rosdep views instead of loading their snapshots."""
+    global _refresh_view_snapshots
+    _refresh_view_snapshots = refresh
+
+
 def get_view(os_name, os_version, ros_distro):
     key = os_name + os_version + ros_distro
-    if key not in view_cache:
-        value = get_catkin_view(ros_distro, os_name, os_version, False)
-        view_cache[key] = value
+    with _view_cache_lock:
+        if key not in view_cache:
+            value = _load_view(ros_distro, os_name, os_version)
+            view_cache[key] = value
     return view_cache[key]
 
 
-_installer_ctx = create_default_installer_context()
+def _get_sources_fingerprint(ros_distro, os_name, os_version):
+    """
+    Return a hash of everything a catkin view is built from: the rosdep
+    sources lists, the cached rosdep sources and the rosdep version.
+    """
+    import rosdep2
+    from rosdep2.sources_list import get_sources_cache_dir
+    from rosdep2.sources_list import get_sources_list_dir
+
+    sha256 = hashlib.sha256()
+    sha256.update(repr((
+        rosdep2.__version__, ros_distro, os_name, os_version
+    )).encode())
+    for directory in (get_sources_list_dir(), get_sources_cache_dir()):
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                st = os.stat(path)
+                sha256.update(repr((
+                    path, st.st_size, st.st_mtime_ns
+                )).encode())
+    return sha256.hexdigest()
+
+
+def _load_view(ros_distro, os_name, os_version):
+    """
+    Return the catkin view for the platform, from a snapshot in the
+    superflore cache if it is up to date with the rosdep sources, as
+    merging all the rosdep sources takes seconds.
+    """
+    # superflore.utils imports this module
+    from superflore.utils import get_cache_dir
+    from superflore.utils import info
+    from superflore.utils import warn
+
+    fingerprint = _get_sources_fingerprint(ros_distro, os_name, os_version)
+    snapshot = os.path.join(
+        get_cache_dir('rosdep'),
+        'view-{0}-{1}-{2}.pickle'.format(
+            ros_distro, os_name or 'any', os_version or 'any'))
+    if not _refresh_view_snapshots and os.path.isfile(snapshot):
+        try:
+            with open(snapshot, 'rb') as f:
+                snapshot_fingerprint, view = pickle.load(f)
+            if snapshot_fingerprint == fingerprint:
+                return view
+        except Exception as e:
+            warn("Ignoring unreadable rosdep view snapshot '{0}': {1}".format(
+                snapshot, e))
+    info("Building rosdep view for {0} {1} ({2})".format(
+        os_name, os_version, ros_distro))
+    view = get_catkin_view(ros_distro, os_name, os_version, False)
+    fd, tmp_snapshot = tempfile.mkstemp(dir=os.path.dirname(snapshot))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((fingerprint, view), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_snapshot, snapshot)
+    except Exception as e:
+        os.remove(tmp_snapshot)
+        warn("Failed to save rosdep view snapshot '{0}': {1}".format(
+            snapshot, e))
+    return view
 
 
 def resolve_more_for_os(rosdep_key, view, installer, os_name, os_version):
@@ -65,9 +160,10 @@ def resolve_more_for_os(rosdep_key, view, installer, os_name, os_version):
 
     :raises: :exc:`rosdep2.ResolutionError`
     """
+    installer_ctx = get_installer_context()
     d = view.lookup(rosdep_key)
-    os_installers = _installer_ctx.get_os_installer_keys(os_name)
-    default_os_installer = _installer_ctx.get_default_os_installer_key(os_name)
+    os_installers = installer_ctx.get_os_installer_keys(os_name)
+    default_os_installer = installer_ctx.get_default_os_installer_key(os_name)
     inst_key, rule = d.get_rule_for_platform(os_name, os_version,
                                              os_installers,
                                              default_os_installer)
@@ -82,16 +178,83 @@ def resolve_rosdep_key(
     ros_distro=None,
     ignored=None
 ):
-    ignored = ignored or []
+    """
+    Resolve a rosdep key for the platform, like resolve_more_for_os.
+
+    Resolutions, including failures to resolve, are memoized for the run,
+    since the same system dependencies are resolved for many packages.
+
+    :raises: :exc:`UnresolvedDependency`
+    """
+    ros_distro = ros_distro or DEFAULT_ROS_DISTRO
+    cache_key = (key, os_name, os_version, ros_distro)
+    with _resolution_cache_lock:
+        resolution = _resolution_cache.get(cache_key)
+    if resolution is None:
+        count('rosdep_cache_misses')
+        try:
+            resolution = _resolve_rosdep_key(
+                key, os_name, os_version, ros_distro)
+        except UnresolvedDependency as e:
+            resolution = e
+        with _resolution_cache_lock:
+            _resolution_cache[cache_key] = resolution
+    else:
+        count('rosdep_cache_hits')
+    if isinstance(resolution, UnresolvedDependency):
+        raise UnresolvedDependency(resolution.message)
+    resolved, inst_key, default_installer = resolution
+    # callers get their own copy of the resolved packages
+    return list(resolved), inst_key, default_installer
+
+
+def get_resolutions():
+    """Return a copy of the rosdep resolutions memoized so far."""
+    with _resolution_cache_lock:
+        return dict(_resolution_cache)
+
+
+def add_resolutions(resolutions):
+    """
+    Memoize resolutions returned by get_resolutions(), e.g. in another
+    process, so that it does not resolve the same keys again.
+    """
+    with _resolution_cache_lock:
+        _resolution_cache.update(resolutions)
+
+
+def resolve_rosdep_keys(keys, os_name, os_version, ros_distro=None):
+    """
+    Resolve many rosdep keys in one batch, e.g. all the system dependencies
+    of a distro before generating it, so that resolving them again while
+    generating packages only hits the memoized resolutions.
+
+    :returns: a dict mapping each resolved key to its resolved packages,
+        and the set of keys that could not be resolved
+    """
+    table = dict()
+    unresolved = set()
+    for key in sorted(keys):
+        try:
+            table[key] = resolve_rosdep_key(
+                key, os_name, os_version, ros_distro)[0]
+        except UnresolvedDependency:
+            unresolved.add(key)
+    return table, unresolved
+
+
+def _resolve_rosdep_key(key, os_name, os_version, ros_distro):
+    from rosdep2.lookup import ResolutionError
+
+    installer_ctx = get_installer_context()
     try:
-        installer_key = _installer_ctx.get_default_os_installer_key(os_name)
+        installer_key = installer_ctx.get_default_os_installer_key(os_name)
     except KeyError:
         raise UnresolvedDependency(
             "could not resolve package {} for os {}."
             .format(key, os_name)
         )
-    installer = _installer_ctx.get_installer(installer_key)
-    ros_distro = ros_distro or DEFAULT_ROS_DISTRO
+    installer = installer_ctx.get_installer(installer_key)
     view = get_view(os_name, os_version, ros_distro)
     try:
         return resolve_more_for_os(key, view, installer, os_name, os_version)
@@ -100,3 +263,12 @@ def resolve_rosdep_key(
             "could not resolve package {} for os {}."
             .format(key, os_name)
         )
+
+
+def get_rosdep_definition(key, os_name, os_version, ros_distro=None):
+    """Return the rosdep rules of key, or None if key is not defined."""
+    view = get_view(os_name, os_version, ros_distro or DEFAULT_ROS_DISTRO)
+    try:
+        return view.lookup(key).data
+    except KeyError:
+        return None
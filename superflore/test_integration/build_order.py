@@ -0,0 +1,152 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Order the targets of the integration builds by their dependencies.
+
+The targets are built in waves, each wave only depending on the waves
+before it, so that a dependency shared by several targets is built before
+them, and the dependents of a target that failed are reported as blocked
+instead of failing again on the same dependency.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from rosinstall_generator.distro import get_distro
+from superflore.DependencyGraph import get_dependency_graph
+from superflore.utils import get_distro_condition_context
+from superflore.utils import info
+from superflore.utils import warn
+
+
+def get_target_depends(targets):
+    """
+    Return a dict mapping each target to the set of targets it depends
+    on, given a dict mapping the targets to their (distro name, package
+    name). The dependencies through packages which are not targets count.
+    """
+    by_distro = dict()
+    for target, (distro_name, pkg_name) in targets.items():
+        by_distro.setdefault(distro_name, dict())[pkg_name] = target
+    depends = dict()
+    for distro_name, distro_targets in sorted(by_distro.items()):
+        info("Ordering the targets of distro '{0}'".format(distro_name))
+        graph = get_dependency_graph(get_distro(distro_name))
+        condition_context = get_distro_condition_context(distro_name)
+        for pkg_name, target in distro_targets.items():
+            depends[target] = {
+                distro_targets[dep]
+                for dep in graph.get_recursive_depends(
+                    pkg_name, condition_context)
+                if dep in distro_targets
+            }
+    return depends
+
+
+def get_target_log_file(log_file, target):
+    """
+    Return the log file of a target built in a container of its own, next
+    to log_file (e.g. build-ros-humble-foo.log for build.log), so that the
+    containers running at the same time don't write to the same log.
+    """
+    if not log_file:
+        return log_file
+    root, ext = os.path.splitext(log_file)
+    return '{0}-{1}{2}'.format(
+        root, target.replace(os.sep, '-'), ext)
+
+
+def get_build_waves(depends):
+    """
+    Return the targets of depends (see get_target_depends) in waves, as
+    sorted lists: each target comes after the targets it depends on. The
+    targets of a dependency cycle come last, in the same wave.
+    """
+    waves = []
+    done = set()
+    remaining = set(depends)
+    while remaining:
+        wave = sorted(
+            target for target in remaining if depends[target] <= done)
+        if not wave:
+            warn('Dependency cycle between: {0}'.format(
+                ', '.join(sorted(remaining))))
+            wave = sorted(remaining)
+        waves.append(wave)
+        done.update(wave)
+        remaining.difference_update(wave)
+    return waves
+
+
+def build_in_waves(depends, build, jobs=1):
+    """
+    Build the targets of depends wave by wave, with build(target), which
+    returns whether the target builds, running jobs builds at a time.
+
+    A target depending on a target which didn't build is not built.
+    Returns a dict mapping each target to 'building', 'failing' or
+    'blocked'.
+    """
+    results = dict()
+    waves = get_build_waves(depends)
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        for i, wave in enumerate(waves):
+            info("Building wave {0} of {1} ({2} targets)".format(
+                i + 1, len(waves), len(wave)))
+            to_build = []
+            for target in wave:
+                # a dependency cycle is built regardless
+                failed = sorted(
+                    dep for dep in depends[target]
+                    if results.get(dep, 'building') != 'building')
+                if failed:
+                    results[target] = 'blocked'
+                    warn("  '{0}': blocked by {1}".format(
+                        target, ', '.join(failed)))
+                else:
+                    to_build.append(target)
+            for target, building in zip(
+                to_build, executor.map(build, to_build)
+            ):
+                results[target] = 'building' if building else 'failing'
+    return results
+
+
+def mark_blocked(results, depends):
+    """
+    Mark the failing targets of results which depend on a failing target
+    that is not blocked itself as 'blocked', since they couldn't be built.
+
+    The targets of a dependency cycle, which depend on each other with the
+    recursive dependencies of get_target_depends, don't block each other,
+    so that the failing targets causing the others to fail are left
+    failing.
+    """
+    failing = {
+        target for target, status in results.items() if status == 'failing'
+    }
+
+    def get_blockers(target):
+        return {
+            dep for dep in depends.get(target, set()) & failing
+            if target not in depends.get(dep, set())
+        }
+
+    roots = {target for target in failing if not get_blockers(target)}
+    for target in sorted(failing - roots):
+        if get_blockers(target) & roots:
+            results[target] = 'blocked'
+            warn("  '{0}': blocked".format(target))
+    return results
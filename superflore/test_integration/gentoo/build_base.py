@@ -14,10 +14,17 @@
 
 from docker.errors import ContainerError
 from superflore.docker import Docker
+from superflore.test_integration.build_order import build_in_waves
+from superflore.test_integration.build_order import get_target_depends
+from superflore.test_integration.build_order import get_target_log_file
+from superflore.test_integration.build_order import mark_blocked
 from superflore.utils import err
+from superflore.utils import get_cache_dir
 from superflore.utils import info
 from superflore.utils import ok
 
+_STATUS_MARKER = 'superflore: status of '
+
 
 class GentooBuilder:
     def __init__(
@@ -26,29 +33,112 @@ class GentooBuilder:
         self.container = Docker()
         self.container.pull(image_owner, image_name)
         self.package_list = dict()
+        self.targets = dict()
 
     def add_target(self, ros_distro, pkg):
         # TODO(allenh1): it might be nice to add a Python3 target
         # in case we want to test both.
-        self.package_list['ros-%s/%s' % (ros_distro, pkg)] = 'unknown'
+        target = 'ros-%s/%s' % (ros_distro, pkg)
+        self.package_list[target] = 'unknown'
+        self.targets[target] = (ros_distro, pkg)
 
-    def run(self, verbose=True, log_file=None):
+    def run(self, verbose=True, log_file=None, jobs=1):
+        """
+        Build each target in a new container, after the targets it depends
+        on, running up to jobs containers at a time (see
+        build_order.build_in_waves). Each target is logged to its own log
+        file, next to log_file.
+        """
         # TODO(allenh1): add the ability to check out a non-master
         # branch of the overlay (for CI).
         info('testing gentoo package integrity')
-        for pkg in sorted(self.package_list.keys()):
-            self.container.add_bash_command('emaint sync -r ros-overlay')
-            self.container.add_bash_command('emerge %s' % pkg)
+
+        def build(pkg):
+            container = Docker()
+            container.image = self.container.image
+            container.add_bash_command('emaint sync -r ros-overlay')
+            container.add_bash_command('emerge %s' % pkg)
             try:
-                self.container.run(
-                    rm=True, show_cmd=True, privileged=True, log_file=log_file
+                container.run(
+                    rm=True, show_cmd=True, privileged=True,
+                    log_file=get_target_log_file(log_file, pkg)
                 )
-                self.package_list[pkg] = 'building'
                 ok("  '%s': building" % pkg)
+                return True
             except ContainerError:
+                err("  '%s': failing" % pkg)
+                return False
+            finally:
+                if verbose:
+                    print(container.log)
+
+        self.package_list.update(build_in_waves(
+            get_target_depends(self.targets), build, jobs))
+        return self.package_list
+
+    def run_batch(self, verbose=True, log_file=None, jobs=1):
+        """
+        Build every target in a single container: the overlay is synced
+        once, and the targets are emerged together with jobs parallel
+        jobs, keeping going past failures. If emerge merged none of the
+        targets, e.g. as one of them is masked or has unsatisfiable
+        dependencies, each target is emerged on its own instead.
+
+        The binary packages and distfiles are kept in the cache directory
+        across runs, so that the dependencies built by a previous run are
+        installed from their binary package. The status of each target is
+        read from the installed packages once emerge is done, a failing
+        target depending on another one being reported as blocked.
+        """
+        info('testing gentoo package integrity')
+        pkgs = sorted(self.package_list.keys())
+        if not pkgs:
+            return self.package_list
+        self.container.map_directory(
+            get_cache_dir('gentoo', 'binpkgs'), '/var/cache/binpkgs')
+        self.container.map_directory(
+            get_cache_dir('gentoo', 'distfiles'), '/var/cache/distfiles')
+        self.container.add_bash_command('emaint sync -r ros-overlay')
+        emerge = 'emerge --keep-going --jobs={0} --usepkg --buildpkg'.format(
+            max(jobs, 1))
+        # a failing target must not stop the status checks below
+        self.container.add_bash_command(
+            '{{ {0} {1} || true; }}'.format(emerge, ' '.join(pkgs)))
+        # a masked or unsatisfiable target makes emerge give up before
+        # merging anything, in which case the targets are emerged one by one
+        self.container.add_bash_command(
+            '{{ {0} || for pkg in {1}; do {2} $pkg || true; done; }}'.format(
+                ' || '.join(
+                    'portageq has_version / {0}'.format(pkg) for pkg in pkgs),
+                ' '.join(pkgs), emerge))
+        for pkg in pkgs:
+            self.container.add_bash_command(
+                '{{ portageq has_version / {0} && echo "{1}{0} building" '
+                '|| echo "{1}{0} failing"; }}'.format(pkg, _STATUS_MARKER))
+        container_failed = False
+        try:
+            self.container.run(
+                rm=True, show_cmd=True, privileged=True, log_file=log_file
+            )
+        except ContainerError:
+            err('The build container failed')
+            container_failed = True
+        for line in self.container.log.splitlines():
+            if line.startswith(_STATUS_MARKER):
+                pkg, status = line[len(_STATUS_MARKER):].split()
+                self.package_list[pkg] = status
+        for pkg in pkgs:
+            if self.package_list[pkg] == 'building':
+                ok("  '%s': building" % pkg)
+            else:
+                # not checked if the container failed
                 self.package_list[pkg] = 'failing'
                 err("  '%s': failing" % pkg)
-            if verbose:
-                print(self.container.log)
-            self.container.clear_commands()
+        # the targets are not to blame for a container which failed
+        if not container_failed:
+            mark_blocked(
+                self.package_list, get_target_depends(self.targets))
+        if verbose:
+            print(self.container.log)
+        self.container.clear_commands()
         return self.package_list
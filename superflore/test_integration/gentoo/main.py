@@ -17,6 +17,7 @@ import sys
 
 from superflore.test_integration.gentoo.build_base import GentooBuilder
 from superflore.utils import get_distros_by_status
+from superflore.utils import set_cache_dir
 import yaml
 
 
@@ -54,7 +55,28 @@ def main():
         help='location to store the log file',
         type=str
     )
+    parser.add_argument(
+        '--batch',
+        help='build all the packages in a single container, reusing the '
+             + 'binary packages and distfiles of previous runs',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--jobs',
+        help='number of packages built at a time, in containers of their '
+             + 'own, or by one container with --batch',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='location of the caches kept across runs (default: '
+             + '$SUPERFLORE_CACHE_DIR or ~/.cache/superflore)',
+        type=str
+    )
     args = parser.parse_args(sys.argv[1:])
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
 
     if args.f:
         # load the yaml file holding the test files
@@ -71,10 +93,13 @@ def main():
     else:
         parser.error('Invalid args! You must supply a package list.')
         sys.exit(1)
-    results = tester.run(args.verbose, args.log_file)
+    if args.batch:
+        results = tester.run_batch(args.verbose, args.log_file, args.jobs)
+    else:
+        results = tester.run(args.verbose, args.log_file, args.jobs)
     failures = 0
     for test_case in results.keys():
-        if results[test_case] == 'failing':
+        if results[test_case] in ('failing', 'blocked'):
             failures = failures + 1
     # set exit status to the number of failures
     sys.exit(failures)
@@ -15,38 +15,139 @@
 from docker.errors import ContainerError
 from superflore.docker import Docker
 from superflore.generators.nix.nix_package import NixPackage
+from superflore.test_integration.build_order import build_in_waves
+from superflore.test_integration.build_order import get_target_depends
+from superflore.test_integration.build_order import get_target_log_file
+from superflore.test_integration.build_order import mark_blocked
 from superflore.utils import err
 from superflore.utils import info
 from superflore.utils import ok
 
+NIX_ROS_OVERLAY_URL = 'https://github.com/lopsided98/nix-ros-overlay' \
+                      '/archive/master.tar.gz'
+
+_STATUS_MARKER = 'superflore: status of '
+
+# Prints "<attribute>=<derivation>" for each attribute of the overlay,
+# with an empty derivation when it can't be evaluated. The double quotes
+# are escaped for the double-quoted bash string holding it.
+_DRV_PATHS_EXPR = (
+    'let pkgs = import (builtins.fetchTarball \\"{url}\\") {{}}; '
+    'lib = pkgs.lib; '
+    'drv = attr: let '
+    'p = lib.attrByPath (lib.splitString \\".\\" attr) null pkgs; '
+    'r = builtins.tryEval (if p == null then \\"\\" else p.drvPath); '
+    'in if r.success then r.value else \\"\\"; '
+    'in lib.concatMapStringsSep \\" \\" '
+    '(attr: attr + \\"=\\" + drv attr) [ {attrs} ]'
+)
+
 
 class NixBuilder:
     def __init__(self, image_owner='nixos', image_name='nix'):
         self.container = Docker()
         self.container.pull(image_owner, image_name)
         self.package_list = dict()
+        self.targets = dict()
 
     def add_target(self, ros_distro, pkg):
-        pkg = NixPackage.normalize_name(pkg)
-        self.package_list[
-            'rosPackages.{}.{}'.format(ros_distro, pkg)] = 'unknown'
+        target = 'rosPackages.{}.{}'.format(
+            ros_distro, NixPackage.normalize_name(pkg))
+        self.package_list[target] = 'unknown'
+        self.targets[target] = (ros_distro, pkg)
 
-    def run(self, verbose=True, log_file=None):
+    def run(self, verbose=True, log_file=None, jobs=1):
+        """
+        Build each target in a new container, after the targets it depends
+        on, running up to jobs containers at a time (see
+        build_order.build_in_waves). Each target is logged to its own log
+        file, next to log_file.
+        """
         info('testing Nix package integrity')
 
-        nix_ros_overlay_url = 'https://github.com/lopsided98/nix-ros-overlay' \
-                              '/archive/master.tar.gz'
-        for pkg in sorted(self.package_list.keys()):
-            self.container.add_sh_command(
-                'nix-build {} -A {}'.format(nix_ros_overlay_url, pkg))
+        def build(pkg):
+            container = Docker()
+            container.image = self.container.image
+            container.add_bash_command(
+                'nix-build {} -A {}'.format(NIX_ROS_OVERLAY_URL, pkg))
             try:
-                self.container.run(rm=True, show_cmd=True, log_file=log_file)
-                self.package_list[pkg] = 'building'
+                container.run(
+                    rm=True, show_cmd=True,
+                    log_file=get_target_log_file(log_file, pkg))
                 ok("  '%s': building" % pkg)
+                return True
             except ContainerError:
-                self.package_list[pkg] = 'failing'
                 err("  '%s': failing" % pkg)
-            if verbose:
-                print(self.container.log)
-            self.container.clear_commands()
+                return False
+            finally:
+                if verbose:
+                    print(container.log)
+
+        self.package_list.update(build_in_waves(
+            get_target_depends(self.targets), build, jobs))
+        return self.package_list
+
+    def run_batch(self, verbose=True, log_file=None, jobs=1,
+                  store_volume='superflore-nix'):
+        """
+        Build every target in a single container, from a single
+        evaluation of the overlay: the derivations of the targets are
+        instantiated at once, then realised together with jobs parallel
+        builds, keeping going past failures.
+
+        /nix is kept in the store_volume Docker volume across runs, so
+        that the dependencies built or fetched by a previous run are not
+        built again. The status of each target is read from the validity
+        of its outputs once the build is done, a failing target depending
+        on another one being reported as blocked.
+        """
+        info('testing Nix package integrity')
+        attrs = sorted(self.package_list.keys())
+        if not attrs:
+            return self.package_list
+        # docker fills a new volume with the /nix of the image
+        self.container.map_directory(store_volume, '/nix')
+        expr = _DRV_PATHS_EXPR.format(
+            url=NIX_ROS_OVERLAY_URL,
+            attrs=' '.join('\\"%s\\"' % attr for attr in attrs))
+        # in braces, for the errors of the evaluation to be logged, and in
+        # read-write mode, for the derivations to be written to the store
+        self.container.add_bash_command(
+            '{{ targets=$(nix-instantiate --read-write-mode --eval -E "{0}" '
+            '| tr -d \\"); }}'.format(expr))
+        self.container.add_bash_command(
+            '{{ nix-store --realise --keep-going --max-jobs {0} '
+            '$(for t in $targets; do echo ${{t#*=}}; done) || true; }}'
+            .format(max(jobs, 1)))
+        self.container.add_bash_command(
+            'for t in $targets; do '
+            'if test -n "${{t#*=}}" && nix-store --check-validity '
+            '$(nix-store --query --outputs ${{t#*=}}); '
+            'then echo "{0}${{t%%=*}} building"; '
+            'else echo "{0}${{t%%=*}} failing"; fi; done'
+            .format(_STATUS_MARKER))
+        container_failed = False
+        try:
+            self.container.run(rm=True, show_cmd=True, log_file=log_file)
+        except ContainerError:
+            err('The build container failed')
+            container_failed = True
+        for line in self.container.log.splitlines():
+            if line.startswith(_STATUS_MARKER):
+                attr, status = line[len(_STATUS_MARKER):].split()
+                self.package_list[attr] = status
+        for attr in attrs:
+            if self.package_list[attr] == 'building':
+                ok("  '%s': building" % attr)
+            else:
+                # not checked if the container failed
+                self.package_list[attr] = 'failing'
+                err("  '%s': failing" % attr)
+        # the targets are not to blame for a container which failed
+        if not container_failed:
+            mark_blocked(
+                self.package_list, get_target_depends(self.targets))
+        if verbose:
+            print(self.container.log)
+        self.container.clear_commands()
         return self.package_list
@@ -23,7 +23,8 @@ import yaml
 def main():
     """
     Test Nix builds in a Docker container. Each package build is run in a new
-    container, so everything is built from scratch each time.
+    container, so everything is built from scratch each time, unless --batch
+    is given.
     """
 
     tester = NixBuilder()
@@ -59,6 +60,26 @@ def main():
         help='location to store the log file',
         type=str
     )
+    parser.add_argument(
+        '--batch',
+        help='build all the packages in a single container, from a single '
+             + 'evaluation of the overlay, keeping the Nix store in a Docker '
+             + 'volume across runs',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--jobs',
+        help='number of packages built at a time, in containers of their '
+             + 'own, or by one container with --batch',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '--store-volume',
+        help='Docker volume holding the Nix store (with --batch)',
+        type=str,
+        default='superflore-nix'
+    )
     args = parser.parse_args(sys.argv[1:])
 
     if args.f:
@@ -76,10 +97,14 @@ def main():
     else:
         parser.error('Invalid args! You must supply a package list.')
         sys.exit(1)
-    results = tester.run(args.verbose, args.log_file)
+    if args.batch:
+        results = tester.run_batch(
+            args.verbose, args.log_file, args.jobs, args.store_volume)
+    else:
+        results = tester.run(args.verbose, args.log_file, args.jobs)
     failures = 0
     for test_case in results.keys():
-        if results[test_case] == 'failing':
+        if results[test_case] in ('failing', 'blocked'):
             failures = failures + 1
     # set exit status to the number of failures
     sys.exit(failures)
@@ -0,0 +1,160 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Timing of the phases of a run, per package and in total.
+
+Generators wrap each unit of work in a phase:
+
+    with timed_phase('rosdep'):
+        ...
+
+and generate_installers wraps the generation of each package in
+timed_package(), so the phases are attributed to the package being
+generated by the current thread. Nested phases only count their own time,
+e.g. the rosdep lookups done while rendering are not counted as rendering.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+import csv
+import json
+import threading
+import time
+
+# the phases reported, in order; phases outside of a package are reported
+# in the totals only
+PHASES = (
+    'package_xml', 'dependencies', 'rosdep', 'download', 'render', 'write',
+)
+
+_lock = threading.Lock()
+_local = threading.local()
+_start_time = time.perf_counter()
+_phase_totals = defaultdict(float)
+_package_times = dict()
+_counters = defaultdict(int)
+
+
+def reset():
+    """Forget everything recorded so far."""
+    global _start_time
+    with _lock:
+        _start_time = time.perf_counter()
+        _phase_totals.clear()
+        _package_times.clear()
+        _counters.clear()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def timed_package(distro_name, pkg_name):
+    """Attribute the phases run by this thread to the given package."""
+    key = (distro_name, pkg_name)
+    previous = getattr(_local, 'package', None)
+    _local.package = key
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.package = previous
+        with _lock:
+            times = _package_times.setdefault(key, defaultdict(float))
+            times['total'] += elapsed
+
+
+@contextmanager
+def timed_phase(name):
+    """Time a phase of the current package (if any) and of the run."""
+    stack = _stack()
+    # [name, time spent in nested phases]
+    frame = [name, 0.0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        self_time = elapsed - frame[1]
+        key = getattr(_local, 'package', None)
+        with _lock:
+            _phase_totals[name] += self_time
+            if key is not None:
+                times = _package_times.setdefault(key, defaultdict(float))
+                times[name] += self_time
+
+
+def count(name, n=1):
+    """Increment a counter of the run report, e.g. cache hits."""
+    with _lock:
+        _counters[name] += n
+
+
+def get_report():
+    """Return the report of the run as a JSON-serializable dict."""
+    with _lock:
+        phases = sorted(_phase_totals, key=_phase_order)
+        return {
+            'wall_time': time.perf_counter() - _start_time,
+            'phases': {p: _phase_totals[p] for p in phases},
+            'counters': dict(sorted(_counters.items())),
+            'packages': [
+                {
+                    'distro': distro_name,
+                    'package': pkg_name,
+                    'total': times.get('total', 0.0),
+                    'phases': {
+                        p: times[p] for p in sorted(times, key=_phase_order)
+                        if p != 'total'
+                    },
+                }
+                for (distro_name, pkg_name), times
+                in sorted(_package_times.items())
+            ],
+        }
+
+
+def write_report(filename):
+    """Write the report of the run, as CSV if filename ends in .csv."""
+    report = get_report()
+    with open(filename, 'w', newline='') as f:
+        if not filename.endswith('.csv'):
+            json.dump(report, f, indent=2)
+            f.write('\n')
+            return
+        phases = list(report['phases'])
+        writer = csv.writer(f)
+        writer.writerow(['distro', 'package', 'total'] + phases)
+        for entry in report['packages']:
+            writer.writerow(
+                [entry['distro'], entry['package'], '%.6f' % entry['total']] +
+                ['%.6f' % entry['phases'].get(p, 0.0) for p in phases])
+        writer.writerow(
+            ['', 'TOTAL', '%.6f' % report['wall_time']] +
+            ['%.6f' % report['phases'][p] for p in phases])
+
+
+def _phase_order(name):
+    if name in PHASES:
+        return (0, PHASES.index(name))
+    return (1, name)
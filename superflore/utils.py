@@ -14,18 +14,24 @@
 
 from datetime import datetime
 import errno
+import hashlib
 import os
 import random
 import re
-import shutil
 import string
 import sys
+import tarfile
 import time
 from typing import Dict
 import urllib.request
 
+from superflore.exceptions import OfflineCacheMiss
 from superflore.exceptions import UnknownPlatform
-from superflore.rosdep_support import get_cached_index, resolve_rosdep_key
+from superflore.rosdep_support import get_cached_index
+from superflore.rosdep_support import get_rosdep_definition
+from superflore.rosdep_support import resolve_rosdep_key
+from superflore.rosdep_support import resolve_rosdep_keys
+from superflore.timing import timed_phase
 from superflore.version import VERSION
 from termcolor import colored
 
@@ -117,6 +123,80 @@ def make_dir(dirname):
             raise e
 
 
+_cache_dir = None
+
+
+def set_cache_dir(path):
+    """Set the directory of the caches that persist across runs."""
+    global _cache_dir
+    _cache_dir = path
+
+
+def get_cache_dir(*subdirs):
+    """
+    Return (and create) a directory of the persistent superflore cache.
+
+    The cache is located in the directory given to set_cache_dir, else in
+    $SUPERFLORE_CACHE_DIR, else in $XDG_CACHE_HOME/superflore.
+    """
+    cache_dir = _cache_dir or os.getenv('SUPERFLORE_CACHE_DIR')
+    if not cache_dir:
+        cache_dir = os.path.join(
+            os.getenv('XDG_CACHE_HOME') or
+            os.path.join(os.path.expanduser('~'), '.cache'),
+            'superflore')
+    cache_dir = os.path.join(cache_dir, *subdirs)
+    make_dir(cache_dir)
+    return cache_dir
+
+
+_offline = False
+
+
+def set_offline(offline=True):
+    """
+    Only read from the local mirror in the cache directory, and never
+    from the network.
+
+    The rosdistro index in <cache>/rosdistro/index-v4.yaml and, if there
+    is one, the rosdep sources cache in <cache>/rosdep/sources.cache are
+    used instead of the remote ones. Anything else that is not in the
+    caches raises OfflineCacheMiss, see check_online.
+    """
+    global _offline
+    _offline = offline
+    if not offline:
+        return
+    index = os.path.join(get_cache_dir('rosdistro'), 'index-v4.yaml')
+    if os.path.isfile(index):
+        os.environ['ROSDISTRO_INDEX_URL'] = 'file://' + index
+    elif not os.getenv('ROSDISTRO_INDEX_URL', '').startswith('file://'):
+        raise OfflineCacheMiss(
+            "no rosdistro index in the local mirror '{0}'".format(index))
+    rosdep_dir = get_cache_dir('rosdep')
+    if os.path.isfile(os.path.join(rosdep_dir, 'sources.cache', 'index')):
+        # rosdep looks for its sources cache in $ROS_HOME/rosdep
+        os.environ['ROS_HOME'] = os.path.dirname(rosdep_dir)
+        os.environ['ROSDEP_SOURCE_PATH'] = os.path.join(
+            rosdep_dir, 'sources.list.d')
+        make_dir(os.environ['ROSDEP_SOURCE_PATH'])
+
+
+def is_offline():
+    return _offline
+
+
+def check_online(what):
+    """
+    Raise OfflineCacheMiss when running offline; called before fetching
+    what from the network because it is not in the caches.
+    """
+    if _offline:
+        raise OfflineCacheMiss(
+            "{0} is not in the local mirror '{1}'".format(
+                what, get_cache_dir()))
+
+
 def get_pkg_version(distro, pkg_name, **kwargs):
     pkg = distro.release_packages[pkg_name]
     repo = distro.repositories[pkg.repository_name].release_repository
@@ -700,18 +780,42 @@ def get_license(lic):
     return translate_license(lic)
 
 
-def resolve_dep(pkg, os, distro=None):
+def _get_rosdep_platform(os, distro=None):
+    """
+    Return the (os_name, os_version, ros_distro) rosdep resolves the
+    dependencies of the target platform os with.
+    """
     if os == 'openembedded':
-        return resolve_rosdep_key(pkg, 'openembedded', '', distro)
+        return 'openembedded', '', distro
     elif os == 'gentoo':
-        return resolve_rosdep_key(pkg, 'gentoo', '2.4.0')
+        return 'gentoo', '2.4.0', None
     elif os == 'nix':
-        return resolve_rosdep_key(pkg, 'nixos', '')
+        return 'nixos', '', None
     else:
         msg = "Unknown target platform '{0}'".format(os)
         raise UnknownPlatform(msg)
 
 
+def resolve_dep(pkg, os, distro=None):
+    with timed_phase('rosdep'):
+        return resolve_rosdep_key(pkg, *_get_rosdep_platform(os, distro))
+
+
+def resolve_deps(pkgs, os, distro=None):
+    """
+    Resolve many dependencies at once, see resolve_rosdep_keys.
+
+    Later calls to resolve_dep for these dependencies use the results.
+    """
+    with timed_phase('rosdep'):
+        return resolve_rosdep_keys(pkgs, *_get_rosdep_platform(os, distro))
+
+
+def get_dep_definition(pkg, os, distro=None):
+    """Return the rosdep rules that resolve_dep resolves pkg with."""
+    return get_rosdep_definition(pkg, *_get_rosdep_platform(os, distro))
+
+
 def get_distros():
     index = get_cached_index()
     return index.distributions
@@ -791,7 +895,59 @@ def url_to_repo_org(url):
     return url[0], url[1]
 
 
-def download_file(url, filename):
+class _HashingReader:
+    """File-like wrapper that hashes, and optionally copies, what is read."""
+    def __init__(self, fileobj, sink=None):
+        self.fileobj = fileobj
+        self.sink = sink
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+        if self.sink is not None:
+            self.sink.write(data)
+        return data
+
+    def drain(self, bufsize=1 << 16):
+        while self.read(bufsize):
+            pass
+
+
+def scan_archive(fileobj, member_regex=None, sink=None):
+    """
+    Read an archive in a single streaming pass.
+
+    Returns the SHA256 of the archive and the content of the first member
+    whose name matches member_regex (or None). If given, sink receives a
+    copy of every byte read, e.g. to save a download while scanning it.
+    Memory use does not depend on the size of the archive.
+    """
+    reader = _HashingReader(fileobj, sink)
+    member = None
+    if member_regex is not None:
+        try:
+            with tarfile.open(fileobj=reader, mode='r|*') as archive:
+                for tarinfo in archive:
+                    if member_regex.match(tarinfo.name):
+                        member = archive.extractfile(tarinfo).read()
+                        break
+        except tarfile.TarError as e:
+            warn('failed to read archive: {}'.format(e))
+    # hash (and copy) whatever tarfile did not need to read
+    reader.drain()
+    return reader.sha256.hexdigest(), member
+
+
+def download_file(url, filename, member_regex=None):
+    """
+    Download url to filename.
+
+    Returns the SHA256 of the download and, if member_regex is given, the
+    content of the matching member of the downloaded archive (see
+    scan_archive), both computed while the download is being written.
+    """
+    check_online("'{0}'".format(url))
     # GitLab returns 403 when using the default urllib User-Agent
     request = urllib.request.Request(url, headers={
         'User-Agent': 'superflore/{}'.format(get_superflore_version())
@@ -799,7 +955,7 @@ def download_file(url, filename):
     try:
         with urllib.request.urlopen(request) as response, \
                 open(filename, 'wb') as file:
-            shutil.copyfileobj(response, file)
+            return scan_archive(response, member_regex, sink=file)
     except Exception as e:
         try:
             os.remove(filename)
@@ -812,6 +968,9 @@ def retry_on_exception(callback, *args, max_retries=5, num_retry=0,
                        retry_msg='', error_msg='', sleep_secs=0.125):
     try:
         return callback(*args)
+    except OfflineCacheMiss:
+        # retrying cannot help
+        raise
     except Exception as e:
         if num_retry >= max_retries or max_retries < 0 or num_retry < 0:
             if error_msg:
@@ -0,0 +1,223 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Time the generation of a synthetic distro by each generator.
+
+Each (generator, number of packages) run is done in a new Python process,
+so that its peak RSS and its caches are its own. A run regenerates the
+whole distro like `--ros-distro` does: it computes the dependency graph,
+resolves the system dependencies, prefetches what the generator needs and
+then calls generate_installers, all of which is timed.
+
+    $ python -m tests.benchmarks --sizes 100 1000 --jobs 4 --render-jobs 4
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from superflore.TempfileManager import TempfileManager
+from tests.benchmarks.synthetic import DISTRO_NAME
+from tests.benchmarks.synthetic import SyntheticDistro
+
+GENERATORS = ('ebuild', 'bitbake', 'nix')
+YOCTO_RELEASE = 'scarthgap'
+
+
+class _Overlay:
+    def __init__(self, repo):
+        self.repo = repo
+
+
+def _make_overlay(path):
+    from superflore.repo_instance import RepoInstance
+    subprocess.run(['git', 'init', '-q', path], check=True)
+    return _Overlay(RepoInstance('benchmark', 'overlay', path, False))
+
+
+def _generate_ebuilds(distro, overlay, jobs, render_jobs):
+    from superflore.DependencyGraph import get_dependency_graph
+    from superflore.generate_installers import generate_installers
+    from superflore.generators.ebuild.gen_packages import \
+        _package_condition_context
+    from superflore.generators.ebuild.gen_packages import regenerate_pkg
+    from superflore.RenderPool import RenderPool
+
+    get_dependency_graph(distro).precompute(jobs=jobs)
+    get_dependency_graph(distro).resolve_external_depends(
+        'gentoo', _package_condition_context(distro.name),
+        ('buildtool', 'build', 'run', 'test'))
+    with RenderPool(render_jobs) as render_pool:
+        return generate_installers(
+            distro, overlay, regenerate_pkg, False, render_pool,
+            jobs=jobs)
+
+
+def _generate_recipes(distro, overlay, jobs, render_jobs):
+    from superflore.DependencyGraph import get_dependency_graph
+    from superflore.generate_installers import generate_installers
+    from superflore.generators.bitbake.gen_packages import regenerate_pkg
+    from superflore.generators.bitbake.yocto_recipe import yoctoRecipe
+    from superflore.PackageIndex import get_package_index
+    from superflore.RenderPool import RenderPool
+
+    yoctoRecipe.reset()
+    get_dependency_graph(distro).precompute(jobs=jobs)
+    get_dependency_graph(distro).resolve_external_depends(
+        'openembedded', yoctoRecipe._get_condition_context(distro.name),
+        ('buildtool', 'build', 'build_export', 'buildtool_export', 'exec',
+         'test'))
+    srcrev_cache = dict()
+    yoctoRecipe.prefetch_srcrevs(
+        distro, srcrev_cache, get_package_index(distro).names, jobs=jobs)
+    with RenderPool(render_jobs) as render_pool:
+        return generate_installers(
+            distro, overlay, regenerate_pkg, False, YOCTO_RELEASE,
+            srcrev_cache, [], render_pool, is_oe=True,
+            jobs=jobs)
+
+
+def _generate_derivations(distro, overlay, jobs, render_jobs, tar_dir):
+    from superflore.DependencyGraph import get_dependency_graph
+    from superflore.generate_installers import generate_installers
+    from superflore.generators.nix.gen_packages import prefetch_archives
+    from superflore.generators.nix.gen_packages import regenerate_pkg
+    from superflore.PackageIndex import get_package_index
+    from superflore.RenderPool import RenderPool
+    from superflore.utils import get_distro_condition_context
+
+    get_dependency_graph(distro).precompute(jobs=jobs)
+    get_dependency_graph(distro).resolve_external_depends(
+        'nix', get_distro_condition_context(distro.name),
+        ('buildtool', 'buildtool_export', 'build', 'build_export', 'exec',
+         'test'))
+    sha256_cache = dict()
+    prefetch_archives(
+        overlay, distro, get_package_index(distro).names, False, tar_dir,
+        sha256_cache)
+    with RenderPool(render_jobs) as render_pool:
+        return generate_installers(
+            distro, overlay, regenerate_pkg, False, tar_dir, sha256_cache,
+            render_pool, jobs=jobs)
+
+
+def run_generator(generator, root, jobs=1, render_jobs=1):
+    """
+    Generate the synthetic distro under root with the generator, in this
+    process, and return the measurements.
+    """
+    synthetic = SyntheticDistro(root, 0)
+    os.environ.update(synthetic.env)
+    from rosinstall_generator.distro import get_distro
+    from superflore.timing import get_report
+    from superflore.utils import set_cache_dir
+
+    set_cache_dir(synthetic.cache_dir)
+    with tempfile.TemporaryDirectory() as overlay_dir:
+        overlay = _make_overlay(overlay_dir)
+        start = time.perf_counter()
+        distro = get_distro(DISTRO_NAME)
+        if generator == 'ebuild':
+            installers, broken, _ = _generate_ebuilds(
+                distro, overlay, jobs, render_jobs)
+        elif generator == 'bitbake':
+            installers, broken, _ = _generate_recipes(
+                distro, overlay, jobs, render_jobs)
+        else:
+            installers, broken, _ = _generate_derivations(
+                distro, overlay, jobs, render_jobs, synthetic.tar_dir)
+        elapsed = time.perf_counter() - start
+    return {
+        'generator': generator,
+        'jobs': jobs,
+        'render_jobs': render_jobs,
+        'packages': len(installers),
+        'unresolved': len(broken),
+        'seconds': elapsed,
+        'packages_per_second': len(installers) / elapsed,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mib':
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_worker_rss_mib':
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'phases': get_report()['phases'],
+    }
+
+
+def benchmark(generator, root, jobs=1, render_jobs=1, verbose=False):
+    """Run run_generator in a new process and return its measurements."""
+    with tempfile.NamedTemporaryFile('r', suffix='.json') as result:
+        subprocess.run(
+            [sys.executable, '-m', 'tests.benchmarks.bench_generate',
+             generator, root, str(jobs), str(render_jobs), result.name],
+            check=True,
+            stdout=None if verbose else subprocess.DEVNULL)
+        return json.load(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.benchmarks',
+        description='Benchmark the generators on synthetic distros')
+    parser.add_argument(
+        '--sizes', help='numbers of packages of the synthetic distros',
+        type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument(
+        '--generators', help='generators to benchmark',
+        nargs='+', choices=GENERATORS, default=list(GENERATORS))
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--render-jobs', type=int, default=1)
+    parser.add_argument(
+        '--work-dir', help='where to write the synthetic distros, which '
+                           + 'are reused by later runs (default: temporary)')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument(
+        '--verbose', help='show the output of superflore',
+        action='store_true')
+    args = parser.parse_args(argv)
+
+    results = []
+    print('{0:>8} {1:>8} {2:>10} {3:>10} {4:>10}'.format(
+        'gen', 'packages', 'seconds', 'pkgs/s', 'peak MiB'))
+    with TempfileManager(args.work_dir) as work_dir:
+        for size in args.sizes:
+            root = os.path.join(work_dir, str(size))
+            SyntheticDistro(root, size).write()
+            for generator in args.generators:
+                result = benchmark(
+                    generator, root, args.jobs, args.render_jobs,
+                    args.verbose)
+                result['size'] = size
+                results.append(result)
+                print('{0:>8} {1:>8} {2:>10.2f} {3:>10.1f} {4:>10.1f}'.format(
+                    generator, result['packages'], result['seconds'],
+                    result['packages_per_second'], result['peak_rss_mib']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    return results
+
+
+if __name__ == '__main__':
+    generator, root, jobs, render_jobs, output = sys.argv[1:]
+    result = run_generator(generator, root, int(jobs), int(render_jobs))
+    with open(output, 'w') as f:
+        json.dump(result, f)
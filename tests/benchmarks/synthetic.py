@@ -0,0 +1,299 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A synthetic ROS distro on the local filesystem, for benchmarking.
+
+Everything superflore reads from the network is written under one
+directory:
+
+ * a rosdistro index, distribution file and distribution cache, used
+   through ROSDISTRO_INDEX_URL;
+ * a rosdep sources list and rosdep data for every system dependency,
+   used through ROSDEP_SOURCE_PATH and ROS_HOME;
+ * a bare release repository per source repository, with the release
+   tags, which git uses in place of the GitHub URLs of the distribution
+   file through a url.insteadOf rule of GIT_CONFIG_GLOBAL;
+ * the release archives, in the directory given to --tar-archive-dir;
+ * the package.xml cache of superflore, as left by a previous run.
+"""
+
+import gzip
+import io
+import os
+import random
+import subprocess
+import sys
+import tarfile
+
+import yaml
+
+DISTRO_NAME = 'benchdistro'
+RELEASE_URL = 'https://github.com/ros2-gbp/'
+PACKAGES_PER_REPO = 4
+NUM_SYSTEM_DEPENDS = 40
+LICENSES = ('BSD', 'Apache License 2.0', 'MIT', 'LGPL-3', 'GPLv3')
+
+PACKAGE_XML_TEMPLATE = """<?xml version="1.0"?>
+<package format="3">
+  <name>{name}</name>
+  <version>{version}</version>
+  <description>The {name} package, generated for benchmarking</description>
+  <maintainer email="someone@example.com">Someone</maintainer>
+  <license>{license}</license>
+  <url type="website">https://example.com/{name}</url>
+  <author email="author@example.com">Author</author>
+  <buildtool_depend>ament_cmake</buildtool_depend>
+{depends}  <export>
+    <build_type>ament_cmake</build_type>
+  </export>
+</package>
+"""
+
+
+class SyntheticDistro:
+    """
+    A synthetic distro of num_packages packages, written under root.
+
+    The packages are spread over release repositories of
+    PACKAGES_PER_REPO packages, and each one depends on a few of the
+    packages before it and on a few system dependencies. The same seed
+    always gives the same distro.
+    """
+    def __init__(self, root, num_packages, seed=0):
+        self.root = os.path.abspath(root)
+        self.num_packages = num_packages
+        self.random = random.Random(seed)
+        self.repositories = dict()
+        self.package_xmls = dict()
+        self.system_depends = \
+            ['libbench%d' % i for i in range(NUM_SYSTEM_DEPENDS)] + \
+            ['ament_cmake']
+
+    @property
+    def env(self):
+        """The environment variables pointing superflore at the distro."""
+        return {
+            'ROSDISTRO_INDEX_URL':
+                'file://' + os.path.join(self.root, 'index-v4.yaml'),
+            'ROSDEP_SOURCE_PATH':
+                os.path.join(self.root, 'rosdep', 'sources.list.d'),
+            'ROS_HOME': os.path.join(self.root, 'ros_home'),
+            'GIT_CONFIG_GLOBAL': os.path.join(self.root, 'gitconfig'),
+            'GIT_CONFIG_NOSYSTEM': '1',
+        }
+
+    @property
+    def tar_dir(self):
+        return os.path.join(self.root, 'archives')
+
+    @property
+    def cache_dir(self):
+        return os.path.join(self.root, 'cache')
+
+    def get_release_tag(self, pkg_name, version):
+        return 'release/{0}/{1}/{2}'.format(DISTRO_NAME, pkg_name, version)
+
+    def write(self):
+        """Write the distro, return self."""
+        self._make_packages()
+        self._write_rosdistro()
+        self._write_rosdep()
+        self._write_release_repositories()
+        os.environ.update(self.env)
+        self._update_rosdep()
+        self._write_archives_and_cache()
+        return self
+
+    def _make_packages(self):
+        names = ['bench_pkg_%05d' % i for i in range(self.num_packages)]
+        for i, name in enumerate(names):
+            repo_name = 'bench_repo_%05d' % (i // PACKAGES_PER_REPO)
+            version = '1.%d.0' % (i // PACKAGES_PER_REPO % 10)
+            repo = self.repositories.setdefault(repo_name, {
+                'packages': [], 'version': version + '-1',
+            })
+            repo['packages'].append(name)
+            system_depends = self.random.sample(
+                self.system_depends[:-1], 4)
+            depends = [
+                ('depend', dep) for dep in sorted(self.random.sample(
+                    names[:i], min(i, self.random.randint(0, 4))))
+            ] + [
+                ('depend', dep) for dep in sorted(system_depends[:2])
+            ] + [
+                ('exec_depend', system_depends[2]),
+                ('test_depend', system_depends[3]),
+            ]
+            self.package_xmls[name] = PACKAGE_XML_TEMPLATE.format(
+                name=name, version=version,
+                license=self.random.choice(LICENSES),
+                depends=''.join(
+                    '  <{0}>{1}</{0}>\n'.format(tag, dep)
+                    for tag, dep in depends))
+
+    def _distribution_file_data(self):
+        return {
+            'type': 'distribution',
+            'version': 2,
+            'release_platforms': {'ubuntu': ['noble']},
+            'repositories': {
+                repo_name: {
+                    'release': {
+                        'packages': repo['packages'],
+                        'tags': {
+                            'release': self.get_release_tag(
+                                '{package}', '{version}'),
+                        },
+                        'url': '{0}{1}-release.git'.format(
+                            RELEASE_URL, repo_name),
+                        'version': repo['version'],
+                    },
+                    'status': 'maintained',
+                }
+                for repo_name, repo in self.repositories.items()
+            },
+        }
+
+    def _write_rosdistro(self):
+        distribution_dir = os.path.join(self.root, DISTRO_NAME)
+        os.makedirs(distribution_dir, exist_ok=True)
+        data = self._distribution_file_data()
+        _write_yaml(os.path.join(distribution_dir, 'distribution.yaml'), data)
+        _write_yaml(
+            os.path.join(self.root, DISTRO_NAME + '-cache.yaml'), {
+                'type': 'cache',
+                'version': 2,
+                'name': DISTRO_NAME,
+                'distribution_file': [data],
+                'release_package_xmls': self.package_xmls,
+            })
+        _write_yaml(os.path.join(self.root, 'index-v4.yaml'), {
+            'type': 'index',
+            'version': 4,
+            'distributions': {
+                DISTRO_NAME: {
+                    'distribution': [DISTRO_NAME + '/distribution.yaml'],
+                    'distribution_cache': DISTRO_NAME + '-cache.yaml',
+                    'distribution_status': 'active',
+                    'distribution_type': 'ros2',
+                    'python_version': 3,
+                },
+            },
+        })
+
+    def _write_rosdep(self):
+        rosdep_dir = os.path.join(self.root, 'rosdep')
+        os.makedirs(os.path.join(rosdep_dir, 'sources.list.d'),
+                    exist_ok=True)
+        _write_yaml(os.path.join(rosdep_dir, 'base.yaml'), {
+            key: {
+                'gentoo': ['dev-libs/' + key],
+                'nixos': [key.replace('_', '-')],
+                'openembedded': [key.replace('_', '-') + '@meta-oe'],
+                'ubuntu': ['lib%s-dev' % key],
+            }
+            for key in self.system_depends
+        })
+        with open(os.path.join(
+            rosdep_dir, 'sources.list.d', '20-benchmark.list'
+        ), 'w') as f:
+            f.write('yaml file://{0}\n'.format(
+                os.path.join(rosdep_dir, 'base.yaml')))
+
+    def _update_rosdep(self):
+        from rosdep2.sources_list import get_sources_cache_dir
+        from rosdep2.sources_list import update_sources_list
+        update_sources_list(
+            sources_cache_dir=get_sources_cache_dir(), quiet=True)
+
+    def _write_release_repositories(self):
+        release_dir = os.path.join(self.root, 'release')
+        os.makedirs(release_dir, exist_ok=True)
+        with open(self.env['GIT_CONFIG_GLOBAL'], 'w') as f:
+            f.write(
+                '[user]\n\tname = superflore\n\temail = bench@example.com\n'
+                '[init]\n\tdefaultBranch = master\n'
+                '[url "file://{0}/"]\n\tinsteadOf = {1}\n'.format(
+                    release_dir, RELEASE_URL))
+        env = dict(os.environ, **self.env)
+        for repo_name, repo in self.repositories.items():
+            path = os.path.join(release_dir, repo_name + '-release.git')
+            if os.path.isdir(path):
+                continue
+            _git(env, 'init', '-q', '--bare', path)
+            # one commit per release tag, like a real release repository
+            for pkg_name in repo['packages']:
+                tree = _git(env, '--git-dir', path, 'hash-object', '-w',
+                            '--stdin', input=self.package_xmls[pkg_name])
+                tree = _git(
+                    env, '--git-dir', path, 'mktree',
+                    input='100644 blob {0}\tpackage.xml\n'.format(tree))
+                commit = _git(env, '--git-dir', path, 'commit-tree', tree,
+                              '-m', 'Release ' + pkg_name)
+                _git(env, '--git-dir', path, 'tag', self.get_release_tag(
+                    pkg_name, repo['version']), commit)
+
+    def _write_archives_and_cache(self):
+        # import superflore only now that its environment is set up
+        from rosinstall_generator.distro import get_distro
+        from superflore.generators.nix.nix_package import NixPackage
+        from superflore.PackageIndex import get_package_index
+        from superflore.PackageXmlCache import PackageXmlCache
+
+        distro = get_distro(DISTRO_NAME)
+        pkg_index = get_package_index(distro)
+        package_xml_cache = PackageXmlCache(
+            os.path.join(self.cache_dir, 'package_xml'))
+        os.makedirs(self.tar_dir, exist_ok=True)
+        for pkg_name, package_xml in self.package_xmls.items():
+            repo_url = pkg_index.get_repository(pkg_name).url
+            release_tag = pkg_index.get_release_tag(pkg_name)
+            package_xml_cache.put(repo_url, release_tag, package_xml)
+            archive_path = NixPackage.get_archive_path(
+                pkg_name, distro, self.tar_dir)
+            if not os.path.exists(archive_path):
+                _write_archive(
+                    archive_path, '{0}-{1}'.format(
+                        pkg_name, release_tag.replace('/', '-')),
+                    package_xml)
+
+
+def _write_yaml(filename, data):
+    with open(filename, 'w') as f:
+        yaml.safe_dump(data, f, default_flow_style=False)
+
+
+def _git(env, *args, input=None):
+    return subprocess.run(
+        ['git'] + list(args), env=env, input=input, check=True,
+        stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+
+
+def _write_archive(filename, top_dir, package_xml):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w') as tar:
+        for name, content in (
+            ('package.xml', package_xml.encode()),
+            ('CMakeLists.txt', b'cmake_minimum_required(VERSION 3.8)\n'),
+        ):
+            info = tarfile.TarInfo('{0}/{1}'.format(top_dir, name))
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    with gzip.open(filename, 'wb') as f:
+        f.write(buf.getvalue())
+
+
+if __name__ == '__main__':
+    SyntheticDistro(sys.argv[1], int(sys.argv[2])).write()
@@ -0,0 +1,90 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Small in-memory ROS distros, so tests don't need the rosdistro index."""
+
+from rosdistro.distribution import Distribution
+from rosdistro.distribution_file import DistributionFile
+
+PACKAGE_XML_TEMPLATE = """<?xml version="1.0"?>
+<package format="3">
+  <name>{name}</name>
+  <version>{version}</version>
+  <description>The {name} package</description>
+  <maintainer email="someone@example.com">Someone</maintainer>
+  <license>BSD</license>
+{depends}  <export>
+    <build_type>ament_cmake</build_type>
+  </export>
+</package>
+"""
+
+
+def make_package_xml(name, version='1.0.0', depends=None):
+    """
+    Return a package.xml for the package.
+
+    depends maps a dependency tag (e.g. 'build_depend') to a list of
+    dependency names, or of (name, condition) tuples.
+    """
+    lines = ''
+    for tag, deps in sorted((depends or dict()).items()):
+        for dep in deps:
+            if isinstance(dep, tuple):
+                lines += '  <{0} condition="{2}">{1}</{0}>\n'.format(
+                    tag, dep[0], dep[1])
+            else:
+                lines += '  <{0}>{1}</{0}>\n'.format(tag, dep)
+    return PACKAGE_XML_TEMPLATE.format(
+        name=name, version=version, depends=lines)
+
+
+def make_distro(packages, name='fakedistro', unreleased=None):
+    """
+    Build a rosdistro Distribution from a dict of packages.
+
+    packages maps a package name to a dict with the optional keys
+    'repo' (release repository name, defaults to the package name),
+    'version' (release version, defaults to '1.0.0-1') and 'depends'
+    (as in make_package_xml).
+    """
+    repositories = dict()
+    package_xmls = dict()
+    for pkg_name, pkg in packages.items():
+        repo_name = pkg.get('repo', pkg_name)
+        version = pkg.get('version', '1.0.0-1')
+        repo = repositories.setdefault(repo_name, {'release': {
+            'packages': [],
+            'tags': {'release': 'release/%s/{package}/{version}' % name},
+            'url': 'https://github.com/ros2-gbp/%s-release.git' % repo_name,
+            'version': version,
+        }})
+        repo['release']['packages'].append(pkg_name)
+        package_xmls[pkg_name] = make_package_xml(
+            pkg_name, version.split('-')[0], pkg.get('depends'))
+    for repo_name in unreleased or []:
+        repositories[repo_name] = {'release': {
+            'tags': {'release': 'release/%s/{package}/{version}' % name},
+            'url': 'https://github.com/ros2-gbp/%s-release.git' % repo_name,
+        }}
+    distribution_file = DistributionFile(name, {
+        'type': 'distribution',
+        'version': 2,
+        'release_platforms': {'ubuntu': ['noble']},
+        'repositories': repositories,
+    })
+
+    def manifest_provider(_, repo, pkg_name):
+        return package_xmls[pkg_name]
+    return Distribution(distribution_file, [manifest_provider])
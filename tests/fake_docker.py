@@ -0,0 +1,67 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A stand-in for superflore.docker.Docker, so tests don't need Docker."""
+
+import os
+import subprocess
+import threading
+
+from superflore.docker import Docker
+from superflore.TempfileManager import TempfileManager
+
+
+class FakeDocker:
+    """
+    Runs the commands of a container with the local bash, the mapped
+    directories being replaced by their host directory.
+
+    The shell functions of prelude stand in for the tools of the image.
+    The images and log files of the containers run are recorded in runs
+    and log_files, and a command
+    failing raises a ContainerError, like Docker.run.
+    """
+    prelude = ''
+    runs = []
+    log_files = []
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.image = None
+        self.directory_map = dict()
+        self.bash_cmds = list()
+
+    map_directory = Docker.map_directory
+    add_bash_command = Docker.add_bash_command
+    clear_commands = Docker.clear_commands
+    get_command = Docker.get_command
+
+    def pull(self, org, repo, tag='latest'):
+        self.image = '%s/%s:%s' % (org, repo, tag)
+
+    def run(self, rm=True, show_cmd=False, privileged=False, log_file=None):
+        from docker.errors import ContainerError
+        with self.lock:
+            self.runs.append(self.image)
+            self.log_files.append(log_file)
+        with TempfileManager(None) as tmp:
+            cmd = self.get_command(tmp, 'log.txt')
+            for host, volume in self.directory_map.items():
+                cmd = cmd.replace(volume['bind'], host)
+            returncode = subprocess.run(
+                ['bash', '-c', self.prelude + cmd]).returncode
+            with open(os.path.join(tmp, 'log.txt')) as logfile:
+                self.log = logfile.read()
+        if returncode:
+            raise ContainerError(None, returncode, cmd, self.image, '')
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import pickle
 
 from superflore.CacheManager import CacheManager
 from superflore.TempfileManager import TempfileManager
@@ -34,3 +35,40 @@ class TestCacheManager(unittest.TestCase):
                 self.assertEqual(cache['b'], 'B')
                 self.assertEqual(cache['c'], 'C')
             self.assertTrue(os.path.exists(cache_file))
+
+    def test_CacheFileCrashSafe(self):
+        """Test that entries survive a run that never exits cleanly"""
+        with TempfileManager(None) as tmp:
+            cache_file = '%s/my_cache.pickle' % tmp
+            crashed = CacheManager(cache_file)
+            cache = crashed.__enter__()
+            cache['a'] = 'A'
+            cache['b'] = 'B'
+            # no __exit__, as if the run was interrupted
+            with CacheManager(cache_file) as cache:
+                self.assertEqual(cache['a'], 'A')
+                self.assertEqual(cache['b'], 'B')
+                self.assertNotIn('c', cache)
+                self.assertEqual(sorted(cache), ['a', 'b'])
+                del cache['a']
+                self.assertEqual(len(cache), 1)
+            crashed.__exit__(None, None, None)
+
+    def test_LegacyPickleCacheFile(self):
+        """Test that a pickled cache from an older version is migrated"""
+        with TempfileManager(None) as tmp:
+            cache_file = '%s/my_cache.pickle' % tmp
+            with open(cache_file, 'wb') as f:
+                pickle.dump({'a': 'A', 'b': 'B'}, f)
+            with CacheManager(cache_file) as cache:
+                self.assertEqual(dict(cache), {'a': 'A', 'b': 'B'})
+                cache['c'] = 'C'
+            with CacheManager(cache_file) as cache:
+                self.assertEqual(cache['c'], 'C')
+                self.assertEqual(len(cache), 3)
+
+    def test_NoCacheFile(self):
+        """Test that no file means an in-memory cache"""
+        with CacheManager(None) as cache:
+            cache['a'] = 'A'
+            self.assertEqual(cache, {'a': 'A'})
@@ -0,0 +1,147 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from rosdistro.dependency_walker import DependencyWalker
+from superflore import utils
+from superflore.DependencyGraph import depend_types
+from superflore.DependencyGraph import DependencyGraph
+from superflore.DependencyGraph import get_dependency_graph
+from superflore.exceptions import OfflineCacheMiss
+from superflore.PackageIndex import get_package_index
+from superflore.PackageXmlCache import get_package_xml_cache
+from superflore.TempfileManager import TempfileManager
+from superflore.utils import set_cache_dir
+from superflore.utils import set_offline
+from tests.fake_distro import make_distro
+from tests.fake_distro import make_package_xml
+import unittest
+
+ros1_context = {'ROS_VERSION': '1'}
+ros2_context = {'ROS_VERSION': '2'}
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def get_distro(self):
+        return make_distro({
+            'foo': {'depends': {
+                'buildtool_depend': [
+                    ('catkin', '$ROS_VERSION == 1'),
+                    ('ament_cmake', '$ROS_VERSION == 2'),
+                ],
+                'depend': ['bar', 'boost'],
+                'test_depend': ['gtest'],
+            }},
+            'bar': {'depends': {'exec_depend': ['python3-yaml']}},
+        })
+
+    def test_depends(self):
+        """Test the dependencies of each type"""
+        graph = DependencyGraph(self.get_distro())
+        self.assertEqual(
+            graph.get_depends('foo', 'build', ros2_context),
+            {'bar', 'boost'})
+        self.assertEqual(
+            graph.get_depends('foo', 'buildtool', ros2_context),
+            {'ament_cmake'})
+        self.assertEqual(
+            graph.get_depends('foo', 'buildtool', ros1_context), {'catkin'})
+        self.assertEqual(
+            graph.get_depends('foo', 'buildtool'), {'catkin', 'ament_cmake'})
+        self.assertEqual(
+            graph.get_depends('foo', 'test', ros2_context), {'gtest'})
+        self.assertEqual(
+            graph.get_depends('bar', 'exec', ros2_context), {'python3-yaml'})
+        with self.assertRaises(KeyError):
+            graph.get_depends('qux', 'build', ros2_context)
+
+    def test_recursive_depends(self):
+        """Test the dependencies through other packages of the distro"""
+        graph = DependencyGraph(make_distro({
+            'foo': {'depends': {'build_depend': ['bar', 'boost']}},
+            'bar': {'depends': {
+                'exec_depend': ['baz'], 'test_depend': ['qux']}},
+            'baz': {'depends': {'depend': ['foo']}},
+            'qux': {},
+        }))
+        self.assertEqual(
+            graph.get_recursive_depends('foo', ros2_context), {'bar', 'baz'})
+        self.assertEqual(graph.get_recursive_depends('qux'), set())
+        self.assertEqual(
+            graph.get_recursive_depends('bar', types=('test',)), {'qux'})
+
+    def test_external_depends(self):
+        """Test collecting the rosdep keys of the whole distro"""
+        graph = DependencyGraph(self.get_distro())
+        self.assertEqual(graph.get_external_depends(ros2_context), {
+            'ament_cmake': {'foo'},
+            'boost': {'foo'},
+            'gtest': {'foo'},
+            'python3-yaml': {'bar'},
+        })
+        self.assertEqual(
+            graph.get_external_depends(ros1_context, ('buildtool', 'build')),
+            {'catkin': {'foo'}, 'boost': {'foo'}})
+
+    def test_matches_dependency_walker(self):
+        """Test that the graph agrees with rosdistro's DependencyWalker"""
+        distro = self.get_distro()
+        graph = DependencyGraph(distro)
+        for context in (None, ros1_context, ros2_context):
+            walker = DependencyWalker(distro, context)
+            for pkg in ('foo', 'bar'):
+                for depend_type in depend_types:
+                    self.assertEqual(
+                        graph.get_depends(pkg, depend_type, context),
+                        walker.get_depends(pkg, depend_type))
+
+    def test_parsed_once(self):
+        """Test that each package.xml is only parsed once"""
+        graph = DependencyGraph(self.get_distro())
+        graph.precompute(jobs=2)
+        pkg = graph.get_package('foo')
+        graph.get_all_depends('foo', ros1_context)
+        graph.get_all_depends('foo', ros2_context)
+        self.assertIs(pkg, graph.get_package('foo'))
+        self.assertEqual(sorted(graph._packages), ['bar', 'foo'])
+
+    def test_memoized(self):
+        """Test that the graph is shared per distro"""
+        distro = self.get_distro()
+        self.assertIs(
+            get_dependency_graph(distro), get_dependency_graph(distro))
+
+    def test_offline(self):
+        """Test that offline, package.xml files only come from the mirror"""
+        distro = self.get_distro()
+        # as if the distribution cache missed every package
+        distro._manifest_providers = []
+        with TempfileManager(None) as tmp:
+            set_cache_dir(tmp)
+            # bypass the checks of set_offline, only the flag matters here
+            utils._offline = True
+            try:
+                pkg_index = get_package_index(distro)
+                get_package_xml_cache().put(
+                    pkg_index.get_repository('bar').url,
+                    pkg_index.get_release_tag('bar'),
+                    make_package_xml(
+                        'bar', depends={'exec_depend': ['python3-yaml']}))
+                graph = DependencyGraph(distro)
+                self.assertEqual(
+                    graph.get_depends('bar', 'exec'), {'python3-yaml'})
+                with self.assertRaises(OfflineCacheMiss):
+                    graph.get_depends('foo', 'build')
+            finally:
+                set_offline(False)
+                set_cache_dir(None)
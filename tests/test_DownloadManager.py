@@ -0,0 +1,195 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import io
+import os
+import re
+import tarfile
+import threading
+
+from superflore.DownloadManager import DownloadManager
+from superflore.TempfileManager import TempfileManager
+import unittest
+
+
+def make_archive(name):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as archive:
+        for member, data in [
+            ('%s/package.xml' % name, b'<package><name>%s</name></package>'
+             % name.encode()),
+            ('%s/data.bin' % name, os.urandom(200000)),
+        ]:
+            tarinfo = tarfile.TarInfo(member)
+            tarinfo.size = len(data)
+            archive.addfile(tarinfo, io.BytesIO(data))
+    return buf.getvalue()
+
+
+ARCHIVES = {'/foo.tar.gz': make_archive('foo'),
+            '/bar.tar.gz': make_archive('bar')}
+PACKAGE_XML_REGEX = re.compile(r'^[^/]+/package\.xml$')
+
+
+def get_etag(data):
+    return '"%s"' % hashlib.sha256(data).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        _Handler.requests.append((self.path, self.headers.get('Range')))
+        # /bad-range/<path> answers every Range from the first byte
+        bad_range = self.path.startswith('/bad-range/')
+        data = ARCHIVES.get(self.path[len('/bad-range'):] if bad_range
+                            else self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        match = re.match(r'bytes=(\d+)-', self.headers.get('Range') or '')
+        if_range = self.headers.get('If-Range')
+        if match and if_range not in (None, get_etag(data)):
+            # the file changed, send all of it
+            match = None
+        if match and int(match.group(1)) >= len(data):
+            self.send_response(416)
+            self.send_header('Content-Range', 'bytes */%d' % len(data))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if match:
+            start = 0 if bad_range else int(match.group(1))
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (
+                start, len(data) - 1, len(data)))
+            data = data[start:]
+        else:
+            self.send_response(200)
+        self.send_header('ETag', get_etag(data))
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDownloadManager(unittest.TestCase):
+    def setUp(self):
+        _Handler.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_port
+        threading.Thread(target=self.server.serve_forever).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_download(self):
+        """Test a download, with its hash and package.xml"""
+        with TempfileManager(None) as tmp, \
+                DownloadManager(jobs=2) as download_manager:
+            filename = os.path.join(tmp, 'foo.tar.gz')
+            sha256, package_xml = download_manager.download(
+                self.url + '/foo.tar.gz', filename, PACKAGE_XML_REGEX)
+            data = ARCHIVES['/foo.tar.gz']
+            self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+            self.assertEqual(
+                package_xml, b'<package><name>foo</name></package>')
+            self.assertEqual(download_manager.sha256_cache[filename], sha256)
+            with open(filename, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            self.assertFalse(os.path.exists(filename + '.part'))
+
+    def test_resume(self):
+        """Test resuming an interrupted download"""
+        data = ARCHIVES['/foo.tar.gz']
+        with TempfileManager(None) as tmp, \
+                DownloadManager() as download_manager:
+            filename = os.path.join(tmp, 'foo.tar.gz')
+            with open(filename + '.part', 'wb') as f:
+                f.write(data[:1000])
+            # the ETag of the interrupted download, sent as If-Range
+            with open(filename + '.part.validator', 'w') as f:
+                f.write(get_etag(data))
+            sha256, package_xml = download_manager.download(
+                self.url + '/foo.tar.gz', filename, PACKAGE_XML_REGEX)
+            self.assertEqual(_Handler.requests,
+                             [('/foo.tar.gz', 'bytes=1000-')])
+            self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+            self.assertEqual(
+                package_xml, b'<package><name>foo</name></package>')
+            with open(filename, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            self.assertEqual(os.listdir(tmp), ['foo.tar.gz'])
+
+    def test_resume_mismatch(self):
+        """Test starting over when the partial download doesn't match"""
+        data = ARCHIVES['/foo.tar.gz']
+        for path, part_data, validator in [
+            # larger than the file, which the 416 response tells
+            ('/foo.tar.gz', data + b'garbage', None),
+            # the server answers from the first byte
+            ('/bad-range/foo.tar.gz', data[:1000], None),
+            # the file changed on the server
+            ('/foo.tar.gz', b'x' * 1000, get_etag(b'old')),
+        ]:
+            _Handler.requests = []
+            with TempfileManager(None) as tmp, \
+                    DownloadManager() as download_manager:
+                filename = os.path.join(tmp, 'foo.tar.gz')
+                with open(filename + '.part', 'wb') as f:
+                    f.write(part_data)
+                if validator:
+                    with open(filename + '.part.validator', 'w') as f:
+                        f.write(validator)
+                sha256, _ = download_manager.download(
+                    self.url + path, filename)
+                self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+                self.assertEqual(
+                    download_manager.sha256_cache[filename], sha256)
+                with open(filename, 'rb') as f:
+                    self.assertEqual(f.read(), data)
+                self.assertEqual(os.listdir(tmp), ['foo.tar.gz'])
+                self.assertEqual(
+                    _Handler.requests[0],
+                    (path, 'bytes=%d-' % len(part_data)))
+
+    def test_fetch_all(self):
+        """Test downloading many files, skipping existing and failed ones"""
+        sha256_cache = dict()
+        with TempfileManager(None) as tmp, \
+                DownloadManager(sha256_cache, jobs=4) as download_manager:
+            existing = os.path.join(tmp, 'existing.tar.gz')
+            with open(existing, 'wb') as f:
+                f.write(b'')
+            downloads = [
+                (self.url + '/foo.tar.gz', os.path.join(tmp, 'foo.tar.gz')),
+                (self.url + '/bar.tar.gz', os.path.join(tmp, 'bar.tar.gz')),
+                (self.url + '/foo.tar.gz', existing),
+            ]
+            package_xmls = download_manager.fetch_all(
+                downloads, PACKAGE_XML_REGEX)
+            self.assertEqual(sorted(package_xmls), [
+                os.path.join(tmp, 'bar.tar.gz'),
+                os.path.join(tmp, 'foo.tar.gz'),
+            ])
+            self.assertEqual(sorted(sha256_cache), sorted(package_xmls))
+            self.assertEqual(
+                package_xmls[os.path.join(tmp, 'bar.tar.gz')],
+                b'<package><name>bar</name></package>')
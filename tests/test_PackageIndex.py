@@ -0,0 +1,72 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from superflore.PackageIndex import get_package_index
+from superflore.PackageIndex import PackageIndex
+from tests.fake_distro import make_distro
+import unittest
+
+
+class TestPackageIndex(unittest.TestCase):
+    def get_distro(self):
+        return make_distro({
+            'foo': {'version': '1.2.3-0'},
+            'foo_msgs': {'repo': 'foo', 'version': '1.2.3-0'},
+            'bar': {'version': '0.1.0-2'},
+        }, unreleased=['baz'])
+
+    def test_names(self):
+        """Test the package names of the index"""
+        index = PackageIndex(self.get_distro())
+        self.assertEqual(index.names, frozenset(['foo', 'foo_msgs', 'bar']))
+        self.assertIn('foo_msgs', index)
+        self.assertNotIn('baz', index)
+        self.assertEqual(index.unreleased_names, frozenset(['baz']))
+        self.assertEqual(len(index), 3)
+
+    def test_repository(self):
+        """Test the release repository lookup"""
+        index = PackageIndex(self.get_distro())
+        repo = index.get_repository('foo_msgs')
+        self.assertIs(repo, index.get_repository('foo'))
+        self.assertEqual(
+            repo.url, 'https://github.com/ros2-gbp/foo-release.git')
+
+    def test_version(self):
+        """Test the version lookup"""
+        index = PackageIndex(self.get_distro())
+        self.assertEqual(index.get_version('foo'), '1.2.3')
+        self.assertEqual(index.get_version('bar'), '0.1.0-r2')
+        self.assertEqual(index.get_version('bar', is_oe=True), '0.1.0-2')
+        with self.assertRaises(KeyError):
+            index.get_version('qux')
+
+    def test_src_uri(self):
+        """Test the release tag and archive lookup"""
+        index = PackageIndex(self.get_distro())
+        self.assertEqual(
+            index.get_release_tag('foo_msgs'),
+            'release/fakedistro/foo_msgs/1.2.3-0')
+        self.assertEqual(
+            index.get_src_uri('foo_msgs'),
+            'https://github.com/ros2-gbp/foo-release/archive/'
+            'release/fakedistro/foo_msgs/1.2.3-0.tar.gz')
+
+    def test_memoized(self):
+        """Test that the index is built once per distro"""
+        distro = self.get_distro()
+        index = get_package_index(distro)
+        self.assertIs(index, get_package_index(distro))
+        # a new distro object with the same name gets a fresh index
+        self.assertIsNot(index, get_package_index(self.get_distro()))
@@ -0,0 +1,88 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from rosdistro.rosdistro import RosPackage
+from superflore import utils
+from superflore.exceptions import OfflineCacheMiss
+from superflore.PackageXmlCache import get_package_xml
+from superflore.PackageXmlCache import PackageXmlCache
+from superflore.TempfileManager import TempfileManager
+from superflore.utils import set_cache_dir
+from superflore.utils import set_offline
+from tests.fake_distro import make_distro
+from tests.fake_distro import make_package_xml
+import unittest
+
+REPO_URL = 'https://github.com/ros2-gbp/foo-release.git'
+
+
+class TestPackageXmlCache(unittest.TestCase):
+    def test_put_get(self):
+        """Test storing and reading back a package.xml"""
+        with TempfileManager(None) as tmp:
+            cache = PackageXmlCache(tmp)
+            tag = 'release/fakedistro/foo/1.0.0-1'
+            self.assertIsNone(cache.get(REPO_URL, tag))
+            self.assertNotIn((REPO_URL, tag), cache)
+            cache.put(REPO_URL, tag, '<package/>')
+            self.assertIn((REPO_URL, tag), cache)
+            self.assertEqual(cache.get(REPO_URL, tag), b'<package/>')
+            # other tags of the same repository are distinct entries
+            self.assertIsNone(
+                cache.get(REPO_URL, 'release/fakedistro/foo/1.0.1-1'))
+            # entries survive across instances, i.e. across runs
+            self.assertEqual(
+                PackageXmlCache(tmp).get(REPO_URL, tag), b'<package/>')
+
+    def test_get_package_xml(self):
+        """Test that a package.xml is only fetched on a cache miss"""
+        distro = make_distro({'foo': {'version': '1.0.0-1'}})
+        fetched = []
+
+        def get_package_xml_stub(ros_pkg, distro_name):
+            fetched.append((ros_pkg.name, distro_name))
+            return make_package_xml(ros_pkg.name).encode('utf-8')
+
+        orig_get_package_xml = RosPackage.get_package_xml
+        RosPackage.get_package_xml = get_package_xml_stub
+        try:
+            with TempfileManager(None) as tmp:
+                set_cache_dir(tmp)
+                first = get_package_xml(distro, 'foo')
+                second = get_package_xml(distro, 'foo')
+                self.assertTrue(
+                    os.path.isdir(os.path.join(tmp, 'package_xml')))
+        finally:
+            RosPackage.get_package_xml = orig_get_package_xml
+            set_cache_dir(None)
+        self.assertEqual(fetched, [('foo', 'fakedistro')])
+        self.assertEqual(first, second)
+        self.assertIn(b'<name>foo</name>', first)
+
+    def test_get_package_xml_offline(self):
+        """Test that an offline cache miss fails instead of fetching"""
+        distro = make_distro({'foo': {'version': '1.0.0-1'}})
+        with TempfileManager(None) as tmp:
+            set_cache_dir(tmp)
+            # bypass the checks of set_offline, only the flag matters here
+            utils._offline = True
+            try:
+                with self.assertRaises(OfflineCacheMiss) as cm:
+                    get_package_xml(distro, 'foo')
+                self.assertIn("'foo'", cm.exception.message)
+            finally:
+                set_offline(False)
+                set_cache_dir(None)
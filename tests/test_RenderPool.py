@@ -0,0 +1,66 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from superflore import rosdep_support
+from superflore.exceptions import UnresolvedDependency
+from superflore.RenderPool import RenderPool
+from superflore.rosdep_support import add_resolutions
+from superflore.rosdep_support import resolve_rosdep_key
+import unittest
+
+
+def raise_unresolved(message):
+    raise UnresolvedDependency(message)
+
+
+class TestRenderPool(unittest.TestCase):
+    def tearDown(self):
+        rosdep_support._resolution_cache.clear()
+
+    def test_single_job(self):
+        """Test that a single job renders in this process"""
+        with RenderPool(1) as render_pool:
+            self.assertIsNone(render_pool.executor)
+            self.assertEqual(render_pool.render(os.getpid), os.getpid())
+
+    def test_worker_processes(self):
+        """Test rendering in worker processes"""
+        with RenderPool(2) as render_pool:
+            self.assertNotEqual(render_pool.render(os.getpid), os.getpid())
+            self.assertEqual(render_pool.render(max, [1, 3, 2]), 3)
+            with self.assertRaises(UnresolvedDependency) as cm:
+                render_pool.render(raise_unresolved, 'failed')
+            self.assertEqual(cm.exception.message, 'failed')
+        self.assertIsNone(render_pool.executor)
+
+    def test_worker_resolutions(self):
+        """Test that the workers start with the memoized resolutions"""
+        rosdep_support._resolution_cache.clear()
+        add_resolutions({
+            ('boost', 'gentoo', '2.4.0', 'humble'):
+                (['dev-libs/boost'], 'portage', 'portage'),
+            ('missing', 'gentoo', '2.4.0', 'humble'):
+                UnresolvedDependency('could not resolve missing'),
+        })
+        with RenderPool(2) as render_pool:
+            self.assertEqual(
+                render_pool.render(
+                    resolve_rosdep_key, 'boost', 'gentoo', '2.4.0', 'humble'),
+                (['dev-libs/boost'], 'portage', 'portage'))
+            with self.assertRaises(UnresolvedDependency):
+                render_pool.render(
+                    resolve_rosdep_key, 'missing', 'gentoo', '2.4.0',
+                    'humble')
@@ -0,0 +1,122 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from superflore.test_integration import build_order
+from superflore.test_integration.build_order import build_in_waves
+from superflore.test_integration.build_order import get_build_waves
+from superflore.test_integration.build_order import get_target_depends
+from superflore.test_integration.build_order import mark_blocked
+from tests.fake_distro import make_distro
+import unittest
+
+# base <- msgs <- {driver, tools}, driver <- app, and an unrelated pkg
+DEPENDS = {
+    'app': {'base', 'msgs', 'driver'},
+    'base': set(),
+    'driver': {'base', 'msgs'},
+    'msgs': {'base'},
+    'other': set(),
+    'tools': {'base', 'msgs'},
+}
+
+
+class TestBuildOrder(unittest.TestCase):
+    def test_target_depends(self):
+        """Test the dependencies between targets, through other packages"""
+        distro = make_distro({
+            'app': {'depends': {'depend': ['lib']}},
+            'lib': {'depends': {'exec_depend': ['msgs']}},
+            'msgs': {'depends': {'test_depend': ['app']}},
+        })
+        orig_get_distro = build_order.get_distro
+        orig_get_context = build_order.get_distro_condition_context
+        build_order.get_distro = lambda name: distro
+        build_order.get_distro_condition_context = \
+            lambda name: {'ROS_VERSION': '2'}
+        try:
+            self.assertEqual(get_target_depends({
+                'ros-fakedistro/app': ('fakedistro', 'app'),
+                'ros-fakedistro/msgs': ('fakedistro', 'msgs'),
+            }), {
+                'ros-fakedistro/app': {'ros-fakedistro/msgs'},
+                # test dependencies are not needed to build
+                'ros-fakedistro/msgs': set(),
+            })
+        finally:
+            build_order.get_distro = orig_get_distro
+            build_order.get_distro_condition_context = orig_get_context
+
+    def test_build_waves(self):
+        """Test ordering the targets in dependency waves"""
+        self.assertEqual(get_build_waves(DEPENDS), [
+            ['base', 'other'], ['msgs'], ['driver', 'tools'], ['app']])
+        # a cycle is built last, in one wave
+        self.assertEqual(get_build_waves({
+            'a': {'b'}, 'b': {'a'}, 'c': set(),
+        }), [['c'], ['a', 'b']])
+
+    def test_build_in_waves(self):
+        """Test that the dependents of a failing target are blocked"""
+        built = []
+        lock = threading.Lock()
+
+        def build(target):
+            with lock:
+                built.append(target)
+            return target != 'msgs'
+
+        self.assertEqual(build_in_waves(DEPENDS, build, jobs=4), {
+            'app': 'blocked',
+            'base': 'building',
+            'driver': 'blocked',
+            'msgs': 'failing',
+            'other': 'building',
+            'tools': 'blocked',
+        })
+        self.assertEqual(sorted(built[:2]), ['base', 'other'])
+        self.assertEqual(built[2:], ['msgs'])
+
+    def test_mark_blocked(self):
+        """Test marking the failing dependents of failing targets"""
+        self.assertEqual(mark_blocked({
+            'app': 'failing',
+            'base': 'building',
+            'driver': 'failing',
+            'msgs': 'failing',
+            'other': 'failing',
+            'tools': 'building',
+        }, DEPENDS), {
+            'app': 'blocked',
+            'base': 'building',
+            'driver': 'blocked',
+            'msgs': 'failing',
+            'other': 'failing',
+            'tools': 'building',
+        })
+        # the targets of a cycle are left failing, but block their dependents
+        self.assertEqual(mark_blocked({
+            'a': 'failing',
+            'b': 'failing',
+            'c': 'failing',
+        }, {
+            'a': {'b'},
+            'b': {'a'},
+            'c': {'a', 'b'},
+        }), {
+            'a': 'failing',
+            'b': 'failing',
+            'c': 'blocked',
+        })
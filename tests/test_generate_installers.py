@@ -12,11 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import re
 
 from rosinstall_generator.distro import get_distro
 from superflore.exceptions import UnknownBuildType
+from superflore.FingerprintManager import FingerprintManager
 from superflore.generate_installers import generate_installers
+from superflore.TempfileManager import TempfileManager
+from tests.fake_distro import make_distro
 import unittest
 
 
@@ -61,6 +65,14 @@ def _raise_exceptions(overlay, pkg, distro, preserve_existing, collector):
     return True, pkg, pkg
 
 
+def _gen_unless_preserved(overlay, pkg, distro, preserve_existing, collector):
+    """Like a generator whose installers already exist"""
+    collector.append((pkg, preserve_existing))
+    if preserve_existing:
+        return None, [], None
+    return True, None, pkg
+
+
 class TestGenerateInstallers(unittest.TestCase):
     def test_generation(self):
         """Test Generate Installers"""
@@ -130,3 +142,92 @@ class TestGenerateInstallers(unittest.TestCase):
                 print(ret.groups())
                 self.assertIn('p2os', ret.group(0))
         self.assertTrue(found)
+
+    def test_parallel_generation(self):
+        """Test that parallel generation matches the serial results"""
+        distro = get_distro('lunar')
+        serial_acc = list()
+        serial = generate_installers(
+            distro, None, _fail_if_p2os, False, serial_acc
+        )
+        parallel_acc = list()
+        parallel = generate_installers(
+            distro, None, _fail_if_p2os, False, parallel_acc, jobs=4
+        )
+        # every package was generated exactly once in both modes
+        self.assertEqual(sorted(serial_acc), sorted(parallel_acc))
+        # and the results are reported in the same, deterministic order
+        self.assertEqual(serial, parallel)
+
+    def test_incremental(self):
+        """Test that only packages with changed inputs are regenerated"""
+        packages = {
+            'foo': {'depends': {'depend': ['bar']}},
+            'bar': {},
+            'baz': {},
+        }
+        with TempfileManager(None) as tmp:
+            filename = os.path.join(tmp, 'fingerprints.json')
+            acc = list()
+            with FingerprintManager(filename, 'nix') as fingerprints:
+                inst, _, _ = generate_installers(
+                    make_distro(packages), None, _gen_unless_preserved,
+                    False, acc, fingerprints=fingerprints
+                )
+            self.assertEqual(inst, ['bar', 'baz', 'foo'])
+            self.assertEqual(
+                acc, [('bar', False), ('baz', False), ('foo', False)])
+            # bar is released again, and qux now depends on it
+            packages['bar']['version'] = '1.0.1-1'
+            packages['qux'] = {'depends': {'depend': ['bar']}}
+            acc = list()
+            with FingerprintManager(filename, 'nix') as fingerprints:
+                inst, _, changes = generate_installers(
+                    make_distro(packages), None, _gen_unless_preserved,
+                    False, acc, fingerprints=fingerprints
+                )
+            self.assertEqual(inst, ['bar', 'qux'])
+            self.assertEqual(fingerprints.preserved, {'baz', 'foo'})
+            self.assertEqual(acc, [
+                ('bar', False), ('baz', True), ('foo', True), ('qux', False)
+            ])
+            # fingerprints are only kept for the packages of the distro
+            del packages['baz']
+            with FingerprintManager(filename, 'nix') as fingerprints:
+                generate_installers(
+                    make_distro(packages), None, _gen_unless_preserved,
+                    False, list(), fingerprints=fingerprints
+                )
+            self.assertEqual(
+                sorted(fingerprints.fingerprints), ['bar', 'foo', 'qux'])
+
+    def test_fingerprint_patches(self):
+        """Test that changing the patches of a package changes its inputs"""
+        distro = make_distro({'foo': {}})
+        with TempfileManager(None) as tmp:
+            patches_dir = os.path.join(tmp, 'foo', 'files')
+
+            def compute():
+                return FingerprintManager(
+                    os.path.join(tmp, 'fingerprints.json'), 'gentoo',
+                    lambda pkg: os.path.join(tmp, pkg, 'files')
+                ).compute(distro, 'foo')
+
+            def write_patch(name, content):
+                with open(os.path.join(patches_dir, name), 'w') as f:
+                    f.write(content)
+
+            fingerprints = [compute()]
+            os.makedirs(patches_dir)
+            write_patch('fix.patch', 'fix\n')
+            fingerprints.append(compute())
+            write_patch('fix.patch', 'better fix\n')
+            fingerprints.append(compute())
+            write_patch('other.patch', 'other\n')
+            fingerprints.append(compute())
+            os.remove(os.path.join(patches_dir, 'fix.patch'))
+            fingerprints.append(compute())
+            # only the patches count
+            write_patch('README', 'not a patch\n')
+            self.assertEqual(compute(), fingerprints[-1])
+        self.assertEqual(len(set(fingerprints)), len(fingerprints))
@@ -0,0 +1,147 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from superflore.test_integration.gentoo import build_base
+from superflore.test_integration.gentoo.build_base import GentooBuilder
+from superflore.TempfileManager import TempfileManager
+from superflore.utils import set_cache_dir
+from tests.fake_docker import FakeDocker
+import unittest
+
+
+class FakeEmerge(FakeDocker):
+    # ros-humble/broken fails, and so does ros-humble/foo, which depends
+    # on it, the other targets being merged to $INSTALLED. emerge doesn't
+    # merge anything when given ros-humble/masked.
+    prelude = 'emaint() { echo "emaint $*"; }; ' \
+        'emerge() { echo "emerge $*"; local a s=0; for a; do ' \
+        'test "$a" = ros-humble/masked && return 1; done; for a; do ' \
+        'case "$a" in --*) ;; ros-humble/broken|ros-humble/foo) s=1 ;; ' \
+        '*) echo "$a" >> $INSTALLED ;; esac; done; return $s; }; ' \
+        'portageq() { grep -qsx "$3" $INSTALLED; }; ' \
+        'export -f emaint emerge portageq; '
+    runs = []
+    log_files = []
+
+
+# ros-humble/foo depends on ros-humble/broken
+DEPENDS = {
+    'ros-humble/bar': set(),
+    'ros-humble/broken': set(),
+    'ros-humble/foo': {'ros-humble/broken'},
+    'ros-humble/masked': set(),
+}
+
+
+class TestGentooBuilder(unittest.TestCase):
+    def setUp(self):
+        self.orig_docker = build_base.Docker
+        self.orig_get_target_depends = build_base.get_target_depends
+        build_base.Docker = FakeEmerge
+        build_base.get_target_depends = lambda targets: {
+            target: DEPENDS[target] for target in targets}
+        del FakeEmerge.runs[:]
+        del FakeEmerge.log_files[:]
+        self.orig_installed = os.environ.get('INSTALLED')
+        self.tmp = TempfileManager(None)
+        os.environ['INSTALLED'] = os.path.join(
+            self.tmp.__enter__(), 'installed')
+
+    def tearDown(self):
+        self.tmp.__exit__(None, None, None)
+        if self.orig_installed is None:
+            os.environ.pop('INSTALLED', None)
+        else:
+            os.environ['INSTALLED'] = self.orig_installed
+        build_base.Docker = self.orig_docker
+        build_base.get_target_depends = self.orig_get_target_depends
+
+    def test_run(self):
+        """Test building each target in its own container"""
+        builder = GentooBuilder()
+        for pkg in ('foo', 'broken', 'bar'):
+            builder.add_target('humble', pkg)
+        self.assertEqual(builder.run(False, '/tmp/build.log', jobs=2), {
+            'ros-humble/bar': 'building',
+            'ros-humble/broken': 'failing',
+            'ros-humble/foo': 'blocked',
+        })
+        # the blocked target is not built
+        self.assertEqual(len(FakeEmerge.runs), 2)
+        # the containers running at the same time log to their own file
+        self.assertEqual(sorted(FakeEmerge.log_files), [
+            '/tmp/build-ros-humble-bar.log',
+            '/tmp/build-ros-humble-broken.log',
+        ])
+
+    def test_run_batch(self):
+        """Test building all the targets in a single container"""
+        try:
+            with TempfileManager(None) as tmp:
+                set_cache_dir(tmp)
+                builder = GentooBuilder()
+                for pkg in ('foo', 'broken', 'bar'):
+                    builder.add_target('humble', pkg)
+                self.assertEqual(builder.run_batch(False, jobs=4), {
+                    'ros-humble/bar': 'building',
+                    'ros-humble/broken': 'failing',
+                    'ros-humble/foo': 'blocked',
+                })
+                # one container, one sync and one emerge
+                self.assertEqual(len(FakeEmerge.runs), 1)
+                log = builder.container.log.splitlines()
+                self.assertEqual(log[:2], [
+                    'emaint sync -r ros-overlay',
+                    'emerge --keep-going --jobs=4 --usepkg --buildpkg '
+                    'ros-humble/bar ros-humble/broken ros-humble/foo',
+                ])
+                # some targets were merged, so there is no fallback
+                self.assertEqual(
+                    [line for line in log if line.startswith('emerge')],
+                    log[1:2])
+                # the binary packages are kept in the cache directory
+                self.assertEqual(
+                    builder.container.directory_map[
+                        os.path.join(tmp, 'gentoo', 'binpkgs')]['bind'],
+                    '/var/cache/binpkgs')
+        finally:
+            set_cache_dir(None)
+
+    def test_run_batch_fallback(self):
+        """Test emerging the targets one by one when none was merged"""
+        try:
+            with TempfileManager(None) as tmp:
+                set_cache_dir(tmp)
+                builder = GentooBuilder()
+                for pkg in ('bar', 'masked'):
+                    builder.add_target('humble', pkg)
+                self.assertEqual(builder.run_batch(False, jobs=4), {
+                    'ros-humble/bar': 'building',
+                    'ros-humble/masked': 'failing',
+                })
+                self.assertEqual(len(FakeEmerge.runs), 1)
+                log = builder.container.log.splitlines()
+                self.assertEqual(log[:4], [
+                    'emaint sync -r ros-overlay',
+                    'emerge --keep-going --jobs=4 --usepkg --buildpkg '
+                    'ros-humble/bar ros-humble/masked',
+                    'emerge --keep-going --jobs=4 --usepkg --buildpkg '
+                    'ros-humble/bar',
+                    'emerge --keep-going --jobs=4 --usepkg --buildpkg '
+                    'ros-humble/masked',
+                ])
+        finally:
+            set_cache_dir(None)
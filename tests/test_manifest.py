@@ -0,0 +1,104 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+
+from superflore.generators.ebuild.manifest import get_distfile_name
+from superflore.generators.ebuild.manifest import get_manifest_text
+from superflore.generators.ebuild.manifest import hash_distfile
+from superflore.generators.ebuild.manifest import write_manifests
+from superflore.generators.nix.nix_package import NixPackage
+from superflore.TempfileManager import TempfileManager
+from tests.fake_distro import make_distro
+import unittest
+
+
+class TestManifest(unittest.TestCase):
+    def test_manifest_text(self):
+        """Test the DIST entries of a thin Manifest"""
+        self.assertEqual(
+            get_distfile_name('foo_msgs', 'humble', '1.2.0-r3'),
+            'foo_msgs-humble-release-1.2.0.tar.gz')
+        self.assertEqual(
+            get_distfile_name('foo', 'humble', '1.2.0'),
+            'foo-humble-release-1.2.0.tar.gz')
+        with TempfileManager(None) as tmp:
+            filename = os.path.join(tmp, 'foo.tar.gz')
+            with open(filename, 'wb') as f:
+                f.write(b'foo' * 100000)
+            size, hashes = hash_distfile(filename, chunk_size=1000)
+        self.assertEqual(size, 300000)
+        self.assertEqual(
+            hashes['BLAKE2B'],
+            hashlib.blake2b(b'foo' * 100000).hexdigest())
+        self.assertEqual(
+            hashes['SHA512'], hashlib.sha512(b'foo' * 100000).hexdigest())
+        self.assertEqual(get_manifest_text({
+            'b.tar.gz': (2, {'BLAKE2B': 'b2', 'SHA512': 's2'}),
+            'a.tar.gz': (1, {'SHA512': 's1', 'BLAKE2B': 'b1'}),
+        }), 'DIST a.tar.gz 1 BLAKE2B b1 SHA512 s1\n'
+            'DIST b.tar.gz 2 BLAKE2B b2 SHA512 s2\n')
+
+    def test_write_manifests(self):
+        """Test writing Manifests from the archive and hash caches"""
+        distro = make_distro({
+            'foo': {'version': '1.0.0-1'},
+            'bar': {'version': '2.0.0-0'},
+            'missing': {'version': '1.0.0-1'},
+        })
+        with TempfileManager(None) as tmp:
+            tar_dir = os.path.join(tmp, 'archives')
+            os.makedirs(tar_dir)
+            for pkg in ('foo', 'bar', 'missing'):
+                os.makedirs(os.path.join(tmp, 'ros-fakedistro', pkg))
+            for pkg in ('foo', 'bar'):
+                with open(NixPackage.get_archive_path(
+                    pkg, distro, tar_dir), 'wb'
+                ) as f:
+                    f.write(pkg.encode())
+            # the archive of 'missing' was hashed by a previous run
+            hash_cache = dict()
+            hash_cache[
+                'https://github.com/ros2-gbp/missing-release/archive/'
+                'release/fakedistro/missing/1.0.0-1.tar.gz'
+            ] = (7, {'BLAKE2B': 'b', 'SHA512': 's'})
+            self.assertEqual(write_manifests(
+                tmp, distro, ['foo', 'bar', 'missing'], tar_dir,
+                hash_cache, jobs=2), [])
+            self.assertEqual(len(hash_cache), 3)
+            size, hashes = hash_distfile(
+                NixPackage.get_archive_path('foo', distro, tar_dir))
+            with open(os.path.join(
+                tmp, 'ros-fakedistro', 'foo', 'Manifest')
+            ) as f:
+                self.assertEqual(
+                    f.read(),
+                    'DIST foo-fakedistro-release-1.0.0.tar.gz 3 BLAKE2B '
+                    '{BLAKE2B} SHA512 {SHA512}\n'.format(**hashes))
+            with open(os.path.join(
+                tmp, 'ros-fakedistro', 'missing', 'Manifest')
+            ) as f:
+                self.assertEqual(
+                    f.read(),
+                    'DIST missing-fakedistro-release-1.0.0.tar.gz 7 '
+                    'BLAKE2B b SHA512 s\n')
+            # the hashes are kept once the archives are gone
+            for filename in os.listdir(tar_dir):
+                os.remove(os.path.join(tar_dir, filename))
+            os.remove(os.path.join(tmp, 'ros-fakedistro', 'bar', 'Manifest'))
+            self.assertEqual(write_manifests(
+                tmp, distro, ['bar'], tar_dir, hash_cache), [])
+            self.assertTrue(os.path.isfile(
+                os.path.join(tmp, 'ros-fakedistro', 'bar', 'Manifest')))
@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pickle
 import unittest
 
+from superflore.generators.nix.nix_expression import NixExpression
 from superflore.generators.nix.nix_expression import NixLicense
 
 class TestNixLicense(unittest.TestCase):
@@ -37,3 +39,22 @@ class TestNixLicense(unittest.TestCase):
     def test_escape_quote(self):
         l = NixLicense('some license with the "${" sequence');
         self.assertEqual(l.nix_code, r'"some-license-with-the-\"\${\"-sequence"')
+
+
+class TestNixExpression(unittest.TestCase):
+
+    def test_pickle(self):
+        """Test that expressions can be rendered in another process"""
+        expression = NixExpression(
+            name='foo', version='1.0.0-r1',
+            src_url='https://example.com/foo-release/archive/1.0.0.tar.gz',
+            src_sha256='0' * 52,
+            description='The foo package',
+            licenses=[NixLicense('BSD'), NixLicense('Apache License 2.0')],
+            distro_name='humble', build_type='ament_cmake',
+            build_inputs={'bar'})
+        text = expression.get_text('Open Source Robotics Foundation', 'BSD')
+        self.assertIn('license = with lib.licenses; [ bsdOriginal', text)
+        copy = pickle.loads(pickle.dumps(expression))
+        self.assertEqual(
+            copy.get_text('Open Source Robotics Foundation', 'BSD'), text)
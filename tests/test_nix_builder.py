@@ -0,0 +1,91 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from superflore.test_integration.nix import build_base
+from superflore.test_integration.nix.build_base import NixBuilder
+from superflore.TempfileManager import TempfileManager
+from tests.fake_docker import FakeDocker
+import unittest
+
+
+class FakeNix(FakeDocker):
+    # 'missing' can't be evaluated and 'broken' doesn't build. The
+    # derivations are only written to $STORE in read-write mode, and only
+    # the valid derivations can be realised.
+    prelude = 'nix-instantiate() { echo "$*" >&2; ' \
+        'case " $* " in *" --read-write-mode "*) ' \
+        'touch $STORE/broken.drv $STORE/foo.drv ;; esac; ' \
+        'echo \\"rosPackages.humble.broken=$STORE/broken.drv ' \
+        'rosPackages.humble.foo=$STORE/foo.drv ' \
+        'rosPackages.humble.missing=\\"; }; ' \
+        'nix-store() { case "$1" in ' \
+        '--realise) echo "nix-store $*"; for d in "$@"; do ' \
+        'case "$d" in *.drv) test -e "$d" && ' \
+        'test "$d" != $STORE/broken.drv && touch "${d%.drv}" ;; esac; ' \
+        'done ;; ' \
+        '--query) echo "${3%.drv}" ;; ' \
+        '--check-validity) test -e "$2" ;; esac; }; ' \
+        'export -f nix-instantiate nix-store; '
+    runs = []
+
+
+# rosPackages.humble.missing depends on rosPackages.humble.broken
+DEPENDS = {
+    'rosPackages.humble.broken': set(),
+    'rosPackages.humble.foo': set(),
+    'rosPackages.humble.missing': {'rosPackages.humble.broken'},
+}
+
+
+class TestNixBuilder(unittest.TestCase):
+    def test_run_batch(self):
+        """Test building all the targets from a single evaluation"""
+        orig_docker = build_base.Docker
+        orig_get_target_depends = build_base.get_target_depends
+        build_base.Docker = FakeNix
+        build_base.get_target_depends = lambda targets: DEPENDS
+        orig_store = os.environ.get('STORE')
+        try:
+            with TempfileManager(None) as store:
+                os.environ['STORE'] = store
+                builder = NixBuilder()
+                for pkg in ('foo', 'broken', 'missing'):
+                    builder.add_target('humble', pkg)
+                self.assertEqual(builder.run_batch(False, jobs=4), {
+                    'rosPackages.humble.broken': 'failing',
+                    'rosPackages.humble.foo': 'building',
+                    'rosPackages.humble.missing': 'blocked',
+                })
+                self.assertEqual(len(FakeNix.runs), 1)
+                log = builder.container.log.splitlines()
+                # the expression evaluates the overlay once for all targets
+                self.assertIn('--read-write-mode', log[0])
+                self.assertIn(
+                    '[ "rosPackages.humble.broken" "rosPackages.humble.foo" '
+                    '"rosPackages.humble.missing" ]', log[0])
+                self.assertEqual(
+                    log[1], 'nix-store --realise --keep-going --max-jobs 4 '
+                    '{0}/broken.drv {0}/foo.drv'.format(store))
+                self.assertEqual(
+                    builder.container.directory_map['superflore-nix']
+                    ['bind'], '/nix')
+        finally:
+            if orig_store is None:
+                os.environ.pop('STORE', None)
+            else:
+                os.environ['STORE'] = orig_store
+            build_base.Docker = orig_docker
+            build_base.get_target_depends = orig_get_target_depends
@@ -0,0 +1,67 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from superflore.generators.ebuild import overlay_instance
+from superflore.generators.ebuild.overlay_instance import RosOverlay
+from superflore.TempfileManager import TempfileManager
+from tests.fake_docker import FakeDocker
+import unittest
+
+
+class FakeRepo:
+    def __init__(self, repo_dir):
+        self.repo_dir = repo_dir
+
+
+class FakeRepoman(FakeDocker):
+    # fails in broken packages
+    prelude = 'repoman() { test ! -e BROKEN && touch Manifest; }; ' \
+        'export -f repoman; '
+    runs = []
+
+
+class TestRosOverlay(unittest.TestCase):
+    def test_regenerate_manifests(self):
+        """Test regenerating Manifests in concurrent containers"""
+        orig_docker = overlay_instance.Docker
+        overlay_instance.Docker = FakeRepoman
+        try:
+            with TempfileManager(None) as tmp:
+                regen_dict = {
+                    'humble': ['pkg%d' % i for i in range(5)],
+                    'jazzy': ['pkg0', 'pkg1'],
+                }
+                for distro, pkgs in regen_dict.items():
+                    for pkg in pkgs:
+                        os.makedirs(os.path.join(tmp, 'ros-' + distro, pkg))
+                open(os.path.join(tmp, 'ros-humble/pkg1/BROKEN'), 'w').close()
+                overlay = RosOverlay.__new__(RosOverlay)
+                overlay.repo = FakeRepo(tmp)
+                failed = overlay.regenerate_manifests(
+                    regen_dict, split_limit=3, jobs=2)
+                # the broken package doesn't stop the rest of its chunk
+                self.assertEqual(failed, ['ros-humble/pkg1'])
+                for distro, pkgs in regen_dict.items():
+                    for pkg in pkgs:
+                        self.assertEqual(
+                            os.path.exists(os.path.join(
+                                tmp, 'ros-' + distro, pkg, 'Manifest')),
+                            (distro, pkg) != ('humble', 'pkg1'))
+                # 7 packages in chunks of 3, all from the pulled image
+                self.assertEqual(
+                    FakeRepoman.runs, ['allenh1/ros_gentoo_base:latest'] * 3)
+        finally:
+            overlay_instance.Docker = orig_docker
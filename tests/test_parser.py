@@ -35,3 +35,5 @@ class TestParserSetup(unittest.TestCase):
         self.assertIn('upstream_repo', ret)
         self.assertIn('upstream_branch', ret)
         self.assertIn('skip_keys', ret)
+        self.assertIn('jobs', ret)
+        self.assertEqual(ret.jobs, 1)
@@ -0,0 +1,124 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from rosdistro import get_distribution_cache
+from rosdistro import get_index
+from rosdistro.rosdistro import RosPackage
+from superflore.prefetch import mirror_rosdistro
+from superflore.prefetch import prefetch_package_xmls
+from superflore.TempfileManager import TempfileManager
+from superflore.utils import set_cache_dir
+from tests.fake_distro import make_distro
+from tests.fake_distro import make_package_xml
+import unittest
+import yaml
+
+
+def write_yaml(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w') as f:
+        yaml.safe_dump(data, f)
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_mirror_rosdistro(self):
+        """Test mirroring the rosdistro index entries of distros"""
+        orig_index_url = os.environ.get('ROSDISTRO_INDEX_URL')
+        try:
+            with TempfileManager(None) as tmp:
+                remote = os.path.join(tmp, 'remote')
+                distribution = {
+                    'type': 'distribution', 'version': 2,
+                    'release_platforms': {'ubuntu': ['noble']},
+                    'repositories': {},
+                }
+                distributions = dict()
+                for name in ('foo', 'bar'):
+                    write_yaml(os.path.join(
+                        remote, name, 'distribution.yaml'), distribution)
+                    write_yaml(os.path.join(remote, name + '-cache.yaml'), {
+                        'type': 'cache', 'version': 2, 'name': name,
+                        'distribution_file': [distribution],
+                        'release_package_xmls': {},
+                    })
+                    distributions[name] = {
+                        'distribution': [name + '/distribution.yaml'],
+                        'distribution_cache': name + '-cache.yaml',
+                        'distribution_status': 'active',
+                    }
+                write_yaml(os.path.join(remote, 'index-v4.yaml'), {
+                    'type': 'index', 'version': 4,
+                    'distributions': distributions,
+                })
+                os.environ['ROSDISTRO_INDEX_URL'] = \
+                    'file://' + os.path.join(remote, 'index-v4.yaml')
+                set_cache_dir(os.path.join(tmp, 'cache'))
+                mirror_rosdistro(['foo'])
+                index_filename = mirror_rosdistro(['bar'])
+                self.assertEqual(
+                    index_filename,
+                    os.path.join(tmp, 'cache', 'rosdistro', 'index-v4.yaml'))
+                # the mirror does not depend on the remote index anymore
+                os.rename(remote, remote + '.old')
+                index = get_index('file://' + index_filename)
+                self.assertEqual(
+                    sorted(index.distributions), ['bar', 'foo'])
+                self.assertEqual(
+                    index.distributions['foo']['distribution_status'],
+                    'active')
+                self.assertEqual(
+                    get_distribution_cache(index, 'foo')
+                    .distribution_file.release_platforms,
+                    {'ubuntu': ['noble']})
+        finally:
+            set_cache_dir(None)
+            if orig_index_url is None:
+                os.environ.pop('ROSDISTRO_INDEX_URL', None)
+            else:
+                os.environ['ROSDISTRO_INDEX_URL'] = orig_index_url
+
+    def test_prefetch_package_xmls(self):
+        """Test that prefetching package.xmls resumes and reports failures"""
+        distro = make_distro({
+            'foo': {'version': '1.0.0-1'},
+            'bar': {'version': '1.0.0-1'},
+            'broken': {'version': '1.0.0-1'},
+        })
+        fetched = []
+
+        def get_package_xml_stub(ros_pkg, distro_name):
+            fetched.append(ros_pkg.name)
+            if ros_pkg.name == 'broken':
+                raise RuntimeError('not found')
+            return make_package_xml(ros_pkg.name).encode('utf-8')
+
+        orig_get_package_xml = RosPackage.get_package_xml
+        RosPackage.get_package_xml = get_package_xml_stub
+        try:
+            with TempfileManager(None) as tmp:
+                set_cache_dir(tmp)
+                self.assertEqual(prefetch_package_xmls(
+                    distro, ['foo', 'bar', 'broken'], jobs=2), ['broken'])
+                self.assertEqual(
+                    sorted(set(fetched)), ['bar', 'broken', 'foo'])
+                # a second run only retries what failed
+                del fetched[:]
+                self.assertEqual(prefetch_package_xmls(
+                    distro, ['foo', 'bar', 'broken'], jobs=2), ['broken'])
+                self.assertEqual(set(fetched), {'broken'})
+        finally:
+            RosPackage.get_package_xml = orig_get_package_xml
+            set_cache_dir(None)
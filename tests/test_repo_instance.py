@@ -0,0 +1,175 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+
+from superflore.repo_instance import RepoInstance
+from superflore.repo_instance import set_clone_options
+from superflore.TempfileManager import TempfileManager
+from superflore.utils import set_cache_dir
+import unittest
+
+
+def write_file(repo_dir, path, content='content\n'):
+    filename = os.path.join(repo_dir, path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
+def make_repo(repo_dir, paths):
+    subprocess.run(
+        ['git', 'init', '-q', '-b', 'master', repo_dir], check=True)
+    for path in paths:
+        write_file(repo_dir, path)
+    git = ['git', '-C', repo_dir, '-c', 'user.name=superflore',
+           '-c', 'user.email=superflore@example.com']
+    subprocess.run(git + ['add', '.'], check=True)
+    subprocess.run(git + ['commit', '-q', '-m', 'initial'], check=True)
+    return RepoInstance('owner', 'repo', repo_dir, False)
+
+
+class CountingGit:
+    """Records the git commands run through it."""
+    def __init__(self, git):
+        self.git = git
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.git, name)
+
+
+class TestRepoInstance(unittest.TestCase):
+    def test_status_snapshot(self):
+        """Test looking up files from a single status snapshot"""
+        with TempfileManager(None) as tmp:
+            repo = make_repo(tmp, [
+                'recipes/foo/foo_1.0.bb', 'recipes/bar/bar_1.0.bb',
+                'recipes/bar/bar-extra_1.0.bb'])
+            repo.git.rm('-q', 'recipes/bar/bar_1.0.bb')
+            write_file(tmp, 'recipes/baz/baz_2.0.bb')
+            repo.invalidate_status()
+            self.assertEqual(repo.get_status(), {
+                'recipes/foo/foo_1.0.bb': '  ',
+                'recipes/bar/bar_1.0.bb': 'D ',
+                'recipes/bar/bar-extra_1.0.bb': '  ',
+                'recipes/baz/baz_2.0.bb': '??',
+            })
+            self.assertEqual(
+                repo.glob('recipes/*/bar_*.bb'),
+                [('D ', 'recipes/bar/bar_1.0.bb')])
+            self.assertEqual(
+                repo.glob('recipes/*/ba*_*.bb'), [
+                    ('  ', 'recipes/bar/bar-extra_1.0.bb'),
+                    ('D ', 'recipes/bar/bar_1.0.bb'),
+                    ('??', 'recipes/baz/baz_2.0.bb'),
+                ])
+            # wildcards don't match across directories
+            self.assertEqual(repo.glob('recipes/*.bb'), [])
+            # the snapshot is kept until the index is changed
+            write_file(tmp, 'recipes/qux/qux_1.0.bb', 'qux\n')
+            self.assertEqual(repo.glob('recipes/*/qux_*.bb'), [])
+            repo.add_files('recipes/qux')
+            self.assertEqual(
+                repo.glob('recipes/*/qux_*.bb'),
+                [('A ', 'recipes/qux/qux_1.0.bb')])
+
+    def test_batched_removals(self):
+        """Test that removals are staged together on flush"""
+        with TempfileManager(None) as tmp:
+            repo = make_repo(tmp, [
+                'a/a_1.0.bb', 'b/b_1.0.bb', 'c/c_1.0.bb', 'd/d_1.0.bb'])
+            write_file(tmp, 'e/e_1.0.bb')
+            repo.remove_file('a/a_1.0.bb')
+            repo.remove_file(os.path.join(tmp, 'b/b_1.0.bb'))
+            repo.remove_file('c/c_1.0.bb')
+            repo.remove_file('d/d_1.0.bb', True)
+            repo.remove_file('missing_1.0.bb', True)
+            # untracked files are left alone, like with git rm
+            repo.remove_file('e/e_1.0.bb')
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'e/e_1.0.bb')))
+            # rewritten since it was removed, left to the next git add
+            write_file(tmp, 'c/c_1.0.bb', 'new content\n')
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'a/a_1.0.bb')))
+            # nothing is staged before the flush
+            self.assertEqual(repo.git.diff('--cached', '--name-only'), '')
+            repo.git = CountingGit(repo.git)
+            repo.flush()
+            # one git rm for the files which must be in the index, and one
+            # for those which may not
+            self.assertEqual(repo.git.calls, ['rm', 'rm'])
+            self.assertEqual(
+                repo.git.status('--porcelain').split('\n'),
+                ['D  a/a_1.0.bb', 'D  b/b_1.0.bb', ' M c/c_1.0.bb',
+                 'D  d/d_1.0.bb', '?? e/'])
+
+    def test_clone_from_mirror(self):
+        """Test that clones are worktrees of a mirror in the cache"""
+        orig_git_config = os.environ.get('GIT_CONFIG_GLOBAL')
+        try:
+            with TempfileManager(None) as tmp:
+                make_repo(os.path.join(tmp, 'upstream'), ['foo/foo_1.0.bb'])
+                subprocess.run(
+                    ['git', '-C', os.path.join(tmp, 'upstream'), 'config',
+                     'uploadpack.allowFilter', 'true'], check=True)
+                # serve https://github.com/owner/ from the directory
+                git_config = os.path.join(tmp, 'gitconfig')
+                with open(git_config, 'w') as f:
+                    f.write('[url "file://{0}/"]\n'
+                            '\tinsteadOf = https://github.com/owner/\n'
+                            .format(tmp))
+                os.environ['GIT_CONFIG_GLOBAL'] = git_config
+                set_cache_dir(os.path.join(tmp, 'cache'))
+                set_clone_options(1, 'blob:none')
+                mirror_dir = os.path.join(
+                    tmp, 'cache', 'repos', 'owner', 'upstream.git')
+                for run in ('run1', 'run2'):
+                    repo_dir = os.path.join(tmp, run)
+                    repo = RepoInstance('owner', 'upstream', repo_dir)
+                    self.assertTrue(os.path.isfile(
+                        os.path.join(repo_dir, 'foo', 'foo_1.0.bb')))
+                    self.assertEqual(repo.git.branch('--show-current'),
+                                     'master')
+                    self.assertEqual(
+                        repo.git.rev_parse('--git-common-dir'), mirror_dir)
+                    # like the temporary directory at the end of a run
+                    shutil.rmtree(repo_dir)
+                # another branch of the upstream repository is fetched
+                upstream_git = [
+                    'git', '-C', os.path.join(tmp, 'upstream'),
+                    '-c', 'user.name=superflore',
+                    '-c', 'user.email=superflore@example.com']
+                subprocess.run(
+                    upstream_git + ['checkout', '-q', '-b', 'dev'],
+                    check=True)
+                write_file(os.path.join(tmp, 'upstream'), 'dev/dev_1.0.bb')
+                subprocess.run(upstream_git + ['add', '.'], check=True)
+                subprocess.run(
+                    upstream_git + ['commit', '-q', '-m', 'dev'], check=True)
+                repo = RepoInstance(
+                    'owner', 'upstream', os.path.join(tmp, 'run3'))
+                repo.clone('dev')
+                self.assertEqual(repo.git.branch('--show-current'), 'dev')
+                self.assertTrue(os.path.isfile(
+                    os.path.join(tmp, 'run3', 'dev', 'dev_1.0.bb')))
+        finally:
+            set_clone_options()
+            set_cache_dir(None)
+            if orig_git_config is None:
+                os.environ.pop('GIT_CONFIG_GLOBAL', None)
+            else:
+                os.environ['GIT_CONFIG_GLOBAL'] = orig_git_config
@@ -0,0 +1,140 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from rosdep2.lookup import RosdepDefinition
+from rosdep2.lookup import RosdepView
+from superflore import rosdep_support
+from superflore.exceptions import UnresolvedDependency
+from superflore.rosdep_support import resolve_rosdep_key
+from superflore.rosdep_support import resolve_rosdep_keys
+from superflore.rosdep_support import set_refresh_view_snapshots
+from superflore.TempfileManager import TempfileManager
+from superflore.timing import get_report
+from superflore.timing import reset
+from superflore.utils import set_cache_dir
+import unittest
+
+
+class TestRosdepSupport(unittest.TestCase):
+    def setUp(self):
+        self.lookups = []
+        self.orig_get_view = rosdep_support.get_view
+        self.orig_resolve_more_for_os = rosdep_support.resolve_more_for_os
+
+        def resolve_more_for_os_stub(key, view, installer, os_name, os_ver):
+            self.lookups.append((key, os_name))
+            if key == 'missing':
+                raise KeyError(key)
+            return ['dev-libs/' + key], 'portage', 'portage'
+
+        rosdep_support.get_view = lambda *args: None
+        rosdep_support.resolve_more_for_os = resolve_more_for_os_stub
+        rosdep_support._resolution_cache.clear()
+        reset()
+
+    def tearDown(self):
+        rosdep_support.get_view = self.orig_get_view
+        rosdep_support.resolve_more_for_os = self.orig_resolve_more_for_os
+        rosdep_support._resolution_cache.clear()
+        reset()
+
+    def test_memoized_resolution(self):
+        """Test that each key is only resolved once per platform"""
+        for _ in range(3):
+            resolved = resolve_rosdep_key('boost', 'gentoo', '2.4.0')
+            self.assertEqual(
+                resolved, (['dev-libs/boost'], 'portage', 'portage'))
+            # a caller changing its result does not change the cache
+            resolved[0].append('oops')
+        resolve_rosdep_key('boost', 'gentoo', '2.4.0', 'humble')
+        self.assertEqual(self.lookups, [('boost', 'gentoo')] * 2)
+        counters = get_report()['counters']
+        self.assertEqual(counters['rosdep_cache_hits'], 2)
+        self.assertEqual(counters['rosdep_cache_misses'], 2)
+
+    def test_memoized_failure(self):
+        """Test that failures to resolve are memoized too"""
+        for _ in range(2):
+            with self.assertRaises(UnresolvedDependency):
+                resolve_rosdep_key('missing', 'gentoo', '2.4.0')
+        self.assertEqual(self.lookups, [('missing', 'gentoo')])
+        # unknown platforms fail before looking the key up
+        with self.assertRaises(UnresolvedDependency):
+            resolve_rosdep_key('boost', 'windoughs', '8')
+        self.assertEqual(len(self.lookups), 1)
+
+    def test_batch_resolution(self):
+        """Test resolving the keys of a whole distro at once"""
+        table, unresolved = resolve_rosdep_keys(
+            {'boost', 'eigen', 'missing'}, 'gentoo', '2.4.0')
+        self.assertEqual(table, {
+            'boost': ['dev-libs/boost'], 'eigen': ['dev-libs/eigen']})
+        self.assertEqual(unresolved, {'missing'})
+        # the keys are not looked up again while generating
+        resolve_rosdep_key('eigen', 'gentoo', '2.4.0')
+        with self.assertRaises(UnresolvedDependency):
+            resolve_rosdep_key('missing', 'gentoo', '2.4.0')
+        self.assertEqual(len(self.lookups), 3)
+
+
+class TestRosdepViewSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.built = []
+        self.fingerprint = 'a'
+        self.orig_get_catkin_view = rosdep_support.get_catkin_view
+        self.orig_get_sources_fingerprint = \
+            rosdep_support._get_sources_fingerprint
+
+        def get_catkin_view_stub(ros_distro, os_name, os_version, update):
+            self.built.append((ros_distro, os_name, os_version))
+            view = RosdepView('stub')
+            view.rosdep_defs['boost'] = RosdepDefinition(
+                'boost', {'gentoo': ['dev-libs/boost']}, 'stub.yaml')
+            return view
+
+        rosdep_support.get_catkin_view = get_catkin_view_stub
+        rosdep_support._get_sources_fingerprint = \
+            lambda *args: self.fingerprint
+
+    def tearDown(self):
+        rosdep_support.get_catkin_view = self.orig_get_catkin_view
+        rosdep_support._get_sources_fingerprint = \
+            self.orig_get_sources_fingerprint
+        set_refresh_view_snapshots(False)
+        set_cache_dir(None)
+
+    def test_snapshot(self):
+        """Test that a view is rebuilt only when its sources change"""
+        with TempfileManager(None) as tmp:
+            set_cache_dir(tmp)
+            view = rosdep_support._load_view('humble', 'gentoo', '2.4.0')
+            self.assertEqual(
+                view.lookup('boost').data, {'gentoo': ['dev-libs/boost']})
+            # loaded from the snapshot
+            view = rosdep_support._load_view('humble', 'gentoo', '2.4.0')
+            self.assertEqual(view.lookup('boost').origin, 'stub.yaml')
+            self.assertEqual(len(self.built), 1)
+            # other platforms have their own snapshot
+            rosdep_support._load_view('humble', 'nixos', '')
+            self.assertEqual(len(self.built), 2)
+            # the rosdep sources changed
+            self.fingerprint = 'b'
+            rosdep_support._load_view('humble', 'gentoo', '2.4.0')
+            self.assertEqual(len(self.built), 3)
+            rosdep_support._load_view('humble', 'gentoo', '2.4.0')
+            self.assertEqual(len(self.built), 3)
+            # forced refresh
+            set_refresh_view_snapshots()
+            rosdep_support._load_view('humble', 'gentoo', '2.4.0')
+            self.assertEqual(len(self.built), 4)
@@ -0,0 +1,69 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+import time
+import unittest
+
+GENERATORS = ('ebuild', 'bitbake', 'nix')
+
+# modules that are slow to import and not needed to start the generators
+LAZY_MODULES = ('docker', 'git', 'github', 'rosdep2')
+
+# the console scripts must answer --help well under a second
+STARTUP_BUDGET = 1.0
+
+
+def run_python(code, *args):
+    return subprocess.run(
+        [sys.executable, '-c', code] + list(args),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+
+
+class TestStartup(unittest.TestCase):
+    def test_lazy_imports(self):
+        """Test that importing the generators defers the slow imports"""
+        for generator in GENERATORS:
+            result = run_python(
+                'import sys\n'
+                'import superflore.generators.{0}.run\n'
+                'print(" ".join(m for m in {1!r} if m in sys.modules))'
+                .format(generator, LAZY_MODULES))
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(result.stdout.strip(), '', generator)
+
+    def test_repo_instance_export(self):
+        """Test that RepoInstance is still exported by superflore"""
+        result = run_python(
+            'import superflore\n'
+            'from superflore.repo_instance import RepoInstance\n'
+            'assert superflore.RepoInstance is RepoInstance\n')
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_help_startup_time(self):
+        """Test that the console scripts answer --help quickly"""
+        for generator in GENERATORS:
+            start = time.perf_counter()
+            result = run_python(
+                'import sys\n'
+                'from superflore.generators.{0} import main\n'
+                'sys.argv[0] = "superflore-gen"\n'
+                'main()\n'.format(generator),
+                '--help')
+            elapsed = time.perf_counter() - start
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn('usage:', result.stdout)
+            self.assertLess(elapsed, STARTUP_BUDGET, generator)
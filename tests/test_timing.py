@@ -0,0 +1,100 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import json
+import os
+import threading
+import time
+
+from superflore.TempfileManager import TempfileManager
+from superflore.timing import count
+from superflore.timing import get_report
+from superflore.timing import reset
+from superflore.timing import timed_package
+from superflore.timing import timed_phase
+from superflore.timing import write_report
+import unittest
+
+
+class TestTiming(unittest.TestCase):
+    def setUp(self):
+        reset()
+
+    def tearDown(self):
+        reset()
+
+    def test_nested_phases(self):
+        """Test that nested phases only count their own time"""
+        with timed_package('fakedistro', 'foo'):
+            with timed_phase('render'):
+                time.sleep(0.05)
+                with timed_phase('rosdep'):
+                    time.sleep(0.1)
+        report = get_report()
+        self.assertEqual(list(report['phases']), ['rosdep', 'render'])
+        self.assertGreaterEqual(report['phases']['rosdep'], 0.1)
+        self.assertGreaterEqual(report['phases']['render'], 0.05)
+        self.assertLess(report['phases']['render'], 0.1)
+        [foo] = report['packages']
+        self.assertEqual(
+            (foo['distro'], foo['package']), ('fakedistro', 'foo'))
+        self.assertEqual(foo['phases'], report['phases'])
+        self.assertGreaterEqual(foo['total'], 0.15)
+
+    def test_threads(self):
+        """Test that phases are attributed to the package of their thread"""
+        def generate(pkg):
+            with timed_package('fakedistro', pkg):
+                with timed_phase('write'):
+                    time.sleep(0.01)
+        threads = [
+            threading.Thread(target=generate, args=(pkg,))
+            for pkg in ['foo', 'bar', 'baz']
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # not in any package: only in the totals
+        with timed_phase('download'):
+            pass
+        report = get_report()
+        self.assertEqual(
+            [p['package'] for p in report['packages']], ['bar', 'baz', 'foo'])
+        for p in report['packages']:
+            self.assertEqual(list(p['phases']), ['write'])
+        self.assertEqual(list(report['phases']), ['download', 'write'])
+
+    def test_write_report(self):
+        """Test the JSON and CSV reports"""
+        with timed_package('fakedistro', 'foo'):
+            with timed_phase('package_xml'):
+                pass
+        count('rosdep_cache_hits', 3)
+        with TempfileManager(None) as tmp:
+            json_report = os.path.join(tmp, 'report.json')
+            write_report(json_report)
+            with open(json_report) as f:
+                report = json.load(f)
+            self.assertEqual(report['counters'], {'rosdep_cache_hits': 3})
+            self.assertEqual(report['packages'][0]['package'], 'foo')
+            csv_report = os.path.join(tmp, 'report.csv')
+            write_report(csv_report)
+            with open(csv_report) as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(
+                rows[0], ['distro', 'package', 'total', 'package_xml'])
+            self.assertEqual(rows[1][:2], ['fakedistro', 'foo'])
+            self.assertEqual(rows[2][:2], ['', 'TOTAL'])
@@ -12,15 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import io
 import os
+import re
 import string
 import sys
+import tarfile
 import time
 
 from superflore.version import VERSION
+from superflore.exceptions import OfflineCacheMiss
 from superflore.exceptions import UnknownPlatform
 from superflore.exceptions import UnresolvedDependency
 from superflore.TempfileManager import TempfileManager
+from superflore.utils import check_online
 from superflore.utils import clean_up
 from superflore.utils import gen_delta_msg
 from superflore.utils import get_license
@@ -32,6 +38,9 @@ from superflore.utils import rand_ascii_str
 from superflore.utils import resolve_dep
 from superflore.utils import retry_on_exception
 from superflore.utils import sanitize_string
+from superflore.utils import scan_archive
+from superflore.utils import set_cache_dir
+from superflore.utils import set_offline
 from superflore.utils import trim_string
 from superflore.utils import url_to_repo_org
 
@@ -264,3 +273,75 @@ class TestUtils(unittest.TestCase):
             self.assertRegex(get_superflore_version(),
                              r"^(\d{2}|[1-9]|0\.(\d{2}|[4-9]|3\.(\d{2}|[4-9]|3)))",
                              "superflore version is lower than the last modification of this test.")
+
+    def test_scan_archive(self):
+        """Test hashing and extracting an archive in a single pass"""
+        contents = {
+            'foo-release/CMakeLists.txt': b'project(foo)\n',
+            'foo-release/package.xml': b'<package/>\n',
+            'foo-release/src/package.xml': b'<not-this-one/>\n',
+        }
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w:gz') as archive:
+            for name, data in contents.items():
+                tarinfo = tarfile.TarInfo(name)
+                tarinfo.size = len(data)
+                archive.addfile(tarinfo, io.BytesIO(data))
+        data = buf.getvalue()
+        regex = re.compile(r'^[^/]+/package\.xml$')
+        sink = io.BytesIO()
+        sha256, member = scan_archive(io.BytesIO(data), regex, sink=sink)
+        self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(member, b'<package/>\n')
+        # the whole archive is copied, not only what was needed to extract
+        self.assertEqual(sink.getvalue(), data)
+        # without a regex, or for a file that is not an archive, only hash
+        self.assertEqual(scan_archive(io.BytesIO(data)), (sha256, None))
+        self.assertEqual(
+            scan_archive(io.BytesIO(b'not a tarball'), regex),
+            (hashlib.sha256(b'not a tarball').hexdigest(), None))
+
+    def test_offline(self):
+        """Test running offline from the local mirror"""
+        env_vars = ('ROSDISTRO_INDEX_URL', 'ROS_HOME', 'ROSDEP_SOURCE_PATH')
+        orig_env = {var: os.environ.get(var) for var in env_vars}
+
+        def callback_offline():
+            callback_offline.calls += 1
+            check_online('foo')
+        callback_offline.calls = 0
+        try:
+            with TempfileManager(None) as tmp:
+                set_cache_dir(tmp)
+                os.environ['ROSDISTRO_INDEX_URL'] = 'https://example.com/'
+                # there must be a rosdistro index in the mirror
+                with self.assertRaises(OfflineCacheMiss):
+                    set_offline()
+                index = os.path.join(tmp, 'rosdistro', 'index-v4.yaml')
+                make_dir(os.path.dirname(index))
+                open(index, 'w').close()
+                make_dir(os.path.join(tmp, 'rosdep', 'sources.cache'))
+                open(os.path.join(
+                    tmp, 'rosdep', 'sources.cache', 'index'), 'w').close()
+                set_offline()
+                self.assertEqual(
+                    os.environ['ROSDISTRO_INDEX_URL'], 'file://' + index)
+                self.assertEqual(os.environ['ROS_HOME'], tmp)
+                self.assertTrue(
+                    os.path.isdir(os.environ['ROSDEP_SOURCE_PATH']))
+                with self.assertRaises(OfflineCacheMiss) as cm:
+                    check_online('foo')
+                self.assertIn('foo', cm.exception.message)
+                # cache misses are not retried
+                with self.assertRaises(OfflineCacheMiss):
+                    retry_on_exception(callback_offline, max_retries=3)
+                self.assertEqual(callback_offline.calls, 1)
+        finally:
+            set_offline(False)
+            set_cache_dir(None)
+            for var, value in orig_env.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+        check_online('foo')
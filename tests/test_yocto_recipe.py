@@ -0,0 +1,100 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from superflore.generators.bitbake.yocto_recipe import yoctoRecipe
+from superflore.PackageIndex import get_package_index
+from tests.fake_distro import make_distro
+import unittest
+
+
+class TestYoctoRecipe(unittest.TestCase):
+    def test_parse_ls_remote(self):
+        """Test parsing the output of git ls-remote"""
+        output = (
+            'aaaa\trefs/tags/release/fakedistro/foo/1.0.0-1\n'
+            'bbbb\trefs/tags/release/fakedistro/foo_msgs/1.0.0-1\n'
+        )
+        self.assertEqual(yoctoRecipe.parse_ls_remote(output), {
+            'refs/tags/release/fakedistro/foo/1.0.0-1': 'aaaa',
+            'refs/tags/release/fakedistro/foo_msgs/1.0.0-1': 'bbbb',
+        })
+        self.assertEqual(yoctoRecipe.parse_ls_remote(''), dict())
+
+    def test_prefetch_srcrevs(self):
+        """Test that SRCREVs are resolved with one ls-remote per repo"""
+        distro = make_distro({
+            'foo': {},
+            'foo_msgs': {'repo': 'foo'},
+            'bar': {},
+            'baz': {},
+        })
+        pkg_index = get_package_index(distro)
+        calls = []
+
+        def ls_remote_tags_stub(repo_url, tags):
+            calls.append((repo_url, sorted(tags)))
+            if 'bar' in repo_url:
+                # tag missing upstream
+                return dict()
+            return {'refs/tags/%s' % tag: 'sha-' + tag for tag in tags}
+
+        srcrev_cache = {pkg_index.get_src_uri('baz'): 'cached'}
+        orig_ls_remote_tags = yoctoRecipe.ls_remote_tags
+        yoctoRecipe.ls_remote_tags = staticmethod(ls_remote_tags_stub)
+        try:
+            yoctoRecipe.prefetch_srcrevs(distro, srcrev_cache, jobs=2)
+        finally:
+            yoctoRecipe.ls_remote_tags = orig_ls_remote_tags
+        self.assertEqual(sorted(calls), [
+            ('https://github.com/ros2-gbp/bar-release.git',
+             ['release/fakedistro/bar/1.0.0-1']),
+            ('https://github.com/ros2-gbp/foo-release.git',
+             ['release/fakedistro/foo/1.0.0-1',
+              'release/fakedistro/foo_msgs/1.0.0-1']),
+        ])
+        self.assertEqual(srcrev_cache, {
+            pkg_index.get_src_uri('baz'): 'cached',
+            pkg_index.get_src_uri('foo'):
+                'sha-release/fakedistro/foo/1.0.0-1',
+            pkg_index.get_src_uri('foo_msgs'):
+                'sha-release/fakedistro/foo_msgs/1.0.0-1',
+        })
+
+    def test_merge_aggregates(self):
+        """Test merging what rendering recipes adds to the aggregates"""
+        yoctoRecipe.reset()
+        try:
+            first = yoctoRecipe.new_aggregates()
+            first['rosdep_cache']['libfoo'].add('foo')
+            first['platform_deps'].add('foo')
+            first['generated_native_recipes'].add('bar-native')
+            first['generated_non_test_deps'].update(['foo', 'bar-native'])
+            second = yoctoRecipe.new_aggregates()
+            second['rosdep_cache']['libfoo'].add('foo-dev')
+            second['rosdep_cache']['python3'] = []
+            second['generated_test_deps'].add('baz')
+            yoctoRecipe.merge_aggregates(first)
+            yoctoRecipe.merge_aggregates(second)
+            self.assertEqual(dict(yoctoRecipe.rosdep_cache), {
+                'libfoo': {'foo', 'foo-dev'},
+                'python3': [],
+            })
+            self.assertEqual(yoctoRecipe.platform_deps, {'foo'})
+            self.assertEqual(
+                yoctoRecipe.generated_native_recipes, {'bar-native'})
+            self.assertEqual(
+                yoctoRecipe.generated_non_test_deps, {'foo', 'bar-native'})
+            self.assertEqual(yoctoRecipe.generated_test_deps, {'baz'})
+        finally:
+            yoctoRecipe.reset()